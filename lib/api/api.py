@@ -18,6 +18,8 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 import asyncio
+import threading
+import time
 import uuid
 import secrets
 import os
@@ -32,6 +34,11 @@ from .supabase_client import get_database
 from .circuit_breaker import get_circuit_breaker, get_all_circuit_status, CircuitState
 from .metrics import get_metrics
 from .auth import verify_api_key, is_public_endpoint, get_api_keys_from_env
+from .loop_monitor import LOOP_MONITOR_ENABLED, get_loop_monitor, profile_thread
+from .news_feed_store import get_news_feed_store
+from .poit_stats_cache import get_poit_stats_cache
+from .company_record import CompanyRecord, get_company_record_cache
+from .xbrl_fact_store import get_xbrl_fact_store
 
 # ==================== RATE LIMITING ====================
 
@@ -97,6 +104,14 @@ class LookupResult(BaseModel):
     postal_address: Optional[str] = None
 
 
+class XbrlFactQuery(BaseModel):
+    """Cross-company query against the XBRL fact store"""
+    concepts: List[str] = Field(..., min_items=1, max_items=50, description="XBRL-begrepp, t.ex. se-gen-base:Nettoomsattning")
+    orgnrs: Optional[List[str]] = Field(None, max_items=10000, description="Företag (utelämna för alla)")
+    from_year: Optional[int] = Field(None, ge=1990, le=2100, description="Första räkenskapsår")
+    to_year: Optional[int] = Field(None, ge=1990, le=2100, description="Sista räkenskapsår")
+
+
 class ApiKeyRequest(BaseModel):
     """Request for a new API key"""
     email: str = Field(..., description="E-postadress för kontakt")
@@ -264,11 +279,75 @@ async def api_key_middleware(request, call_next):
     )
 
 
+# ==================== LOOP MONITOR ====================
+
+async def loop_block_middleware(request: Request, call_next):
+    """
+    Measure event loop blocking per request (opt-in via LOOP_MONITOR_ENABLED).
+
+    Requests that block the loop longer than LOOP_BLOCK_THRESHOLD_MS are logged.
+    The watchdog in loop_monitor logs the stack of the blocking call itself.
+    """
+    monitor = get_loop_monitor()
+    path = request.url.path
+    request_key = id(request)
+
+    start = time.perf_counter()
+    blocked_at_start = monitor.request_started(request_key, path)
+    try:
+        return await call_next(request)
+    finally:
+        duration = time.perf_counter() - start
+        # Route is resolved during call_next - prefer the template path for grouping
+        route = request.scope.get("route")
+        path = route.path if route else path
+        blocked = monitor.request_finished(request_key, path, blocked_at_start, duration)
+        if blocked >= monitor.threshold:
+            print(f"Slow handler: {request.method} {path} blocked event loop {blocked * 1000:.0f}ms "
+                  f"(total {duration * 1000:.0f}ms)")
+
+
+if LOOP_MONITOR_ENABLED:
+    app.middleware("http")(loop_block_middleware)
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if LOOP_MONITOR_ENABLED:
+        get_loop_monitor().start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    if LOOP_MONITOR_ENABLED:
+        await get_loop_monitor().stop()
+
+
+@app.on_event("startup")
+async def start_news_poller():
+    get_news_feed_store().start()
+
+
+@app.on_event("shutdown")
+async def stop_news_poller():
+    await get_news_feed_store().stop()
+
+
+@app.on_event("shutdown")
+async def close_vdm_clients():
+    from .scrapers.bolagsverket_vdm import close_shared_clients
+    await close_shared_clients()
+
+
 # ==================== DEPENDENCY ====================
 
 def get_orch() -> DataOrchestrator:
     return get_orchestrator()
 
+def get_company_record(orgnr: str) -> Optional[CompanyRecord]:
+    """Företagspost för orchestratorns (cachade) företagsdict, återanvänds så länge dicten är densamma."""
+    return get_company_record_cache().get(orgnr, lambda o: get_orch().get_company(o))
+
 # ==================== ENDPOINTS ====================
 
 # README innehåll (identiskt med README.md i repot)
@@ -317,6 +396,7 @@ Inkludera API-nyckeln i varje anrop via headern `X-API-Key`.
 | `GET /api/v1/companies/{orgnr}/board` | Styrelse |
 | `GET /api/v1/companies/{orgnr}/financials` | Ekonomi |
 | `GET /api/v1/companies/{orgnr}/xbrl` | Årsredovisningar |
+| `POST /api/v1/xbrl/facts/query` | XBRL-värden för flera företag och år |
 | `GET /api/v1/poit/stats` | POIT daglig statistik |
 | `GET /api/v1/poit/bankruptcies` | Konkurser |
 | `POST /api/v1/enrich` | Berika företag |
@@ -596,10 +676,19 @@ async def get_metrics_endpoint():
     """
     metrics = get_metrics()
 
-    return {
+    result = {
         **metrics.get_stats()
     }
 
+    if LOOP_MONITOR_ENABLED:
+        result["event_loop"] = get_loop_monitor().get_stats()
+
+    result["nyhetsfloden"] = get_news_feed_store().get_status()
+    result["poit_cache"] = get_poit_stats_cache().get_stats()
+    result["foretagsposter"] = get_company_record_cache().get_stats()
+
+    return result
+
 # ==================== FÖRETAG ====================
 
 @app.get("/api/v1/companies/{orgnr}", tags=["Företag"])
@@ -634,22 +723,19 @@ async def get_company_summary(orgnr: str):
 @app.get("/api/v1/companies/{orgnr}/board", tags=["Personer & Befattningar"])
 async def get_company_board(orgnr: str):
     """Hämta styrelse, ledning och revisorer."""
-    orch = get_orch()
-    company = orch.get_company(orgnr)
+    company = get_company_record(orgnr)
 
     if not company:
         raise HTTPException(status_code=404, detail=f"Företag {orgnr} hittades inte")
 
-    roles = company.get('roles', [])
-
     return {
         'orgnr': orgnr,
-        'name': company.get('name'),
-        'styrelse': [r for r in roles if r.get('role_category') == 'BOARD'],
-        'ledning': [r for r in roles if r.get('role_category') == 'MANAGEMENT'],
-        'revisorer': [r for r in roles if r.get('role_category') == 'AUDITOR'],
-        'ovriga': [r for r in roles if r.get('role_category') == 'OTHER'],
-        'antal_totalt': len(roles)
+        'name': company.name,
+        'styrelse': company.roles_in('BOARD'),
+        'ledning': company.roles_in('MANAGEMENT'),
+        'revisorer': company.roles_in('AUDITOR'),
+        'ovriga': company.roles_in('OTHER'),
+        'antal_totalt': len(company.roles)
     }
 
 @app.get("/api/v1/companies/{orgnr}/financials", tags=["Ekonomi"])
@@ -659,32 +745,22 @@ async def get_company_financials(
     years: int = Query(5, ge=1, le=10, description="Antal år att returnera")
 ):
     """Hämta finansiell historik."""
-    orch = get_orch()
-    company = orch.get_company(orgnr)
+    company = get_company_record(orgnr)
 
     if not company:
         raise HTTPException(status_code=404, detail=f"Företag {orgnr} hittades inte")
 
-    financials = company.get('financials', [])
-
-    # Filter by type
-    filtered = [f for f in financials if f.get('is_consolidated') == (1 if consolidated else 0)]
-
-    # Sort and limit
-    filtered = sorted(filtered, key=lambda x: x.get('period_year', 0), reverse=True)[:years]
-
     return {
         'orgnr': orgnr,
-        'name': company.get('name'),
+        'name': company.name,
         'koncernredovisning': consolidated,
-        'perioder': filtered
+        'perioder': company.financial_periods(consolidated, years)
     }
 
 @app.get("/api/v1/companies/{orgnr}/structure", tags=["Företag"])
 async def get_company_structure(orgnr: str):
     """Hämta koncernstruktur (moderbolag, dotterbolag)."""
-    orch = get_orch()
-    company = orch.get_company(orgnr)
+    company = get_company_record(orgnr)
 
     if not company:
         raise HTTPException(status_code=404, detail=f"Företag {orgnr} hittades inte")
@@ -708,8 +784,7 @@ async def get_company_announcements(
     limit: int = Query(10, ge=1, le=50)
 ):
     """Hämta kungörelser för företaget."""
-    orch = get_orch()
-    company = orch.get_company(orgnr)
+    company = get_company_record(orgnr)
 
     if not company:
         raise HTTPException(status_code=404, detail=f"Företag {orgnr} hittades inte")
@@ -987,17 +1062,38 @@ async def get_xbrl_facts(
     - year: Räkenskapsår
     - namespace: XBRL namespace (se-gen-base, se-ar-base, etc.)
     - category: Kategori (financial, audit, company, compliance)
-    """
-    from .xbrl_storage import get_xbrl_storage
-    storage = get_xbrl_storage()
 
-    facts = storage.get_xbrl_facts(
-        orgnr,
-        fiscal_year=year,
-        namespace=namespace,
-        category=category,
-        limit=limit
-    )
+    "kalla" anger radformatet: "faktalager" (kolumnär faktalagring, med
+    concept, context_start/context_end, is_text m.m.) eller "xbrl_storage"
+    (databasens xbrl_facts-rader). Faktalagret används när det har rader
+    för bolaget och året; annars, och alltid vid kategorifilter, hämtas
+    fakta från xbrl_storage.
+    """
+    facts = []
+    source = "xbrl_storage"
+    fact_store = get_xbrl_fact_store()
+    if category is None and fact_store.has_data():
+        facts = await asyncio.to_thread(
+            fact_store.get_xbrl_facts,
+            orgnr,
+            fiscal_year=year,
+            namespace=namespace,
+            limit=limit
+        )
+        if facts:
+            source = "faktalager"
+
+    if source == "xbrl_storage":
+        from .xbrl_storage import get_xbrl_storage
+        storage = get_xbrl_storage()
+
+        facts = storage.get_xbrl_facts(
+            orgnr,
+            fiscal_year=year,
+            namespace=namespace,
+            category=category,
+            limit=limit
+        )
 
     return {
         "orgnr": orgnr,
@@ -1006,11 +1102,45 @@ async def get_xbrl_facts(
             "namespace": namespace,
             "kategori": category
         },
+        "kalla": source,
         "antal": len(facts),
         "fakta": facts
     }
 
 
+@app.post("/api/v1/xbrl/facts/query", tags=["Årsredovisningar"])
+@limiter.limit(RATE_LIMIT_DEFAULT)
+async def query_xbrl_facts(request: Request, fact_query: XbrlFactQuery):
+    """
+    Hämta XBRL-värden för flera företag och räkenskapsår i ett anrop.
+
+    Exempel: nettoomsättning (se-gen-base:Nettoomsattning) för alla bevakade
+    bolag 2020-2024. Endast värden för rapportens egen period (inte
+    jämförelseåret). Kräver det kolumnära faktalagret.
+    """
+    fact_store = get_xbrl_fact_store()
+    if not fact_store.has_data():
+        raise HTTPException(status_code=503, detail="XBRL-faktalagret är inte tillgängligt")
+
+    series = await asyncio.to_thread(
+        fact_store.get_concept_series,
+        fact_query.concepts,
+        orgnrs=fact_query.orgnrs,
+        from_year=fact_query.from_year,
+        to_year=fact_query.to_year
+    )
+
+    return {
+        "filter": {
+            "begrepp": fact_query.concepts,
+            "fran_ar": fact_query.from_year,
+            "till_ar": fact_query.to_year
+        },
+        "antal_foretag": len(series),
+        "foretag": series
+    }
+
+
 @app.get("/api/v1/companies/{orgnr}/audit-history", tags=["Årsredovisningar"])
 @limiter.limit(RATE_LIMIT_DEFAULT)
 async def get_audit_history_endpoint(request: Request, orgnr: str, limit: int = Query(10, ge=1, le=50)):
@@ -1072,6 +1202,7 @@ async def get_xbrl_stats(request: Request):
 
     return {
         "xbrl_bearbetning": stats,
+        "faktalager": get_xbrl_fact_store().get_stats(),
         "tidsstampel": datetime.now().isoformat()
     }
 
@@ -1089,7 +1220,8 @@ async def xbrl_status():
     vdm_client = get_bolagsverket_vdm_client()
 
     return {
-        "konfigurerad": vdm_client.is_configured
+        "konfigurerad": vdm_client.is_configured,
+        "hastighet": vdm_client.get_rate_stats()
     }
 
 
@@ -1126,11 +1258,16 @@ async def xbrl_test(orgnr: str):
 
         # Try to get document list
         documents = await vdm_client.get_document_list_async(orgnr)
+        if documents is None:
+            result["fel"] = "Kunde inte hämta dokumentlista"
+            return result
         result["dokument_hittade"] = len(documents)
         result["dokument"] = documents[:3] if documents else []
 
     except Exception as e:
         result["fel"] = str(e)
+    finally:
+        await vdm_client.aclose()
 
     return result
 
@@ -1305,25 +1442,20 @@ async def get_poit_daily_stats(request: Request):
     - Familjerätt (bodelning, förvaltarskap)
     - Kallelser på borgenärer
     """
-    db = get_database()
+    cache = get_poit_stats_cache()
 
     try:
-        # Get the most recent stats - FIXED: using correct table and column names
-        result = db.client.table('poit_sync_stats') \
-            .select('*') \
-            .order('sync_date', desc=True) \
-            .limit(1) \
-            .execute()
+        # Served from the in-memory snapshot, rebuilt only after a new sync
+        await cache.ensure_fresh()
+        stats = cache.get_latest_stats()
 
-        if not result.data:
+        if not stats:
             return {
                 "status": "ingen_data",
                 "meddelande": "Ingen POIT-statistik tillgänglig. Data synkas dagligen.",
                 "tidsstampel": datetime.now().isoformat()
             }
 
-        stats = result.data[0]
-
         return {
             "datum": stats.get('sync_date'),
             "hamtad": stats.get('sync_completed_at'),
@@ -1333,6 +1465,7 @@ async def get_poit_daily_stats(request: Request):
                 "announcements_new": stats.get('announcements_new', 0),
                 "watched_companies_matched": stats.get('watched_companies_matched', 0)
             },
+            "per_kategori": cache.get_daily_counts(stats.get('sync_date') or ''),
             "kalla": "poit.bolagsverket.se"
         }
     except Exception as e:
@@ -1350,24 +1483,28 @@ async def get_poit_stats_by_date(
 
     Returnerar historisk statistik om tillgänglig.
     """
-    db = get_database()
+    cache = get_poit_stats_cache()
 
     try:
-        # FIXED: using correct table and column names
-        result = db.client.table('poit_sync_stats') \
-            .select('*') \
-            .eq('sync_date', stats_date) \
-            .limit(1) \
-            .execute()
-
-        if not result.data:
+        await cache.ensure_fresh()
+        covered, stats = cache.get_stats_for_date(stats_date)
+
+        if not covered:
+            # Older than the cached range - fall back to the database
+            db = get_database()
+            result = db.client.table('poit_sync_stats') \
+                .select('*') \
+                .eq('sync_date', stats_date) \
+                .limit(1) \
+                .execute()
+            stats = result.data[0] if result.data else None
+
+        if not stats:
             raise HTTPException(
                 status_code=404,
                 detail=f"Ingen POIT-statistik för {stats_date}"
             )
 
-        stats = result.data[0]
-
         return {
             "datum": stats.get('sync_date'),
             "hamtad": stats.get('sync_completed_at'),
@@ -1377,6 +1514,7 @@ async def get_poit_stats_by_date(
                 "announcements_new": stats.get('announcements_new', 0),
                 "watched_companies_matched": stats.get('watched_companies_matched', 0)
             },
+            "per_kategori": cache.get_daily_counts(stats_date),
             "kalla": "poit.bolagsverket.se"
         }
     except HTTPException:
@@ -1402,26 +1540,29 @@ async def get_poit_bankruptcies(
     - Konkursbeslut
     - Utdelningsförslag
     """
-    db = get_database()
+    cache = get_poit_stats_cache()
 
     try:
-        # Calculate date range
-        from datetime import timedelta
-        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-        # FIXED: using correct column name publication_date instead of published_date
-        result = db.client.table('poit_announcements') \
-            .select('*') \
-            .eq('category', 'konkurser') \
-            .gte('publication_date', start_date) \
-            .order('publication_date', desc=True) \
-            .limit(limit) \
-            .execute()
+        await cache.ensure_fresh()
+        rows = cache.get_announcements(days, category='konkurser', limit=limit)
+
+        if rows is None:
+            from datetime import timedelta
+            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+            result = get_database().client.table('poit_announcements') \
+                .select('*') \
+                .eq('category', 'konkurser') \
+                .gte('publication_date', start_date) \
+                .order('publication_date', desc=True) \
+                .limit(limit) \
+                .execute()
+            rows = result.data or []
 
         return {
-            "antal": len(result.data) if result.data else 0,
+            "antal": len(rows),
             "period_dagar": days,
-            "konkurser": result.data or [],
+            "konkurser": rows,
             "kalla": "poit.bolagsverket.se"
         }
     except Exception as e:
@@ -1451,34 +1592,35 @@ async def get_poit_announcements(
     - `/api/v1/poit/announcements?category=konkurser` - Alla konkurser
     - `/api/v1/poit/announcements?category=registreringar&subcategory=aktiebolagsregistret` - Endast aktiebolag
     """
-    db = get_database()
+    cache = get_poit_stats_cache()
 
     try:
-        from datetime import timedelta
-        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        await cache.ensure_fresh()
+        rows = cache.get_announcements(days, category=category, subcategory=subcategory, limit=limit)
 
-        # FIXED: using correct column name publication_date instead of published_date
-        query = db.client.table('poit_announcements') \
-            .select('*') \
-            .gte('publication_date', start_date)
+        if rows is None:
+            from datetime import timedelta
+            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
 
-        if category:
-            query = query.eq('category', category)
-        if subcategory:
-            query = query.eq('subcategory', subcategory)
+            query = get_database().client.table('poit_announcements') \
+                .select('*') \
+                .gte('publication_date', start_date)
 
-        query = query.order('publication_date', desc=True).limit(limit)
+            if category:
+                query = query.eq('category', category)
+            if subcategory:
+                query = query.eq('subcategory', subcategory)
 
-        result = query.execute()
+            rows = query.order('publication_date', desc=True).limit(limit).execute().data or []
 
         return {
-            "antal": len(result.data) if result.data else 0,
+            "antal": len(rows),
             "filter": {
                 "kategori": category,
                 "underkategori": subcategory,
                 "period_dagar": days
             },
-            "kungorelser": result.data or [],
+            "kungorelser": rows,
             "kalla": "poit.bolagsverket.se"
         }
     except Exception as e:
@@ -1783,6 +1925,35 @@ async def reject_request(token: str, secret: str = Query(...)):
     """)
 
 
+@app.get("/admin/profile", tags=["Admin"], include_in_schema=False)
+async def profile_event_loop(
+    secret: str = Query(...),
+    seconds: float = Query(5, ge=1, le=60, description="Samplingstid i sekunder"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Intervall mellan samples"),
+    top: int = Query(20, ge=1, le=100, description="Antal stackar att returnera")
+):
+    """Sample the event loop thread and return the hottest stacks (admin only)"""
+    admin_secret = os.environ.get("ADMIN_SECRET", "")
+
+    if not admin_secret or secret != admin_secret:
+        raise HTTPException(status_code=403, detail="Invalid admin secret")
+
+    try:
+        profile = await profile_thread(
+            threading.get_ident(),
+            seconds=seconds,
+            interval_ms=interval_ms,
+            top=top
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if LOOP_MONITOR_ENABLED:
+        profile["event_loop"] = get_loop_monitor().get_stats()
+
+    return profile
+
+
 # ==================== NEWS API ====================
 
 class NewsArticle(BaseModel):
@@ -1805,23 +1976,31 @@ async def search_company_news(
     Sök efter nyheter om ett specifikt företag.
 
     Söker i svenska och internationella nyhetskällor efter artiklar
-    som nämner företaget. Använder RSS-feeds och keyword-filtrering.
+    som nämner företaget. RSS-källorna söks i det lokala indexet; källor
+    utan RSS hämtas live och filtreras på samma sätt.
 
     **Källor:**
-    - Breakit, Realtid, Ny Teknik, DI (svenska)
-    - TechCrunch, Wired, BBC Tech/Business (internationella)
+    - Breakit, Realtid (svenska, RSS)
+    - DI, Ny Teknik (svenska, live)
+    - TechCrunch, Wired, BBC Tech/Business (internationella, RSS)
+
+    `kallstatus` anger per källa om den kom med; källor som inte hann svara
+    inom sin deadline markeras och saknas i resultatet.
     """
     try:
-        from .news_client import SwedishNewsClient
-
-        client = SwedishNewsClient()
+        store = get_news_feed_store()
 
-        # Search for articles mentioning the company
-        articles = client.search_company(company_name, limit=limit)
+        # Polled feeds come from the local index; sources without RSS are
+        # fetched live, in parallel and under the same per-source deadline
+        _, live = await asyncio.gather(store.ensure_warm(), store.search_live(company_name))
+        articles = store.search(company_name, limit=limit) + live["nyheter"]
+        articles.sort(key=lambda a: getattr(a, 'published_at', None) or "", reverse=True)
+        articles = articles[:limit]
 
         return {
             "foretag": company_name,
-            "antal": len(articles.articles),
+            "antal": len(articles),
+            "kallstatus": {**store.source_status(store.feeds), **live["kallstatus"]},
             "nyheter": [
                 {
                     "titel": a.title,
@@ -1831,11 +2010,9 @@ async def search_company_news(
                     "publicerad": getattr(a, 'published_at', None),
                     "bild_url": getattr(a, 'image_url', None)
                 }
-                for a in articles.articles
+                for a in articles
             ]
         }
-    except ImportError:
-        raise HTTPException(status_code=501, detail="News client not available")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Kunde inte hämta nyheter: {str(e)}")
 
@@ -1863,20 +2040,27 @@ async def get_latest_news(
     - `bbc-business` - BBC Business
     """
     try:
-        from .news_client import SwedishNewsClient
+        store = get_news_feed_store()
 
-        client = SwedishNewsClient()
+        if source and not store.has_source(source):
+            # Sources without RSS (di, nyteknik) are still fetched live
+            from .news_client import SwedishNewsClient
 
-        if source:
-            # Single source - use get_latest with string
+            client = SwedishNewsClient()
             articles = client.get_latest(source, limit=limit)
+            source_status = {}
         else:
-            # Multiple sources - FIXED: use get_from_sources instead of get_latest with list
-            articles = client.get_from_sources(['breakit', 'realtid', 'techcrunch'], limit=limit)
+            # Sources are fetched in parallel with per-source deadlines;
+            # a slow source yields partial results flagged in kallstatus
+            sources = [source] if source else ['breakit', 'realtid', 'techcrunch']
+            await store.ensure_warm(sources)
+            articles = store.get_latest(sources, limit=limit)
+            source_status = store.source_status(sources)
 
         return {
             "kalla": source or "mixed",
             "antal": len(articles),
+            "kallstatus": source_status,
             "nyheter": [
                 {
                     "titel": a.title,
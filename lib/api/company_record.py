@@ -0,0 +1,327 @@
+"""
+Kompakt företagsmodell för Loop API
+
+Ersätter de nästlade företagsdictarna i endpoints som bara behöver en del
+av datan (styrelse, ekonomi, koncernstruktur, kungörelser).
+
+Funktioner:
+- __slots__-baserad CompanyRecord: skalära fält i en dict, listsektioner
+  (roller, ekonomi, relaterade bolag, branscher, kungörelser) lagrade som
+  kompakt JSON och avkodade först när de används
+- Roller grupperade per role_category vid avkodning
+- Ekonomi indexerad per (period_year, is_consolidated), sorterad per typ
+- Cache per orgnr och innehållsversion: orchestratorn tillfrågas vid varje
+  anrop (dess cache avgör färskheten), och posten återanvänds så länge
+  versionen är densamma. Cachen håller inga referenser till
+  orchestratorns dictar
+- Bara de senast använda posterna behåller avkodade sektioner och index;
+  övriga faller tillbaka till enbart kodad JSON
+
+Endpoints formar då svaret genom uppslag i stället för att filtrera hela
+listor vid varje anrop.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
+COMPANY_RECORD_CACHE_SIZE = int(os.environ.get("COMPANY_RECORD_CACHE_SIZE", "1000"))
+# Records that keep their decoded sections and indexes
+COMPANY_RECORD_DECODED_SIZE = int(os.environ.get("COMPANY_RECORD_DECODED_SIZE", "64"))
+
+# List sections kept encoded, decoded on first use
+SECTIONS = ("roles", "financials", "related_companies", "industries", "announcements")
+
+ROLE_CATEGORIES = ("BOARD", "MANAGEMENT", "AUDITOR", "OTHER")
+
+# Fields that change whenever the company's data is re-synced
+VERSION_FIELDS = ("last_synced_at", "updated_at")
+
+
+def content_version(company: Dict[str, Any]) -> Optional[str]:
+    """Version of a company dict from its sync timestamps, or None if it has none."""
+    values = [company.get(field) for field in VERSION_FIELDS]
+    if not any(values):
+        return None
+    return "|".join(str(v or "") for v in values)
+
+
+class CompanyRecord:
+    """
+    One company, decoded section by section.
+
+    Usage:
+        record = CompanyRecord.from_dict(orch.get_company(orgnr))
+        record.name
+        record.roles_in("BOARD")
+        record.financial_periods(consolidated=False, years=5)
+    """
+
+    __slots__ = (
+        "orgnr",
+        "version",
+        "_fields",
+        "_encoded",
+        "_decoded",
+        "_roles_by_category",
+        "_financials_index",
+        "_financials_by_type",
+    )
+
+    def __init__(self, orgnr: str, fields: Dict[str, Any], encoded: Dict[str, bytes], version: Optional[str] = None):
+        self.orgnr = orgnr
+        self._fields = fields
+        self._encoded = encoded
+        self.version = version or self._digest()
+        self._decoded: Dict[str, List[Dict[str, Any]]] = {}
+        self._roles_by_category: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._financials_index: Optional[Dict[Tuple[int, bool], Dict[str, Any]]] = None
+        self._financials_by_type: Optional[Dict[bool, List[Dict[str, Any]]]] = None
+
+    @classmethod
+    def from_dict(cls, company: Dict[str, Any]) -> "CompanyRecord":
+        """Build from an orchestrator/scraper company dict."""
+        fields = {k: v for k, v in company.items() if k not in SECTIONS}
+        encoded = {k: _dumps(company[k]) for k in SECTIONS if company.get(k)}
+        return cls(str(company.get("orgnr") or ""), fields, encoded, content_version(company))
+
+    def _digest(self) -> str:
+        # Content hash, for companies without sync timestamps
+        digest = hashlib.sha1(json.dumps(self._fields, sort_keys=True, default=str).encode("utf-8"))
+        for key in SECTIONS:
+            digest.update(key.encode())
+            digest.update(self._encoded.get(key, b""))
+        return "sha1:" + digest.hexdigest()
+
+    # =========================================================================
+    # FIELDS
+    # =========================================================================
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access to scalar fields and sections."""
+        if key in SECTIONS:
+            return self.section(key)
+        return self._fields.get(key, default)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._fields.get("name")
+
+    def section(self, key: str) -> List[Dict[str, Any]]:
+        """Decode a list section on first access ([] if missing)."""
+        section = self._decoded.get(key)
+        if section is None:
+            raw = self._encoded.get(key)
+            if not raw:
+                return []
+            section = _loads(raw)
+            self._decoded[key] = section
+        return section
+
+    def to_dict(self) -> Dict[str, Any]:
+        company = dict(self._fields)
+        for key in self._encoded:
+            company[key] = self.section(key)
+        return company
+
+    @property
+    def encoded_size(self) -> int:
+        """Bytes of encoded section JSON."""
+        return sum(len(raw) for raw in self._encoded.values())
+
+    @property
+    def decoded_sections(self) -> List[str]:
+        return sorted(self._decoded)
+
+    def release(self):
+        """Drop decoded sections and indexes; the encoded JSON is kept."""
+        self._decoded = {}
+        self._roles_by_category = None
+        self._financials_index = None
+        self._financials_by_type = None
+
+    # =========================================================================
+    # ROLES
+    # =========================================================================
+
+    @property
+    def roles(self) -> List[Dict[str, Any]]:
+        return self.section("roles")
+
+    def _group_roles(self) -> Dict[str, List[Dict[str, Any]]]:
+        groups = self._roles_by_category
+        if groups is None:
+            groups = {category: [] for category in ROLE_CATEGORIES}
+            for role in self.roles:
+                groups.setdefault(role.get("role_category"), []).append(role)
+            self._roles_by_category = groups
+        return groups
+
+    def roles_in(self, category: str) -> List[Dict[str, Any]]:
+        """Roles with the given role_category, in original order."""
+        return self._group_roles().get(category, [])
+
+    # =========================================================================
+    # FINANCIALS
+    # =========================================================================
+
+    def _index_financials(self) -> Tuple[Dict[Tuple[int, bool], Dict[str, Any]], Dict[bool, List[Dict[str, Any]]]]:
+        index = self._financials_index
+        by_type = self._financials_by_type
+        if index is not None and by_type is not None:
+            return index, by_type
+
+        index, by_type = {}, {False: [], True: []}
+        for period in self.section("financials"):
+            flag = period.get("is_consolidated")
+            # Only explicit 0/1 (or bool) periods belong to either type
+            if flag not in (0, 1):
+                continue
+            consolidated = bool(flag)
+            by_type[consolidated].append(period)
+            index.setdefault((period.get("period_year"), consolidated), period)
+        for periods in by_type.values():
+            periods.sort(key=lambda p: p.get("period_year", 0), reverse=True)
+        self._financials_index = index
+        self._financials_by_type = by_type
+        return index, by_type
+
+    def financial_period(self, year: int, consolidated: bool = False) -> Optional[Dict[str, Any]]:
+        """Period for (period_year, is_consolidated), or None."""
+        index, _ = self._index_financials()
+        return index.get((year, consolidated))
+
+    def financial_periods(self, consolidated: bool = False, years: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Periods of one type, newest first."""
+        _, by_type = self._index_financials()
+        periods = by_type[consolidated]
+        return periods[:years] if years is not None else list(periods)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "orgnr": self.orgnr,
+            "version": self.version,
+            "encoded_bytes": self.encoded_size,
+            "decoded_sections": self.decoded_sections
+        }
+
+
+class CompanyRecordCache:
+    """
+    LRU cache of CompanyRecords per orgnr, reused while the content version matches.
+
+    get() always asks the orchestrator, so the data is never older than its
+    cache; only the compact record is kept here, never the company dict.
+    The decoded_size most recently used records keep their decoded sections.
+    """
+
+    def __init__(self, max_size: int = COMPANY_RECORD_CACHE_SIZE, decoded_size: int = COMPANY_RECORD_DECODED_SIZE):
+        """
+        Initialize cache.
+
+        Args:
+            max_size: Max records kept in memory
+            decoded_size: Max records that keep decoded sections and indexes
+        """
+        self.max_size = max_size
+        self.decoded_size = decoded_size
+
+        self._records: "OrderedDict[str, CompanyRecord]" = OrderedDict()
+        self._decoded: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, orgnr: str, loader: Callable[[str], Optional[Dict[str, Any]]]) -> Optional[CompanyRecord]:
+        """Record for the company `loader` returns; reused while its version is unchanged."""
+        company = loader(orgnr)
+        if not company:
+            self.invalidate(orgnr)
+            return None
+
+        version = content_version(company)
+        with self._lock:
+            cached = self._records.get(orgnr)
+            if cached is not None and version is not None and cached.version == version:
+                return self._hit(orgnr, cached)
+
+        # Without sync timestamps the version is a content hash of the new record
+        record = CompanyRecord.from_dict(company)
+        with self._lock:
+            cached = self._records.get(orgnr)
+            if cached is not None and cached.version == record.version:
+                return self._hit(orgnr, cached)
+            self.misses += 1
+            self._records[orgnr] = record
+            self._touch(orgnr)
+            while len(self._records) > self.max_size:
+                evicted, _ = self._records.popitem(last=False)
+                self._decoded.pop(evicted, None)
+            return record
+
+    def _hit(self, orgnr: str, record: CompanyRecord) -> CompanyRecord:
+        self.hits += 1
+        self._touch(orgnr)
+        return record
+
+    def _touch(self, orgnr: str):
+        self._records.move_to_end(orgnr)
+        self._decoded[orgnr] = None
+        self._decoded.move_to_end(orgnr)
+        while len(self._decoded) > self.decoded_size:
+            cold, _ = self._decoded.popitem(last=False)
+            record = self._records.get(cold)
+            if record is not None:
+                record.release()
+
+    def invalidate(self, orgnr: str):
+        with self._lock:
+            self._records.pop(orgnr, None)
+            self._decoded.pop(orgnr, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self._records.values())
+            decoded = len(self._decoded)
+        total = self.hits + self.misses
+        return {
+            "poster": len(records),
+            "max_poster": self.max_size,
+            "avkodade_poster": decoded,
+            "traffar": self.hits,
+            "missar": self.misses,
+            "traffgrad": round(self.hits / total, 3) if total else 0,
+            "kodade_bytes": sum(record.encoded_size for record in records)
+        }
+
+
+# Singleton
+_cache: Optional[CompanyRecordCache] = None
+
+
+def get_company_record_cache() -> CompanyRecordCache:
+    """Get or create the company record cache singleton."""
+    global _cache
+    if _cache is None:
+        _cache = CompanyRecordCache()
+    return _cache
@@ -0,0 +1,294 @@
+"""
+Event loop-övervakning för Loop API
+
+Hittar synkrona anrop (Supabase, scrapers) som blockerar event loopen
+inuti async-handlers.
+
+Funktioner:
+- Heartbeat-task som mäter hur länge loopen varit blockerad
+- Watchdog-tråd som loggar en stack sample när en blockering passerar tröskeln
+- Blockeringstid per request och per endpoint
+- Samplande profilering on demand (kollapsade stackar)
+
+Aktiveras med LOOP_MONITOR_ENABLED=1. Tröskel via LOOP_BLOCK_THRESHOLD_MS.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter, deque
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger("loop_monitor")
+
+LOOP_MONITOR_ENABLED = os.environ.get("LOOP_MONITOR_ENABLED", "").lower() in ("1", "true", "yes")
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", "100"))
+
+# Frames from these modules are noise in stack samples
+_IGNORED_FRAME_DIRS = ("asyncio",)
+_IGNORED_FRAME_FILES = ("threading.py", "selectors.py", "loop_monitor.py")
+
+
+def _is_ignored_frame(filename: str) -> bool:
+    # Whole file names only, so e.g. test_loop_monitor.py frames are kept
+    directory, name = os.path.split(filename)
+    return name in _IGNORED_FRAME_FILES or os.path.basename(directory) in _IGNORED_FRAME_DIRS
+
+
+def _format_frame(frame, limit: int = 25) -> List[str]:
+    """Format a frame's stack as a list of 'file:line in func' strings (innermost last)."""
+    entries = traceback.extract_stack(frame, limit=limit)
+    return [
+        f"{os.path.basename(e.filename)}:{e.lineno} in {e.name}"
+        for e in entries
+        if not _is_ignored_frame(e.filename)
+    ]
+
+
+class LoopBlockMonitor:
+    """
+    Detects event loop stalls and attributes them to requests.
+
+    A heartbeat coroutine wakes up every `interval` seconds. If it wakes up
+    late, the loop was blocked for the difference. A watchdog thread checks
+    the heartbeat from outside the loop and, while a stall is in progress,
+    captures the loop thread's stack - that is where the blocking call is.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+        interval: float = 0.02,
+        max_samples: int = 50
+    ):
+        """
+        Initialize monitor.
+
+        Args:
+            threshold_ms: Stalls longer than this are logged with a stack sample
+            interval: Heartbeat interval in seconds
+            max_samples: Number of recent stack samples to keep
+        """
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._last_beat = time.monotonic()
+        self._blocked_total = 0.0
+        self._stall_count = 0
+        self._max_stall = 0.0
+        self._sampled_beat: Optional[float] = None
+
+        self._active_paths: Dict[int, str] = {}
+        self._path_stats: Dict[str, Dict[str, float]] = {}
+        self.samples: deque = deque(maxlen=max_samples)
+
+    @property
+    def is_running(self) -> bool:
+        return self._heartbeat_task is not None and not self._heartbeat_task.done()
+
+    def start(self):
+        """Start heartbeat and watchdog. Must be called from the event loop thread."""
+        if self.is_running:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+        logger.info(f"Loop monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop heartbeat and watchdog."""
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = now - self._last_beat - self.interval
+            if lag > 0:
+                self._blocked_total += lag
+                if lag >= self.threshold:
+                    self._stall_count += 1
+                    self._max_stall = max(self._max_stall, lag)
+            self._last_beat = now
+
+    def _watch(self):
+        check_every = max(self.interval, self.threshold / 2)
+        while not self._stop.wait(check_every):
+            beat = self._last_beat
+            stalled_for = time.monotonic() - beat - self.interval
+            # One sample per stall: the heartbeat timestamp identifies the stall
+            if stalled_for >= self.threshold and self._sampled_beat != beat:
+                self._sampled_beat = beat
+                self._capture_sample(stalled_for)
+
+    def _capture_sample(self, stalled_for: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+
+        stack = _format_frame(frame)
+        paths = sorted(set(self._active_paths.values()))
+        sample = {
+            "tidpunkt": time.time(),
+            "blockerad_ms": round(stalled_for * 1000, 1),
+            "requests": paths,
+            "stack": stack
+        }
+        self.samples.append(sample)
+
+        logger.warning(
+            f"Event loop blocked for {stalled_for * 1000:.0f}ms "
+            f"(requests: {', '.join(paths) or '-'})\n  " + "\n  ".join(stack[-10:])
+        )
+
+    # =========================================================================
+    # REQUEST ATTRIBUTION
+    # =========================================================================
+
+    def blocked_seconds(self) -> float:
+        """Total blocked time so far, including a stall that is still in progress."""
+        ongoing = time.monotonic() - self._last_beat - self.interval
+        return self._blocked_total + max(0.0, ongoing)
+
+    def request_started(self, request_key: int, path: str) -> float:
+        self._active_paths[request_key] = path
+        return self.blocked_seconds()
+
+    def request_finished(self, request_key: int, path: str, blocked_at_start: float, duration: float) -> float:
+        """Record a finished request. Returns loop blocking observed during it (seconds)."""
+        self._active_paths.pop(request_key, None)
+        blocked = max(0.0, self.blocked_seconds() - blocked_at_start)
+
+        stats = self._path_stats.setdefault(path, {
+            "anrop": 0,
+            "blockerad_ms_totalt": 0.0,
+            "blockerad_ms_max": 0.0,
+            "langsamma_anrop": 0,
+            "tid_ms_totalt": 0.0
+        })
+        stats["anrop"] += 1
+        stats["blockerad_ms_totalt"] += blocked * 1000
+        stats["blockerad_ms_max"] = max(stats["blockerad_ms_max"], blocked * 1000)
+        stats["tid_ms_totalt"] += duration * 1000
+        if blocked >= self.threshold:
+            stats["langsamma_anrop"] += 1
+
+        return blocked
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """Summary for the metrics endpoint."""
+        endpoints = sorted(
+            self._path_stats.items(),
+            key=lambda item: item[1]["blockerad_ms_totalt"],
+            reverse=True
+        )[:top]
+
+        return {
+            "aktiv": self.is_running,
+            "troskel_ms": self.threshold * 1000,
+            "blockerad_ms_totalt": round(self.blocked_seconds() * 1000, 1),
+            "antal_blockeringar": self._stall_count,
+            "langsta_blockering_ms": round(self._max_stall * 1000, 1),
+            "endpoints": {
+                path: {
+                    "anrop": int(s["anrop"]),
+                    "blockerad_ms_snitt": round(s["blockerad_ms_totalt"] / s["anrop"], 1),
+                    "blockerad_ms_max": round(s["blockerad_ms_max"], 1),
+                    "langsamma_anrop": int(s["langsamma_anrop"]),
+                    "tid_ms_snitt": round(s["tid_ms_totalt"] / s["anrop"], 1)
+                }
+                for path, s in endpoints
+            },
+            "senaste_samples": list(self.samples)[-5:]
+        }
+
+
+# =============================================================================
+# SAMPLING PROFILER
+# =============================================================================
+
+_profile_lock = asyncio.Lock()
+
+
+async def profile_thread(thread_id: int, seconds: float = 5.0, interval_ms: float = 5.0, top: int = 20) -> Dict[str, Any]:
+    """
+    Sample a thread's stack for `seconds` and return the hottest stacks.
+
+    Intended for the event loop thread: call it from a handler and pass
+    threading.get_ident(). The handler itself awaits while sampling, so the
+    samples show whatever else the loop is busy with.
+    """
+    if _profile_lock.locked():
+        raise RuntimeError("Profilering pågår redan")
+
+    async with _profile_lock:
+        counts: Counter = Counter()
+        stop = threading.Event()
+        interval = interval_ms / 1000
+        total = 0
+
+        def sampler():
+            nonlocal total
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(thread_id)
+                if frame is None:
+                    continue
+                stack = _format_frame(frame, limit=40)
+                total += 1
+                counts[";".join(stack) or "<idle>"] += 1
+
+        thread = threading.Thread(target=sampler, name="loop-profiler", daemon=True)
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(thread.join)
+
+        return {
+            "sekunder": seconds,
+            "intervall_ms": interval_ms,
+            "antal_samples": total,
+            "stackar": [
+                {
+                    "andel": round(count / total, 3) if total else 0,
+                    "samples": count,
+                    "stack": stack.split(";")
+                }
+                for stack, count in counts.most_common(top)
+            ]
+        }
+
+
+# Singleton
+_monitor: Optional[LoopBlockMonitor] = None
+
+
+def get_loop_monitor() -> LoopBlockMonitor:
+    """Get or create the loop monitor singleton."""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopBlockMonitor()
+    return _monitor
@@ -0,0 +1,508 @@
+"""
+Nyhetsflöden för Loop API - delad cache med bakgrundspollning
+
+Ersätter live-hämtning av RSS per request:
+- Bakgrundspoller med villkorliga GET (ETag / Last-Modified)
+- Alla källor hämtas parallellt över en delad HTTP/2-pool, var och en
+  med egen deadline - en hängande källa fördröjer inte de andra
+- Parsade artiklar i ett delat minneslager
+- Inverterat index på titel/sammanfattning för företagssök
+
+Endpoints läser bara från minnet; källor som saknar RSS (DI, Ny Teknik)
+hämtas fortfarande live via SwedishNewsClient, med samma deadline.
+"""
+
+import os
+import re
+import html
+import bisect
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Set, Iterable
+import xml.etree.ElementTree as ET
+
+import httpx
+
+logger = logging.getLogger("news_feed_store")
+
+NEWS_POLL_INTERVAL_SECONDS = int(os.environ.get("NEWS_POLL_INTERVAL_SECONDS", "300"))
+NEWS_SOURCE_DEADLINE_SECONDS = float(os.environ.get("NEWS_SOURCE_DEADLINE_SECONDS", "4"))
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# RSS-källor som pollas (samma urval som /api/v1/news/sources med rss=True).
+# Valfri nyckel "deadline" (sekunder) ersätter NEWS_SOURCE_DEADLINE_SECONDS.
+FEEDS: Dict[str, Dict[str, Any]] = {
+    "breakit": {"namn": "Breakit", "url": "https://www.breakit.se/feed/artiklar"},
+    "realtid": {"namn": "Realtid", "url": "https://www.realtid.se/rss/senaste"},
+    "techcrunch": {"namn": "TechCrunch", "url": "https://techcrunch.com/category/startups/feed/"},
+    "wired": {"namn": "Wired", "url": "https://www.wired.com/feed/rss"},
+    "bbc-tech": {"namn": "BBC Technology", "url": "https://feeds.bbci.co.uk/news/technology/rss.xml"},
+    "bbc-business": {"namn": "BBC Business", "url": "https://feeds.bbci.co.uk/news/business/rss.xml"},
+}
+
+# Källor utan RSS: hämtas live via SwedishNewsClient och filtreras lokalt
+LIVE_SOURCES = ("di", "nyteknik")
+LIVE_SCAN_LIMIT = 50
+
+MAX_ARTICLES_PER_FEED = 200
+SUMMARY_MAX_LENGTH = 500
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "media": "http://search.yahoo.com/mrss/",
+    "content": "http://purl.org/rss/1.0/modules/content/",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used by the inverted index."""
+    return _TOKEN_RE.findall(text.casefold()) if text else []
+
+
+def mentions(query: str, title: str, summary: Optional[str] = None) -> bool:
+    """
+    True if title or summary contains the query tokens as a phrase.
+
+    The last token only has to start a word, so "Spotify" matches
+    "Spotifys vinst ökar".
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return False
+    # Leading space anchors the phrase at a word start; no trailing one
+    phrase = f" {' '.join(tokens)}"
+    return phrase in f" {' '.join(tokenize(title))} " or phrase in f" {' '.join(tokenize(summary or ''))} "
+
+
+@dataclass(slots=True)
+class FeedArticle:
+    """A parsed feed item (same attribute names as SwedishNewsClient articles)"""
+    title: str
+    url: str
+    source: str
+    summary: Optional[str] = None
+    published_at: Optional[str] = None
+    image_url: Optional[str] = None
+
+
+@dataclass
+class FeedState:
+    """Conditional-GET validators and parsed items for one feed"""
+    source: str
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    articles: List[FeedArticle] = field(default_factory=list)
+    last_fetched_at: Optional[str] = None
+    last_status: Optional[int] = None
+    last_error: Optional[str] = None
+    last_attempt_at: Optional[str] = None
+    last_result: Optional[str] = None
+    not_modified_count: int = 0
+
+
+# =============================================================================
+# PARSING
+# =============================================================================
+
+def _clean_text(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    text = html.unescape(_TAG_RE.sub(" ", value))
+    text = " ".join(text.split())
+    if len(text) > SUMMARY_MAX_LENGTH:
+        text = text[:SUMMARY_MAX_LENGTH].rsplit(" ", 1)[0] + "…"
+    return text or None
+
+
+def _parse_date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    # Normalise to UTC so ISO strings sort chronologically across feeds
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def parse_feed(content: bytes, source: str) -> List[FeedArticle]:
+    """Parse an RSS 2.0 or Atom document into FeedArticle objects."""
+    root = ET.fromstring(content)
+    articles = []
+
+    items = root.findall("./channel/item")
+    if items:
+        for item in items:
+            url = (item.findtext("link") or item.findtext("guid") or "").strip()
+            title = _clean_text(item.findtext("title"))
+            if not url or not title:
+                continue
+
+            image_url = None
+            media = item.find("media:content", _NS)
+            if media is None:
+                media = item.find("media:thumbnail", _NS)
+            enclosure = item.find("enclosure")
+            if media is not None:
+                image_url = media.get("url")
+            elif enclosure is not None and (enclosure.get("type") or "").startswith("image"):
+                image_url = enclosure.get("url")
+
+            articles.append(FeedArticle(
+                title=title,
+                url=url,
+                source=source,
+                summary=_clean_text(item.findtext("description")),
+                published_at=_parse_date(item.findtext("pubDate")),
+                image_url=image_url
+            ))
+    else:
+        for entry in root.findall("atom:entry", _NS):
+            link = entry.find("atom:link[@rel='alternate']", _NS)
+            if link is None:
+                link = entry.find("atom:link", _NS)
+            url = link.get("href") if link is not None else None
+            title = _clean_text(entry.findtext("atom:title", namespaces=_NS))
+            if not url or not title:
+                continue
+
+            articles.append(FeedArticle(
+                title=title,
+                url=url,
+                source=source,
+                summary=_clean_text(
+                    entry.findtext("atom:summary", namespaces=_NS)
+                    or entry.findtext("atom:content", namespaces=_NS)
+                ),
+                published_at=_parse_date(
+                    entry.findtext("atom:published", namespaces=_NS)
+                    or entry.findtext("atom:updated", namespaces=_NS)
+                )
+            ))
+
+    return articles[:MAX_ARTICLES_PER_FEED]
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class NewsFeedStore:
+    """
+    Shared in-memory store of polled feed articles.
+
+    A background task polls every feed with conditional GETs. Unchanged feeds
+    answer 304 and cost nothing to process. The store keeps an inverted index
+    (token -> article urls) over title and summary so company search is a
+    local set intersection instead of remote fetches.
+    """
+
+    def __init__(self, feeds: Optional[Dict[str, Dict[str, Any]]] = None, timeout: float = 15.0):
+        feeds = feeds or FEEDS
+        self.feeds: Dict[str, FeedState] = {
+            source: FeedState(source=source, url=cfg["url"])
+            for source, cfg in feeds.items()
+        }
+        self.deadlines: Dict[str, float] = {
+            source: float(cfg.get("deadline", NEWS_SOURCE_DEADLINE_SECONDS))
+            for source, cfg in feeds.items()
+        }
+        self.timeout = timeout
+
+        self._articles: Dict[str, FeedArticle] = {}
+        self._index: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+
+    def has_source(self, source: str) -> bool:
+        return source in self.feeds
+
+    @property
+    def is_warm(self) -> bool:
+        return any(state.last_fetched_at for state in self.feeds.values())
+
+    # =========================================================================
+    # POLLING
+    # =========================================================================
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # One pooled client for all feeds: keep-alive, HTTP/2 multiplexing where available
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                follow_redirects=True,
+                headers={"User-Agent": "LoopAPI/3 (+https://loop-auto-api.onrender.com)"}
+            )
+        return self._client
+
+    async def refresh_feed(self, source: str) -> str:
+        """
+        Fetch one feed with a conditional GET.
+
+        Returns:
+            'updated', 'not_modified' or 'error'
+        """
+        state = self.feeds[source]
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        try:
+            response = await self._get_client().get(state.url, headers=headers)
+            state.last_status = response.status_code
+
+            if response.status_code == 304:
+                state.not_modified_count += 1
+                state.last_fetched_at = datetime.now().isoformat()
+                state.last_error = None
+                return "not_modified"
+
+            response.raise_for_status()
+            articles = parse_feed(response.content, source)
+
+            state.etag = response.headers.get("ETag")
+            state.last_modified = response.headers.get("Last-Modified")
+            state.articles = articles
+            # Only a 200 or 304 counts as fetched (is_warm, "hamtad")
+            state.last_fetched_at = datetime.now().isoformat()
+            state.last_error = None
+            return "updated"
+
+        except (httpx.HTTPError, ET.ParseError) as e:
+            state.last_error = f"{type(e).__name__}: {e}"
+            logger.warning(f"Feed {source} failed: {state.last_error}")
+            return "error"
+
+    async def _refresh_with_deadline(self, source: str) -> str:
+        """Refresh one feed but give up after its deadline so a hung source can't stall the rest."""
+        state = self.feeds[source]
+        state.last_attempt_at = datetime.now().isoformat()
+        try:
+            result = await asyncio.wait_for(self.refresh_feed(source), timeout=self.deadlines[source])
+        except asyncio.TimeoutError:
+            state.last_error = f"Timeout efter {self.deadlines[source]}s"
+            logger.warning(f"Feed {source} timed out after {self.deadlines[source]}s")
+            result = "timeout"
+        state.last_result = result
+        return result
+
+    async def refresh_all(self, sources: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Refresh feeds concurrently and rebuild the index if anything changed.
+
+        Returns:
+            Dict of source -> 'updated' | 'not_modified' | 'error' | 'timeout'
+        """
+        sources = [s for s in (sources or self.feeds) if s in self.feeds]
+        async with self._refresh_lock:
+            results = await asyncio.gather(*(self._refresh_with_deadline(s) for s in sources))
+            outcome = dict(zip(sources, results))
+            if "updated" in results:
+                self._rebuild_index()
+            return outcome
+
+    async def ensure_warm(self, sources: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Fetch feeds that have never been tried (cold start before the first poll).
+
+        Bounded by the per-source deadlines; sources that miss it are left out
+        and reported via source_status().
+        """
+        cold = [s for s in (sources or self.feeds) if s in self.feeds and not self.feeds[s].last_attempt_at]
+        if cold:
+            return await self.refresh_all(cold)
+        return {}
+
+    async def _poll_loop(self, interval: int):
+        while True:
+            try:
+                outcome = await self.refresh_all()
+                logger.debug(f"News poll done: {outcome}")
+            except Exception as e:
+                logger.error(f"News poll failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: int = NEWS_POLL_INTERVAL_SECONDS):
+        """Start background polling on the running event loop."""
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop(interval))
+
+    async def stop(self):
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    # =========================================================================
+    # INDEX & QUERIES
+    # =========================================================================
+
+    def _rebuild_index(self):
+        articles: Dict[str, FeedArticle] = {}
+        index: Dict[str, Set[str]] = {}
+
+        for state in self.feeds.values():
+            for article in state.articles:
+                if article.url in articles:
+                    continue
+                articles[article.url] = article
+                for token in set(tokenize(article.title) + tokenize(article.summary or "")):
+                    index.setdefault(token, set()).add(article.url)
+
+        # Swap in one step so readers never see a half-built index
+        self._articles, self._index, self._vocabulary = articles, index, sorted(index)
+
+    @staticmethod
+    def _sort_key(article: FeedArticle) -> str:
+        return article.published_at or ""
+
+    def get_latest(self, sources: Optional[Iterable[str]] = None, limit: int = 20) -> List[FeedArticle]:
+        """Latest articles from the given sources (all feeds if None), newest first."""
+        wanted = set(sources) if sources else set(self.feeds)
+        articles = [a for a in self._articles.values() if a.source in wanted]
+        return sorted(articles, key=self._sort_key, reverse=True)[:limit]
+
+    def search(self, query: str, limit: int = 10) -> List[FeedArticle]:
+        """
+        Find articles mentioning `query` in title or summary.
+
+        Candidates come from intersecting the posting sets of the query tokens
+        (the last token as a prefix, so "Spotify" finds "Spotifys"); the
+        phrase is then verified on the candidates only.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Same snapshot throughout, even if the poller swaps in a new index
+        articles, index, vocabulary = self._articles, self._index, self._vocabulary
+        postings = [index.get(t, set()) for t in set(tokens[:-1])]
+        prefixed: Set[str] = set()
+        start = bisect.bisect_left(vocabulary, tokens[-1])
+        for token in vocabulary[start:]:
+            if not token.startswith(tokens[-1]):
+                break
+            prefixed |= index[token]
+        postings.append(prefixed)
+
+        candidates = set.intersection(*sorted(postings, key=len))
+        matches = [
+            articles[url] for url in candidates
+            if mentions(query, articles[url].title, articles[url].summary)
+        ]
+        return sorted(matches, key=self._sort_key, reverse=True)[:limit]
+
+    async def search_live(self, query: str, sources: Iterable[str] = LIVE_SOURCES) -> Dict[str, Any]:
+        """
+        Search sources without RSS by fetching their latest articles live.
+
+        Each source runs in a worker thread under its own deadline, like the
+        feeds. Returns {"nyheter": [...], "kallstatus": {...}}.
+        """
+        try:
+            from .news_client import SwedishNewsClient
+        except ImportError:
+            return {
+                "nyheter": [],
+                "kallstatus": {
+                    source: {"status": "ej_tillganglig", "hamtad": None, "artiklar": 0, "fel": "News client not available"}
+                    for source in sources
+                }
+            }
+
+        client = SwedishNewsClient()
+        deadline = NEWS_SOURCE_DEADLINE_SECONDS
+
+        async def fetch(source: str):
+            try:
+                latest = await asyncio.wait_for(
+                    asyncio.to_thread(client.get_latest, source, limit=LIVE_SCAN_LIMIT),
+                    timeout=deadline
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Live source {source} timed out after {deadline}s")
+                return [], {"status": "timeout", "hamtad": None, "artiklar": 0, "fel": f"Timeout efter {deadline}s"}
+            except Exception as e:
+                logger.warning(f"Live source {source} failed: {e}")
+                return [], {"status": "error", "hamtad": None, "artiklar": 0, "fel": f"{type(e).__name__}: {e}"}
+
+            found = [a for a in latest if mentions(query, a.title, getattr(a, "summary", None))]
+            return found, {"status": "ok", "hamtad": datetime.now().isoformat(), "artiklar": len(latest), "fel": None}
+
+        sources = list(sources)
+        results = await asyncio.gather(*(fetch(s) for s in sources))
+        return {
+            "nyheter": [a for found, _ in results for a in found],
+            "kallstatus": {source: status for source, (_, status) in zip(sources, results)}
+        }
+
+    def source_status(self, sources: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Per-source freshness for API responses (partial results are flagged here)."""
+        status = {}
+        for source in sources:
+            state = self.feeds.get(source)
+            if state is None:
+                continue
+            status[source] = {
+                "status": "ok" if state.articles and not state.last_error else (state.last_result or "ej_hamtad"),
+                "hamtad": state.last_fetched_at,
+                "artiklar": len(state.articles),
+                "fel": state.last_error
+            }
+        return status
+
+    def get_status(self) -> Dict[str, Dict]:
+        return {
+            source: {
+                "hamtad": state.last_fetched_at,
+                "status": state.last_status,
+                "artiklar": len(state.articles),
+                "oforandrad_304": state.not_modified_count,
+                "senaste_resultat": state.last_result,
+                "deadline_s": self.deadlines[source],
+                "fel": state.last_error
+            }
+            for source, state in self.feeds.items()
+        }
+
+
+# Singleton
+_store: Optional[NewsFeedStore] = None
+
+
+def get_news_feed_store() -> NewsFeedStore:
+    """Get or create the news feed store singleton."""
+    global _store
+    if _store is None:
+        _store = NewsFeedStore()
+    return _store
@@ -0,0 +1,320 @@
+"""
+POIT-statistik cache för Loop API
+
+Håller POIT-statistik och senaste kungörelserna i minnet så att
+/api/v1/poit/* inte behöver fråga databasen vid varje anrop.
+
+Funktioner:
+- Sync-statistik per datum (poit_sync_stats)
+- Kungörelser för de senaste 30 dagarna, indexerade per kategori
+- Ombyggnad hämtar bara statistikkolumnerna som endpoints använder, och
+  bara kungörelsedagar från den senast cachade dagen och framåt (helt
+  omtag högst var POIT_CACHE_FULL_REBUILD_SECONDS)
+- Förberäknade rollups: antal per dag och kategori
+- Invalidering när en ny sync har körts (versionskontroll högst var N:e sekund)
+- Hit/miss-statistik för /api/v1/metrics
+
+Versionen bestäms av senast avslutade rad i poit_sync_stats och
+sync_metadata['poit_announcements'] (som POIT-monitorn uppdaterar).
+"""
+
+import os
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("poit_stats_cache")
+
+POIT_CACHE_PROBE_SECONDS = float(os.environ.get("POIT_CACHE_PROBE_SECONDS", "60"))
+POIT_CACHE_WINDOW_DAYS = 30
+POIT_CACHE_STATS_DAYS = 365
+# Full re-read of the announcement window (catches late corrections to older days)
+POIT_CACHE_FULL_REBUILD_SECONDS = float(os.environ.get("POIT_CACHE_FULL_REBUILD_SECONDS", "21600"))
+PAGE_SIZE = 1000
+
+# poit_sync_stats columns the stats endpoints read
+STATS_COLUMNS = (
+    'sync_date, sync_started_at, sync_completed_at, categories_scraped, '
+    'announcements_found, announcements_new, watched_companies_matched'
+)
+
+
+class PoitStatsCache:
+    """
+    In-memory snapshot of POIT stats and recent announcements.
+
+    The snapshot is rebuilt only when the sync version changes. Readers use
+    whatever snapshot is current; a rebuild swaps all structures at once.
+    """
+
+    def __init__(
+        self,
+        probe_interval: float = POIT_CACHE_PROBE_SECONDS,
+        window_days: int = POIT_CACHE_WINDOW_DAYS,
+        stats_days: int = POIT_CACHE_STATS_DAYS,
+        full_rebuild_interval: float = POIT_CACHE_FULL_REBUILD_SECONDS,
+        database: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            probe_interval: Min seconds between version checks against the database
+            window_days: Days of announcements kept in memory
+            stats_days: Days of sync statistics kept in memory
+            full_rebuild_interval: Max seconds between full reads of the announcement window
+            database: Returns the database wrapper (default: supabase_client.get_database)
+        """
+        self.probe_interval = probe_interval
+        self.window_days = window_days
+        self.stats_days = stats_days
+        self.full_rebuild_interval = full_rebuild_interval
+        self._database = database
+
+        self._version: Optional[Tuple] = None
+        self._last_probe = 0.0
+        self._lock = asyncio.Lock()
+
+        self._stats_by_date: Dict[str, Dict[str, Any]] = {}
+        self._latest_stats: Optional[Dict[str, Any]] = None
+        self._stats_from: Optional[str] = None
+        self._announcements: List[Dict[str, Any]] = []
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+        self._daily_counts: Dict[str, Dict[str, int]] = {}
+        self._window_from: Optional[str] = None
+        self._built_at: Optional[str] = None
+        self._full_built_at: Optional[float] = None
+
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._rebuilds = 0
+        self._incremental_rebuilds = 0
+
+    # =========================================================================
+    # REFRESH
+    # =========================================================================
+
+    def _probe_version(self, db) -> Tuple:
+        latest = db.client.table('poit_sync_stats') \
+            .select('id, sync_completed_at') \
+            .not_.is_('sync_completed_at', 'null') \
+            .order('sync_completed_at', desc=True) \
+            .limit(1) \
+            .execute()
+        meta = db.client.table('sync_metadata') \
+            .select('last_sync_at') \
+            .eq('source', 'poit_announcements') \
+            .execute()
+
+        row = latest.data[0] if latest.data else {}
+        return (
+            row.get('id'),
+            row.get('sync_completed_at'),
+            meta.data[0]['last_sync_at'] if meta.data else None
+        )
+
+    def _fetch_paged(self, query_factory) -> List[Dict[str, Any]]:
+        rows = []
+        offset = 0
+        while True:
+            page = query_factory().range(offset, offset + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def _rebuild(self, db, version: Tuple):
+        today = datetime.now()
+        stats_from = (today - timedelta(days=self.stats_days)).strftime('%Y-%m-%d')
+        window_from = (today - timedelta(days=self.window_days)).strftime('%Y-%m-%d')
+
+        stats_rows = self._fetch_paged(lambda: db.client.table('poit_sync_stats')
+                                       .select(STATS_COLUMNS)
+                                       .gte('sync_date', stats_from)
+                                       .order('sync_date', desc=True)
+                                       .order('sync_started_at', desc=True))
+
+        # A sync only adds to the newest days: re-read from the newest cached
+        # day and keep the older days from the previous snapshot
+        incremental = (
+            bool(self._announcements)
+            and self._full_built_at is not None
+            and time.monotonic() - self._full_built_at < self.full_rebuild_interval
+        )
+        fetch_from = (self._announcements[0].get('publication_date') or '')[:10] if incremental else window_from
+        fetch_from = max(fetch_from, window_from)
+        fetched = self._fetch_paged(lambda: db.client.table('poit_announcements')
+                                    .select('*')
+                                    .gte('publication_date', fetch_from)
+                                    .order('publication_date', desc=True))
+        announcements = fetched
+        if incremental:
+            announcements = fetched + [
+                ann for ann in self._announcements
+                if window_from <= (ann.get('publication_date') or '')[:10] < fetch_from
+            ]
+
+        # Rows are newest first: the first row per date is the one the old query returned
+        stats_by_date: Dict[str, Dict[str, Any]] = {}
+        for row in stats_rows:
+            stats_by_date.setdefault(row.get('sync_date'), row)
+
+        by_category: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        daily_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for ann in announcements:
+            by_category[ann.get('category')].append(ann)
+            day = (ann.get('publication_date') or '')[:10]
+            daily_counts[day][ann.get('category')] += 1
+
+        # Swap everything at once
+        self._stats_by_date = stats_by_date
+        self._latest_stats = stats_rows[0] if stats_rows else None
+        self._stats_from = stats_from
+        self._announcements = announcements
+        self._by_category = dict(by_category)
+        self._daily_counts = {day: dict(counts) for day, counts in daily_counts.items()}
+        self._window_from = window_from
+        self._built_at = today.isoformat()
+        self._version = version
+        self._rebuilds += 1
+        if incremental:
+            self._incremental_rebuilds += 1
+        else:
+            self._full_built_at = time.monotonic()
+
+        logger.info(
+            f"POIT cache rebuilt ({'from ' + fetch_from if incremental else 'full'}): "
+            f"{len(stats_by_date)} stat days, {len(announcements)} announcements"
+        )
+
+    def _get_database(self):
+        if self._database is None:
+            from .supabase_client import get_database
+            self._database = get_database
+        return self._database()
+
+    def _refresh_sync(self):
+        db = self._get_database()
+        version = self._probe_version(db)
+        if version != self._version:
+            self._rebuild(db, version)
+
+    async def ensure_fresh(self):
+        """Check the sync version (at most every probe_interval seconds) and rebuild if it changed."""
+        if self._version is not None and time.monotonic() - self._last_probe < self.probe_interval:
+            return
+
+        async with self._lock:
+            if self._version is not None and time.monotonic() - self._last_probe < self.probe_interval:
+                return
+            try:
+                # Supabase client is synchronous - keep it off the event loop
+                await asyncio.to_thread(self._refresh_sync)
+            except Exception as e:
+                if self._version is None:
+                    raise
+                # Keep serving the previous snapshot until the database is back
+                logger.warning(f"POIT cache refresh failed, serving stale data: {e}")
+            self._last_probe = time.monotonic()
+
+    def invalidate(self):
+        """Force a version check and a full rebuild on the next request."""
+        self._last_probe = 0.0
+        self._version = None
+        self._full_built_at = None
+
+    # =========================================================================
+    # READ
+    # =========================================================================
+
+    def _count(self, section: str, hit: bool):
+        if hit:
+            self._hits[section] += 1
+        else:
+            self._misses[section] += 1
+
+    def get_latest_stats(self) -> Optional[Dict[str, Any]]:
+        self._count('stats', True)
+        return self._latest_stats
+
+    def get_stats_for_date(self, stats_date: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Look up sync stats for a date.
+
+        Returns:
+            (covered, row) - covered is False if the date is older than the
+            cached range and the caller must query the database
+        """
+        covered = self._stats_from is not None and stats_date >= self._stats_from
+        self._count('stats', covered)
+        return covered, self._stats_by_date.get(stats_date)
+
+    def get_daily_counts(self, day: str) -> Dict[str, int]:
+        """Announcements per category published on `day` (YYYY-MM-DD)."""
+        return dict(self._daily_counts.get(day, {}))
+
+    def get_announcements(
+        self,
+        days: int,
+        category: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        limit: int = 50
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Announcements published in the last `days` days, newest first.
+
+        Returns None if the window isn't covered by the cache.
+        """
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        if self._window_from is None or start_date < self._window_from:
+            self._count('announcements', False)
+            return None
+
+        self._count('announcements', True)
+        rows = self._by_category.get(category, []) if category else self._announcements
+
+        result = []
+        for ann in rows:
+            if (ann.get('publication_date') or '') < start_date:
+                break
+            if subcategory and ann.get('subcategory') != subcategory:
+                continue
+            result.append(ann)
+            if len(result) >= limit:
+                break
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summary for the metrics endpoint."""
+        sections = {}
+        for section in sorted(set(self._hits) | set(self._misses)):
+            hits, misses = self._hits[section], self._misses[section]
+            sections[section] = {
+                "traffar": hits,
+                "missar": misses,
+                "traffgrad": round(hits / (hits + misses), 3) if hits + misses else 0
+            }
+
+        return {
+            "byggd": self._built_at,
+            "ombyggnader": self._rebuilds,
+            "inkrementella_ombyggnader": self._incremental_rebuilds,
+            "kungorelser": len(self._announcements),
+            "statistikdagar": len(self._stats_by_date),
+            "sektioner": sections
+        }
+
+
+# Singleton
+_cache: Optional[PoitStatsCache] = None
+
+
+def get_poit_stats_cache() -> PoitStatsCache:
+    """Get or create the POIT stats cache singleton."""
+    global _cache
+    if _cache is None:
+        _cache = PoitStatsCache()
+    return _cache
@@ -0,0 +1,356 @@
+"""
+Kolumnär XBRL-faktalagring för Loop API
+
+Fakta från årsredovisningarna lagras som Parquet, en fil per räkenskapsår
+(data/xbrl-facts/fiscal_year=2023/facts.parquet), i stället för som rader
+av löst typade dictar. Frågor över många bolag ("nettoomsättning för alla
+bevakade bolag 2020-2024") blir en vektoriserad skanning av några få
+filer i stället för tusentals radfrågor.
+
+Funktioner:
+- Dictionary-kodade kolumner för orgnr, begrepp, namespace, kontext,
+  enhet m.m. - varje sträng lagras en gång per fil
+- Filerna sorteras på (orgnr, begrepp) och skrivs i radgrupper, så filter
+  på bolag och begrepp hoppar över radgrupper via min/max-statistik
+- Kontextens period (start/slut) ligger på varje fakta, så innevarande
+  års värden kan väljas utan att läsa kontexterna separat
+- write() ersätter dokument som redan finns (omparsning), per år och
+  atomiskt (temp-fil + os.replace)
+
+Kräver pyarrow (valfritt beroende); utan det är available False och
+API:t faller tillbaka på xbrl_storage, liksom för bolag och år som inte
+finns i lagret.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger("xbrl_fact_store")
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+
+XBRL_FACT_STORE_DIR = os.environ.get("XBRL_FACT_STORE_DIR", str(_REPO_ROOT / "data" / "xbrl-facts"))
+ROW_GROUP_SIZE = 64 * 1024
+FACTS_FILE = "facts.parquet"
+# How long the list of stored years is reused before the directory is
+# scanned again (writes from this process refresh it at once)
+YEARS_CACHE_SECONDS = float(os.environ.get("XBRL_FACT_STORE_YEARS_CACHE_SECONDS", "60"))
+
+# Dictionary-encoded string columns, then plain columns
+_DICT_COLUMNS = [
+    "orgnr", "document_id", "period_end", "concept", "namespace",
+    "context", "context_start", "context_end", "unit", "decimals",
+]
+
+if PYARROW_AVAILABLE:
+    _DICT = pa.dictionary(pa.int32(), pa.string())
+    SCHEMA = pa.schema(
+        [(name, _DICT) for name in _DICT_COLUMNS]
+        + [("scale", pa.int32()), ("value", pa.float64()), ("value_raw", pa.string()), ("is_text", pa.bool_())]
+    )
+    # As read: the partition directory adds fiscal_year
+    DATASET_SCHEMA = SCHEMA.append(pa.field("fiscal_year", pa.int32()))
+
+
+def _report_columns(record: Dict[str, Any], columns: Dict[str, list]):
+    """Append one stored report's facts (see annual-report-batch-sync) to column lists."""
+    contexts = record.get("contexts") or {}
+    for fact in record.get("facts") or []:
+        name = fact.get("name", "")
+        context_id = fact.get("context", "")
+        context = contexts.get(context_id) or {}
+        text = fact.get("type") == "text"
+
+        columns["orgnr"].append(record["orgnr"])
+        columns["document_id"].append(record["document_id"])
+        columns["period_end"].append((record.get("period_end") or "")[:10])
+        columns["concept"].append(name)
+        columns["namespace"].append(name.split(":")[0] if ":" in name else "")
+        columns["context"].append(context_id)
+        columns["context_start"].append(context.get("start"))
+        columns["context_end"].append(context.get("end") or context.get("date"))
+        columns["unit"].append(None if text else fact.get("unit"))
+        columns["decimals"].append(None if text else fact.get("decimals"))
+        columns["scale"].append(0 if text else fact.get("scale", 0))
+        columns["value"].append(None if text else fact.get("value_parsed"))
+        columns["value_raw"].append(fact.get("value") if text else fact.get("value_raw"))
+        columns["is_text"].append(text)
+
+
+class XbrlFactStore:
+    """
+    Parquet fact store partitioned by fiscal year.
+
+    Writes are serialized per process; readers always see whole files.
+    """
+
+    def __init__(
+        self,
+        root: str = XBRL_FACT_STORE_DIR,
+        row_group_size: int = ROW_GROUP_SIZE,
+        years_cache_seconds: float = YEARS_CACHE_SECONDS
+    ):
+        """
+        Initialize store.
+
+        Args:
+            root: Store directory (created on first write)
+            row_group_size: Rows per Parquet row group
+            years_cache_seconds: How long years() reuses its directory scan
+        """
+        self.root = Path(root)
+        self.row_group_size = row_group_size
+        self.years_cache_seconds = years_cache_seconds
+        self._lock = threading.Lock()
+        self._years: Optional[List[int]] = None
+        self._years_scanned_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return PYARROW_AVAILABLE
+
+    def _year_path(self, year: int) -> Path:
+        return self.root / f"fiscal_year={year}" / FACTS_FILE
+
+    def years(self) -> List[int]:
+        """Fiscal years with stored facts (directory scan cached for years_cache_seconds)."""
+        if self._years is None or time.monotonic() - self._years_scanned_at > self.years_cache_seconds:
+            self._years = self._scan_years()
+            self._years_scanned_at = time.monotonic()
+        return self._years
+
+    def _scan_years(self) -> List[int]:
+        if not self.root.exists():
+            return []
+        years = []
+        for folder in self.root.glob("fiscal_year=*"):
+            if (folder / FACTS_FILE).exists():
+                try:
+                    years.append(int(folder.name.split("=", 1)[1]))
+                except ValueError:
+                    continue
+        return sorted(years)
+
+    def has_data(self) -> bool:
+        return PYARROW_AVAILABLE and bool(self.years())
+
+    # =========================================================================
+    # WRITE
+    # =========================================================================
+
+    def write(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Store reports, replacing earlier versions of the same documents.
+
+        Args:
+            records: Stored report records (orgnr, document_id, period_end,
+                contexts, facts), as written by annual-report-batch-sync
+
+        Returns:
+            Number of fact rows written
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for the XBRL fact store")
+
+        by_year: Dict[int, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for record in records:
+            try:
+                year = int((record.get("period_end") or "")[:4])
+            except ValueError:
+                logger.warning(f"Skipping {record.get('document_id')}: no fiscal year")
+                continue
+            _report_columns(record, by_year[year])
+
+        written = 0
+        with self._lock:
+            for year, columns in sorted(by_year.items()):
+                if columns["orgnr"]:
+                    table = pa.Table.from_pydict({name: columns[name] for name in SCHEMA.names}, schema=SCHEMA)
+                    self._write_year(year, table)
+                    written += table.num_rows
+            self._years = None
+        return written
+
+    def _write_year(self, year: int, new: "pa.Table"):
+        path = self._year_path(year)
+        tables = [new]
+        if path.exists():
+            existing = pq.read_table(path, schema=SCHEMA)
+            replaced = pc.unique(new["document_id"].combine_chunks().dictionary_decode())
+            keep = pc.invert(pc.is_in(existing["document_id"].cast(pa.string()), value_set=replaced))
+            tables.insert(0, existing.filter(keep))
+
+        table = pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+        # Sort on the decoded strings (dictionary order is insertion order)
+        order = pc.sort_indices(
+            pa.table({"orgnr": table["orgnr"].cast(pa.string()), "concept": table["concept"].cast(pa.string())}),
+            sort_keys=[("orgnr", "ascending"), ("concept", "ascending")],
+        )
+        table = table.take(order).unify_dictionaries().combine_chunks()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f".{FACTS_FILE}.tmp-{os.getpid()}"
+        pq.write_table(table, tmp_path, row_group_size=self.row_group_size, compression="zstd")
+        os.replace(tmp_path, path)
+
+    # =========================================================================
+    # QUERY
+    # =========================================================================
+
+    def query(
+        self,
+        orgnrs: Optional[Iterable[str]] = None,
+        concepts: Optional[Iterable[str]] = None,
+        namespace: Optional[str] = None,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None,
+        current_period_only: bool = False,
+        columns: Optional[List[str]] = None,
+    ) -> "pa.Table":
+        """
+        Facts matching all given filters, as an Arrow table.
+
+        Args:
+            orgnrs: Companies (default: all)
+            concepts: Concept names, e.g. se-gen-base:Nettoomsattning (default: all)
+            namespace: Concept namespace, e.g. se-gen-base
+            from_year / to_year: Fiscal year range, inclusive
+            current_period_only: Only facts whose context ends on the report's
+                period end (drops prior-year comparatives)
+            columns: Columns to read (default: all, plus fiscal_year)
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for the XBRL fact store")
+
+        years = [
+            y for y in self.years()
+            if (from_year is None or y >= from_year) and (to_year is None or y <= to_year)
+        ]
+        if not years:
+            return DATASET_SCHEMA.empty_table().select(columns or DATASET_SCHEMA.names)
+
+        dataset = ds.dataset(
+            [str(self._year_path(y)) for y in years],
+            schema=DATASET_SCHEMA,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([("fiscal_year", pa.int32())]), flavor="hive"),
+            partition_base_dir=str(self.root),
+        )
+
+        expr = None
+        for part in (
+            ds.field("orgnr").isin(list(orgnrs)) if orgnrs is not None else None,
+            ds.field("concept").isin(list(concepts)) if concepts is not None else None,
+            ds.field("namespace") == namespace if namespace else None,
+        ):
+            if part is not None:
+                expr = part if expr is None else expr & part
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(columns + (["context_end", "period_end"] if current_period_only else [])))
+        table = dataset.to_table(columns=read_columns, filter=expr)
+
+        if current_period_only:
+            table = table.filter(pc.equal(table["context_end"].cast(pa.string()), table["period_end"].cast(pa.string())))
+            if columns is not None:
+                table = table.select(columns)
+        return table
+
+    def get_xbrl_facts(
+        self,
+        orgnr: str,
+        fiscal_year: Optional[int] = None,
+        namespace: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Facts for one company, same filters as xbrl_storage.get_xbrl_facts (no category)."""
+        table = self.query(
+            orgnrs=[orgnr],
+            namespace=namespace,
+            from_year=fiscal_year,
+            to_year=fiscal_year,
+        )
+        table = table.drop_columns(["orgnr"]).slice(0, limit)
+        return table.to_pylist()
+
+    def get_concept_series(
+        self,
+        concepts: List[str],
+        orgnrs: Optional[List[str]] = None,
+        from_year: Optional[int] = None,
+        to_year: Optional[int] = None
+    ) -> Dict[str, Dict[str, Dict[int, float]]]:
+        """
+        Reported value per company, concept and fiscal year.
+
+        Only the report's own period is used (not prior-year comparatives);
+        the first value in file order wins if a concept is tagged twice.
+
+        Returns:
+            {orgnr: {concept: {fiscal_year: value}}}
+        """
+        table = self.query(
+            orgnrs=orgnrs,
+            concepts=concepts,
+            from_year=from_year,
+            to_year=to_year,
+            current_period_only=True,
+            columns=["orgnr", "concept", "fiscal_year", "value"],
+        )
+        table = table.filter(pc.is_valid(table["value"]))
+
+        series: Dict[str, Dict[str, Dict[int, float]]] = {}
+        for orgnr, concept, year, value in zip(
+            table["orgnr"].to_pylist(),
+            table["concept"].to_pylist(),
+            table["fiscal_year"].to_pylist(),
+            table["value"].to_pylist(),
+        ):
+            series.setdefault(orgnr, {}).setdefault(concept, {}).setdefault(year, value)
+        return series
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summary for the metrics endpoint."""
+        if not PYARROW_AVAILABLE:
+            return {"tillganglig": False}
+        years = self.years()
+        rows = {}
+        size = 0
+        for year in years:
+            path = self._year_path(year)
+            rows[year] = pq.ParquetFile(path).metadata.num_rows
+            size += path.stat().st_size
+        return {
+            "tillganglig": True,
+            "katalog": str(self.root),
+            "rakenskapsar": years,
+            "fakta_per_ar": rows,
+            "storlek_mb": round(size / 1024 / 1024, 1),
+        }
+
+
+# Singleton
+_store: Optional[XbrlFactStore] = None
+
+
+def get_xbrl_fact_store() -> XbrlFactStore:
+    """Get or create the XBRL fact store singleton."""
+    global _store
+    if _store is None:
+        _store = XbrlFactStore()
+    return _store
@@ -0,0 +1,443 @@
+"""
+Keyword Alert Matcher
+
+Matches new RSS articles against every user's keyword alerts in a single
+pass per article.
+
+All enabled alerts in `keyword_alerts` are compiled into one Aho-Corasick
+automaton (keywords and exclude_keywords alike). Each article's text is
+scanned once, so matching cost grows with article length rather than with
+alerts x articles. Matches are written in bulk to `keyword_alert_matches`.
+
+Features:
+- Case-insensitive matching on whole words/phrases (å, ä, ö included)
+- exclude_keywords veto an alert for that article
+- Alerts are only applied to sources listed in their `sources` column
+- Incremental runs via a cursor in sync_metadata ('keyword_alerts_rss')
+
+Usage:
+    python -m lib.monitors.keyword_alert_matcher [--since ISO] [--dry-run]
+
+    # Or as module
+    from lib.monitors.keyword_alert_matcher import KeywordAlertMatcher
+    matcher = KeywordAlertMatcher.from_alerts(alerts)
+    matches = matcher.match_text("Klarna tar in nytt kapital")
+
+Environment:
+    SUPABASE_URL - Supabase project URL
+    SUPABASE_KEY - Supabase service role key
+"""
+
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Set, Tuple, Iterable
+
+logger = logging.getLogger("keyword_alert_matcher")
+
+CURSOR_SOURCE = "keyword_alerts_rss"
+INSERT_CHUNK_SIZE = 500
+ARTICLE_PAGE_SIZE = 1000
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Casefold and collapse whitespace so keywords and text compare equally."""
+    if not text:
+        return ""
+    return " ".join(text.casefold().split())
+
+
+# =============================================================================
+# Aho-Corasick automaton
+# =============================================================================
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher.
+
+    Patterns are added with an integer id, then `build()` computes failure
+    links. `find(text)` yields (start, end, pattern_id) for every occurrence
+    in one left-to-right scan of the text.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        # Nearest node on the failure chain that has output (-1 = none)
+        self._out_link: List[int] = [-1]
+        self._lengths: Dict[int, int] = {}
+        self._built = False
+
+    def add(self, pattern: str, pattern_id: int):
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._out_link.append(-1)
+            node = nxt
+        self._out[node].append(pattern_id)
+        self._lengths[pattern_id] = len(pattern)
+        self._built = False
+
+    def build(self):
+        """Compute failure and output links (breadth-first)."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+            self._out_link[node] = -1
+
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fail_node = self._fail[child]
+                self._out_link[child] = fail_node if self._out[fail_node] else self._out_link[fail_node]
+
+        self._built = True
+
+    def find(self, text: str):
+        """Yield (start, end, pattern_id) for all occurrences; end is exclusive."""
+        if not self._built:
+            self.build()
+
+        goto, fail, out, out_link, lengths = self._goto, self._fail, self._out, self._out_link, self._lengths
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            hit = node if out[node] else out_link[node]
+            while hit > 0:
+                for pattern_id in out[hit]:
+                    yield i + 1 - lengths[pattern_id], i + 1, pattern_id
+                hit = out_link[hit]
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    """True if text[start:end] is not part of a longer word."""
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end].isalnum():
+        return False
+    return True
+
+
+# =============================================================================
+# Alert matcher
+# =============================================================================
+
+class KeywordAlertMatcher:
+    """
+    All enabled alerts compiled into one automaton.
+
+    Each distinct normalised keyword becomes one pattern, shared between all
+    alerts that use it. A pattern maps back to (alert index, is_exclude).
+    """
+
+    def __init__(self):
+        self._automaton = AhoCorasick()
+        self._pattern_ids: Dict[str, int] = {}
+        self._patterns: List[str] = []
+        self._owners: List[List[Tuple[int, bool]]] = []
+        self.alerts: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_alerts(cls, alerts: Iterable[Dict[str, Any]], source: Optional[str] = None) -> "KeywordAlertMatcher":
+        """
+        Compile alerts (rows from keyword_alerts).
+
+        Args:
+            alerts: Alert rows with id, keywords, exclude_keywords, sources, enabled
+            source: Only include alerts that watch this source ('rss', 'poit', ...)
+        """
+        matcher = cls()
+        for alert in alerts:
+            if alert.get("enabled") is False:
+                continue
+            sources = alert.get("sources")
+            if source and sources and source not in sources:
+                continue
+            matcher.add_alert(alert)
+        matcher._automaton.build()
+        return matcher
+
+    def add_alert(self, alert: Dict[str, Any]):
+        alert_index = len(self.alerts)
+        keywords = [k for k in (alert.get("keywords") or []) if normalize_text(k)]
+        if not keywords:
+            return
+
+        self.alerts.append(alert)
+        for keyword in keywords:
+            self._register(keyword, alert_index, False)
+        for keyword in alert.get("exclude_keywords") or []:
+            self._register(keyword, alert_index, True)
+
+    def _register(self, keyword: str, alert_index: int, exclude: bool):
+        pattern = normalize_text(keyword)
+        if not pattern:
+            return
+        pattern_id = self._pattern_ids.get(pattern)
+        if pattern_id is None:
+            pattern_id = len(self._patterns)
+            self._pattern_ids[pattern] = pattern_id
+            self._patterns.append(pattern)
+            self._owners.append([])
+            self._automaton.add(pattern, pattern_id)
+        self._owners[pattern_id].append((alert_index, exclude))
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self._patterns)
+
+    def match_text(self, text: str) -> Dict[str, List[str]]:
+        """
+        Match one text against all alerts.
+
+        Returns:
+            Dict of alert id -> matched keywords (normalised), excluded alerts removed
+        """
+        normalized = normalize_text(text)
+        if not normalized or not self.alerts:
+            return {}
+
+        found: Set[int] = set()
+        for start, end, pattern_id in self._automaton.find(normalized):
+            if pattern_id not in found and _is_boundary(normalized, start, end):
+                found.add(pattern_id)
+
+        hits: Dict[int, List[str]] = defaultdict(list)
+        excluded: Set[int] = set()
+        for pattern_id in found:
+            for alert_index, exclude in self._owners[pattern_id]:
+                if exclude:
+                    excluded.add(alert_index)
+                else:
+                    hits[alert_index].append(self._patterns[pattern_id])
+
+        return {
+            self.alerts[alert_index]["id"]: sorted(keywords)
+            for alert_index, keywords in hits.items()
+            if alert_index not in excluded
+        }
+
+    def match_articles(self, articles: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Match rss_articles rows and build keyword_alert_matches rows.
+
+        Title, description and content are scanned as one text.
+        """
+        rows = []
+        for article in articles:
+            text = "\n".join(
+                part for part in (article.get("title"), article.get("description"), article.get("content"))
+                if part
+            )
+            for alert_id, keywords in self.match_text(text).items():
+                rows.append({
+                    "alert_id": alert_id,
+                    "source": "rss",
+                    "source_id": article.get("id"),
+                    "title": article.get("title") or "",
+                    "url": article.get("link"),
+                    "matched_keywords": keywords
+                })
+        return rows
+
+
+# =============================================================================
+# Database sync
+# =============================================================================
+
+class KeywordAlertService:
+    """Loads alerts and new articles from Supabase and stores matches in bulk."""
+
+    def __init__(self, dry_run: bool = False, db=None):
+        """
+        Initialize service.
+
+        Args:
+            dry_run: If True, match but don't write to database
+            db: Database wrapper with a `.client` (default: get_database())
+        """
+        if db is None:
+            try:
+                from ..api.supabase_client import get_database
+            except ImportError:
+                import sys
+                sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+                from src.supabase_client import get_database
+            db = get_database()
+
+        self.db = db
+        self.dry_run = dry_run
+
+    def load_alerts(self) -> List[Dict[str, Any]]:
+        result = self.db.client.table('keyword_alerts') \
+            .select('id, keywords, exclude_keywords, sources, enabled, trigger_count') \
+            .eq('enabled', True) \
+            .execute()
+        return result.data or []
+
+    def get_cursor(self) -> Optional[str]:
+        result = self.db.client.table('sync_metadata') \
+            .select('last_sync_at') \
+            .eq('source', CURSOR_SOURCE) \
+            .execute()
+        return result.data[0]['last_sync_at'] if result.data else None
+
+    def fetch_articles(self, since: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch articles fetched at or after `since`, paged by (fetched_at, id).
+
+        The cursor is inclusive: articles sharing the cursor's timestamp are
+        fetched again rather than missed, and _existing_pairs drops their
+        matches. The id tiebreak keeps pages stable when timestamps tie.
+        """
+        articles = []
+        offset = 0
+        while True:
+            query = self.db.client.table('rss_articles') \
+                .select('id, title, link, description, content, fetched_at')
+            if since:
+                query = query.gte('fetched_at', since)
+            result = query.order('fetched_at') \
+                .order('id') \
+                .range(offset, offset + ARTICLE_PAGE_SIZE - 1) \
+                .execute()
+            page = result.data or []
+            articles.extend(page)
+            if len(page) < ARTICLE_PAGE_SIZE:
+                return articles
+            offset += ARTICLE_PAGE_SIZE
+
+    def _existing_pairs(self, article_ids: List[str]) -> Set[Tuple[str, str]]:
+        """(alert_id, source_id) pairs already stored, so reruns don't duplicate."""
+        pairs = set()
+        for i in range(0, len(article_ids), INSERT_CHUNK_SIZE):
+            result = self.db.client.table('keyword_alert_matches') \
+                .select('alert_id, source_id') \
+                .eq('source', 'rss') \
+                .in_('source_id', article_ids[i:i + INSERT_CHUNK_SIZE]) \
+                .execute()
+            pairs.update((row['alert_id'], row['source_id']) for row in result.data or [])
+        return pairs
+
+    def store_matches(self, rows: List[Dict[str, Any]], alerts: List[Dict[str, Any]]) -> int:
+        """Insert matches in chunks and bump trigger counters. Returns rows inserted."""
+        if not rows:
+            return 0
+
+        existing = self._existing_pairs(sorted({r['source_id'] for r in rows if r['source_id']}))
+        rows = [r for r in rows if (r['alert_id'], r['source_id']) not in existing]
+
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            self.db.client.table('keyword_alert_matches') \
+                .insert(rows[i:i + INSERT_CHUNK_SIZE]) \
+                .execute()
+
+        # One update per triggered alert (not per match)
+        per_alert = defaultdict(int)
+        for row in rows:
+            per_alert[row['alert_id']] += 1
+        counts = {a['id']: a.get('trigger_count') or 0 for a in alerts}
+        now = datetime.now(timezone.utc).isoformat()
+        for alert_id, count in per_alert.items():
+            self.db.client.table('keyword_alerts') \
+                .update({'trigger_count': counts.get(alert_id, 0) + count, 'last_triggered_at': now}) \
+                .eq('id', alert_id) \
+                .execute()
+
+        return len(rows)
+
+    def run(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Match articles fetched since the cursor (or `since`) against all alerts.
+
+        Returns:
+            Dict with counts for the run
+        """
+        started_at = datetime.now(timezone.utc).isoformat()
+        alerts = self.load_alerts()
+        matcher = KeywordAlertMatcher.from_alerts(alerts, source='rss')
+
+        since = since or self.get_cursor()
+        articles = self.fetch_articles(since)
+        rows = matcher.match_articles(articles)
+
+        logger.info(
+            f"Matched {len(articles)} articles against {len(matcher.alerts)} alerts "
+            f"({matcher.pattern_count} patterns): {len(rows)} matches"
+        )
+
+        inserted = 0
+        if not self.dry_run:
+            inserted = self.store_matches(rows, alerts)
+            cursor = articles[-1]['fetched_at'] if articles else (since or started_at)
+            self.db.client.table('sync_metadata') \
+                .upsert({
+                    'source': CURSOR_SOURCE,
+                    'last_sync_at': cursor,
+                    'last_sync_status': 'success',
+                    'records_synced': inserted
+                }, on_conflict='source') \
+                .execute()
+
+        return {
+            "since": since,
+            "alerts": len(matcher.alerts),
+            "patterns": matcher.pattern_count,
+            "articles": len(articles),
+            "matches": len(rows),
+            "inserted": inserted
+        }
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Match RSS articles against keyword alerts")
+    parser.add_argument("--since", help="Match articles fetched after this ISO timestamp")
+    parser.add_argument("--dry-run", action="store_true", help="Don't write matches")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    service = KeywordAlertService(dry_run=args.dry_run)
+    result = await asyncio.to_thread(service.run, args.since)
+
+    print("\n" + "-" * 60)
+    print("Keyword Alert Results:")
+    print(f"  Alerts: {result['alerts']} ({result['patterns']} patterns)")
+    print(f"  Articles: {result['articles']}")
+    print(f"  Matches: {result['matches']} (inserted {result['inserted']})")
+    print("-" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
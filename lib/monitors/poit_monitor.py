@@ -510,6 +510,19 @@ class POITMonitorService:
                     
             except Exception as e:
                 logger.warning(f"Error updating sync record: {e}")
+
+            # Bump the source version so API caches pick up the new data
+            try:
+                self.db.client.table('sync_metadata') \
+                    .upsert({
+                        "source": "poit_announcements",
+                        "last_sync_at": self.stats.sync_completed_at,
+                        "last_sync_status": self.stats.status,
+                        "records_synced": self.stats.announcements_new
+                    }, on_conflict='source') \
+                    .execute()
+            except Exception as e:
+                logger.warning(f"Error updating sync metadata: {e}")
         
         # Return results
         result = asdict(self.stats)
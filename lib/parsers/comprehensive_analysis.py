@@ -13,13 +13,9 @@ import os
 import sys
 import json
 import time
-import re
-import zipfile
-import io
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
-from decimal import Decimal, InvalidOperation
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -27,16 +23,16 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
-import requests
-
 # Import existing VDM client
 from src.scrapers.bolagsverket_vdm import get_bolagsverket_vdm_client
 from src.supabase_client import get_db
+from parsers.ixbrl import parse_xbrl_value, extract_xbrl_facts, analyze_ixbrl_archive  # noqa: F401
+from parsers.ixbrl_batch import ParseJob, parse_archives_parallel
 
 # Configuration
-API_BASE = "https://gw.api.bolagsverket.se/vardefulla-datamangder/v1"
 OUTPUT_DIR = Path("/Users/isak/Desktop/CLAUDE_CODE /projects/loop-auto/test_annual_reports/comprehensive")
 OUTPUT_DIR.mkdir(exist_ok=True)
+PARSE_WORKERS = int(os.environ.get("ANALYSIS_PARSE_WORKERS", os.cpu_count() or 1))
 
 # Test companies (randomly selected from database)
 TEST_COMPANIES = [
@@ -71,175 +67,12 @@ def get_database():
     return db
 
 
-def download_document(dokument_id: str) -> bytes | None:
-    """Download a document and return raw bytes."""
-    client = get_vdm_client()
-    token = client._get_token_sync()
-    if not token:
-        return None
-
-    response = requests.get(
-        f"{API_BASE}/dokument/{dokument_id}",
-        headers={"Authorization": f"Bearer {token}", "Accept": "*/*"},
-        timeout=120
-    )
-
-    if response.status_code != 200:
-        print(f"    Download error: {response.status_code}")
-        return None
-
-    return response.content
-
-
-def parse_xbrl_value(value_str: str, scale: int = 0, decimals: str = "0") -> float | None:
-    """Parse XBRL numeric value with scale and decimals."""
-    try:
-        # Remove spaces and convert Swedish decimal format
-        clean = value_str.replace(" ", "").replace("\xa0", "").replace(",", ".")
-        if not clean or clean == "-":
-            return None
-
-        value = float(clean)
-
-        # Apply scale (e.g., scale="3" means multiply by 1000)
-        if scale:
-            value = value * (10 ** scale)
-
-        return value
-    except (ValueError, InvalidOperation):
-        return None
-
-
-def extract_xbrl_facts(xhtml_content: str) -> dict:
-    """Extract all XBRL facts from XHTML content."""
-    facts = {
-        "numeric": [],      # ix:nonFraction
-        "text": [],         # ix:nonNumeric
-        "contexts": {},     # Context definitions
-        "units": {},        # Unit definitions
-        "namespaces": set() # All namespaces used
-    }
-
-    # Extract numeric facts (ix:nonFraction)
-    numeric_pattern = r'<ix:nonFraction\s+([^>]+)>([^<]*)</ix:nonFraction>'
-    for match in re.finditer(numeric_pattern, xhtml_content, re.DOTALL):
-        attrs_str = match.group(1)
-        value = match.group(2).strip()
-
-        # Parse attributes
-        attrs = {}
-        for attr_match in re.finditer(r'(\w+)=["\']([^"\']*)["\']', attrs_str):
-            attrs[attr_match.group(1)] = attr_match.group(2)
-
-        fact_name = attrs.get("name", "")
-        if ":" in fact_name:
-            namespace = fact_name.split(":")[0]
-            facts["namespaces"].add(namespace)
-
-        scale = int(attrs.get("scale", 0))
-        parsed_value = parse_xbrl_value(value, scale)
-
-        facts["numeric"].append({
-            "name": fact_name,
-            "value_raw": value,
-            "value_parsed": parsed_value,
-            "context": attrs.get("contextRef", ""),
-            "unit": attrs.get("unitRef", ""),
-            "decimals": attrs.get("decimals", ""),
-            "scale": scale,
-        })
-
-    # Extract text facts (ix:nonNumeric)
-    text_pattern = r'<ix:nonNumeric\s+([^>]+)>([^<]*)</ix:nonNumeric>'
-    for match in re.finditer(text_pattern, xhtml_content, re.DOTALL):
-        attrs_str = match.group(1)
-        value = match.group(2).strip()
-
-        attrs = {}
-        for attr_match in re.finditer(r'(\w+)=["\']([^"\']*)["\']', attrs_str):
-            attrs[attr_match.group(1)] = attr_match.group(2)
-
-        fact_name = attrs.get("name", "")
-        if ":" in fact_name:
-            namespace = fact_name.split(":")[0]
-            facts["namespaces"].add(namespace)
-
-        facts["text"].append({
-            "name": fact_name,
-            "value": value,
-            "context": attrs.get("contextRef", ""),
-        })
-
-    # Extract context definitions
-    context_pattern = r'<xbrli:context\s+id=["\']([^"\']+)["\']>(.*?)</xbrli:context>'
-    for match in re.finditer(context_pattern, xhtml_content, re.DOTALL):
-        context_id = match.group(1)
-        context_content = match.group(2)
-
-        # Extract period
-        period_match = re.search(r'<xbrli:instant>([^<]+)</xbrli:instant>', context_content)
-        if period_match:
-            facts["contexts"][context_id] = {"type": "instant", "date": period_match.group(1)}
-        else:
-            start_match = re.search(r'<xbrli:startDate>([^<]+)</xbrli:startDate>', context_content)
-            end_match = re.search(r'<xbrli:endDate>([^<]+)</xbrli:endDate>', context_content)
-            if start_match and end_match:
-                facts["contexts"][context_id] = {
-                    "type": "duration",
-                    "start": start_match.group(1),
-                    "end": end_match.group(1)
-                }
-
-    return facts
-
-
-def analyze_ixbrl_archive(content: bytes, orgnr: str, doc_info: dict) -> dict:
-    """Analyze an iXBRL ZIP archive."""
-    analysis = {
-        "orgnr": orgnr,
-        "document_id": doc_info.get("dokumentId", ""),
-        "period_end": doc_info.get("rapporteringsperiodTom", ""),
-        "registration_date": doc_info.get("registreringstidpunkt", ""),
-        "file_format": doc_info.get("filformat", ""),
-        "file_size_kb": len(content) / 1024,
-        "is_zip": False,
-        "xhtml_files": [],
-        "all_facts": [],
-        "fact_names": set(),
-        "namespaces": set(),
-        "contexts": {},
-        "error": None,
-    }
-
-    # Check if ZIP
-    if content[:4] == b'PK\x03\x04':
-        analysis["is_zip"] = True
-        try:
-            with zipfile.ZipFile(io.BytesIO(content)) as zf:
-                for fname in zf.namelist():
-                    if fname.endswith('.xhtml') or fname.endswith('.html'):
-                        analysis["xhtml_files"].append(fname)
-                        xhtml_content = zf.read(fname).decode('utf-8', errors='ignore')
-
-                        # Extract XBRL facts
-                        facts = extract_xbrl_facts(xhtml_content)
-                        analysis["all_facts"].extend(facts["numeric"])
-                        analysis["all_facts"].extend([{**f, "type": "text"} for f in facts["text"]])
-                        analysis["namespaces"].update(facts["namespaces"])
-                        analysis["contexts"].update(facts["contexts"])
-
-                        for f in facts["numeric"]:
-                            analysis["fact_names"].add(f["name"])
-                        for f in facts["text"]:
-                            analysis["fact_names"].add(f["name"])
-        except Exception as e:
-            analysis["error"] = str(e)
-
-    # Convert sets to lists for JSON serialization
-    analysis["fact_names"] = list(analysis["fact_names"])
-    analysis["namespaces"] = list(analysis["namespaces"])
-
-    return analysis
+def download_document(dokument_id: str):
+    """Download a document into a spooled temp file (cached on disk by the client). Caller closes it."""
+    archive = get_vdm_client().download_document_file(dokument_id, timeout=120)
+    if archive is None:
+        print(f"    Download error: {dokument_id}")
+    return archive
 
 
 def get_existing_db_data(orgnr: str) -> dict:
@@ -303,6 +136,7 @@ def main():
         "all_namespaces": set(),
         "fact_name_by_company": defaultdict(set),  # orgnr -> set of fact_names
     }
+    parse_jobs = []
 
     print(f"\nAnalyzing {len(TEST_COMPANIES)} companies...")
     print("-" * 80)
@@ -331,7 +165,7 @@ def main():
             all_results["companies"].append(company_result)
             continue
 
-        # Download and analyze ALL documents
+        # Download ALL documents (cached on disk); they are parsed in parallel below
         for i, doc in enumerate(docs):
             doc_id = doc.get("dokumentId")
             period_end = doc.get("rapporteringsperiodTom", "")
@@ -339,65 +173,12 @@ def main():
 
             print(f"\n  [{i+1}/{len(docs)}] Year {year}: Downloading...")
 
-            content = download_document(doc_id)
-            if not content:
+            archive = download_document(doc_id)
+            if archive is None:
                 print(f"    ✗ Download failed")
                 continue
-
-            print(f"    ✓ Downloaded {len(content)/1024:.1f} KB")
-
-            # Analyze
-            analysis = analyze_ixbrl_archive(content, orgnr, doc)
-
-            if analysis["error"]:
-                print(f"    ✗ Analysis error: {analysis['error']}")
-            else:
-                print(f"    ✓ Extracted {len(analysis['all_facts'])} facts")
-                print(f"    ✓ Unique fact names: {len(analysis['fact_names'])}")
-                print(f"    ✓ Namespaces: {analysis['namespaces']}")
-
-            # Store analysis (without heavy data)
-            doc_summary = {
-                "document_id": doc_id,
-                "year": year,
-                "period_end": period_end,
-                "file_size_kb": analysis["file_size_kb"],
-                "xhtml_files": analysis["xhtml_files"],
-                "fact_count": len(analysis["all_facts"]),
-                "fact_names": analysis["fact_names"],
-                "namespaces": analysis["namespaces"],
-                "contexts": analysis["contexts"],
-            }
-            company_result["documents"].append(doc_summary)
-            company_result["years_available"].append(year)
-            company_result["total_facts"] += len(analysis["all_facts"])
-            company_result["unique_fact_names"].update(analysis["fact_names"])
-
-            # Track global statistics
-            all_results["total_documents"] += 1
-            all_results["total_facts_extracted"] += len(analysis["all_facts"])
-            all_results["all_namespaces"].update(analysis["namespaces"])
-
-            for fact_name in analysis["fact_names"]:
-                all_results["all_fact_names"][fact_name] += 1
-                all_results["fact_name_by_company"][orgnr].add(fact_name)
-
-            # Save raw facts for this document
-            facts_file = OUTPUT_DIR / f"{orgnr}_{year}_facts.json"
-            with open(facts_file, 'w', encoding='utf-8') as f:
-                # Filter to numeric facts with values
-                numeric_facts = [
-                    {
-                        "name": fact["name"],
-                        "value": fact.get("value_parsed"),
-                        "value_raw": fact.get("value_raw", fact.get("value", "")),
-                        "context": fact.get("context", ""),
-                        "unit": fact.get("unit", ""),
-                    }
-                    for fact in analysis["all_facts"]
-                    if fact.get("value_parsed") is not None or fact.get("value")
-                ]
-                json.dump(numeric_facts, f, indent=2, ensure_ascii=False)
+            archive.close()
+            parse_jobs.append(ParseJob(orgnr, doc))
 
             time.sleep(1)  # Rate limiting
 
@@ -411,17 +192,78 @@ def main():
             "db_years": [f.get("year") for f in db_data["financials"]],
         }
         print(f"    DB financials: {len(db_data['financials'])} years")
-        print(f"    API reports: {len(company_result['years_available'])} years")
-
-        # Convert set to list for JSON
-        company_result["unique_fact_names"] = list(company_result["unique_fact_names"])
+        print(f"    API reports: {len(docs)} documents")
 
         all_results["companies"].append(company_result)
         all_results["companies_analyzed"] += 1
 
         time.sleep(2)  # Rate limiting between companies
 
+    # Parse all downloaded documents in a process pool
+    print(f"\nParsing {len(parse_jobs)} documents with {PARSE_WORKERS} processes...")
+    companies_by_orgnr = {c["orgnr"]: c for c in all_results["companies"]}
+    for job, report in parse_archives_parallel(parse_jobs, workers=PARSE_WORKERS):
+        orgnr, doc = job.orgnr, job.doc
+        company_result = companies_by_orgnr[orgnr]
+        doc_id = doc.get("dokumentId")
+        period_end = doc.get("rapporteringsperiodTom", "")
+        year = period_end[:4] if period_end else "unknown"
+        analysis = report.to_analysis()
+
+        print(f"\n  {orgnr} {year}: {analysis['file_size_kb']:.1f} KB")
+        if analysis["error"]:
+            print(f"    ✗ Analysis error: {analysis['error']}")
+        else:
+            print(f"    ✓ Extracted {len(analysis['all_facts'])} facts")
+            print(f"    ✓ Unique fact names: {len(analysis['fact_names'])}")
+            print(f"    ✓ Namespaces: {analysis['namespaces']}")
+
+        # Store analysis (without heavy data)
+        doc_summary = {
+            "document_id": doc_id,
+            "year": year,
+            "period_end": period_end,
+            "file_size_kb": analysis["file_size_kb"],
+            "xhtml_files": analysis["xhtml_files"],
+            "fact_count": len(analysis["all_facts"]),
+            "fact_names": analysis["fact_names"],
+            "namespaces": analysis["namespaces"],
+            "contexts": analysis["contexts"],
+        }
+        company_result["documents"].append(doc_summary)
+        company_result["years_available"].append(year)
+        company_result["total_facts"] += len(analysis["all_facts"])
+        company_result["unique_fact_names"].update(analysis["fact_names"])
+
+        # Track global statistics
+        all_results["total_documents"] += 1
+        all_results["total_facts_extracted"] += len(analysis["all_facts"])
+        all_results["all_namespaces"].update(analysis["namespaces"])
+
+        for fact_name in analysis["fact_names"]:
+            all_results["all_fact_names"][fact_name] += 1
+            all_results["fact_name_by_company"][orgnr].add(fact_name)
+
+        # Save raw facts for this document
+        facts_file = OUTPUT_DIR / f"{orgnr}_{year}_facts.json"
+        with open(facts_file, 'w', encoding='utf-8') as f:
+            # Filter to numeric facts with values
+            numeric_facts = [
+                {
+                    "name": fact["name"],
+                    "value": fact.get("value_parsed"),
+                    "value_raw": fact.get("value_raw", fact.get("value", "")),
+                    "context": fact.get("context", ""),
+                    "unit": fact.get("unit", ""),
+                }
+                for fact in analysis["all_facts"]
+                if fact.get("value_parsed") is not None or fact.get("value")
+            ]
+            json.dump(numeric_facts, f, indent=2, ensure_ascii=False)
+
     # Convert sets to lists
+    for company_result in all_results["companies"]:
+        company_result["unique_fact_names"] = list(company_result["unique_fact_names"])
     all_results["all_namespaces"] = list(all_results["all_namespaces"])
     all_results["fact_name_by_company"] = {k: list(v) for k, v in all_results["fact_name_by_company"].items()}
 
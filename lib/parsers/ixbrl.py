@@ -0,0 +1,457 @@
+"""
+iXBRL parsing for Bolagsverket annual reports
+
+Pure functions (no clients, no I/O) shared by the analysis script and the
+bulk annual-report sync:
+- parse_xbrl_value: numeric fact value with Swedish formatting and scale
+  (exact; see xbrl_values for the batch version)
+- extract_xbrl_facts: facts, contexts and namespaces from one XHTML file
+  (one regex scan per tag type; kept as the reference implementation)
+- XbrlFactScanner / extract_xbrl_facts_single_pass: one event-driven pass
+  collecting facts, contexts and units, with nested markup inside facts
+  handled, fed incrementally
+- analyze_ixbrl_archive: all facts in a downloaded ZIP archive (bytes or
+  a seekable file, e.g. a spooled download); members are streamed, never
+  read or decoded whole
+"""
+
+import io
+import re
+import codecs
+import zipfile
+from decimal import Decimal
+from html import unescape
+from typing import BinaryIO, Dict, List, Optional, Union
+
+try:
+    from .xbrl_values import NUMPY_AVAILABLE, normalize_xbrl_values, parse_decimal, to_float64
+except ImportError:
+    from xbrl_values import NUMPY_AVAILABLE, normalize_xbrl_values, parse_decimal, to_float64
+
+STREAM_READ_BYTES = 64 * 1024
+
+# The only tags the single-pass scanner reacts to; layout markup (most of
+# a report) is skipped by the regex engine and never reaches Python.
+# Flat facts and leaf elements match whole (one event); anything with
+# nested markup falls through to separate start/end tag events.
+_EVENT_TAG = re.compile(
+    r"<(?=/?(?:ix|xbrli):)(?:"
+    r"(?P<fact>ix:nonFraction|ix:nonNumeric)(?P<fact_attrs>\s[^>]*)?>(?P<fact_value>[^<]*)</(?P=fact)>"
+    r"|xbrli:(?P<leaf>instant|startDate|endDate|measure)>(?P<leaf_value>[^<]*)</xbrli:(?P=leaf)>"
+    r"|(?P<closing>/?)(?P<tag>ix:nonFraction|ix:nonNumeric|ix:exclude|xbrli:context|xbrli:instant"
+    r"|xbrli:startDate|xbrli:endDate|xbrli:unit|xbrli:unitDenominator|xbrli:measure)(?=[\s/>])(?P<attrs>[^>]*)>"
+    r")"
+)
+_ATTR = re.compile(r"""([\w:.-]+)\s*=\s*["']([^"']*)["']""")
+_MARKUP = re.compile(r"<[^>]*>")
+
+_PERIOD_FIELDS = {"xbrli:instant": "instant", "xbrli:startDate": "startDate", "xbrli:endDate": "endDate"}
+_LEAF_TAGS = {"instant": "xbrli:instant", "startDate": "xbrli:startDate", "endDate": "xbrli:endDate",
+              "measure": "xbrli:measure"}
+
+
+def parse_xbrl_value(value_str: str, scale: int = 0, decimals: str = "0") -> float | None:
+    """Parse XBRL numeric value with scale; exact, then rounded once to float."""
+    parsed = parse_decimal(value_str, scale)
+    if parsed is None:
+        return None
+    mantissa, exponent = parsed
+    return float(Decimal(mantissa).scaleb(exponent))
+
+
+def extract_xbrl_facts(xhtml_content: str) -> dict:
+    """Extract all XBRL facts from XHTML content."""
+    facts = {
+        "numeric": [],      # ix:nonFraction
+        "text": [],         # ix:nonNumeric
+        "contexts": {},     # Context definitions
+        "units": {},        # Unit definitions
+        "namespaces": set() # All namespaces used
+    }
+
+    # Extract numeric facts (ix:nonFraction)
+    numeric_pattern = r'<ix:nonFraction\s+([^>]+)>([^<]*)</ix:nonFraction>'
+    for match in re.finditer(numeric_pattern, xhtml_content, re.DOTALL):
+        attrs_str = match.group(1)
+        value = match.group(2).strip()
+
+        # Parse attributes
+        attrs = {}
+        for attr_match in re.finditer(r'(\w+)=["\']([^"\']*)["\']', attrs_str):
+            attrs[attr_match.group(1)] = attr_match.group(2)
+
+        fact_name = attrs.get("name", "")
+        if ":" in fact_name:
+            namespace = fact_name.split(":")[0]
+            facts["namespaces"].add(namespace)
+
+        scale = int(attrs.get("scale", 0))
+        parsed_value = parse_xbrl_value(value, scale)
+
+        facts["numeric"].append({
+            "name": fact_name,
+            "value_raw": value,
+            "value_parsed": parsed_value,
+            "context": attrs.get("contextRef", ""),
+            "unit": attrs.get("unitRef", ""),
+            "decimals": attrs.get("decimals", ""),
+            "scale": scale,
+        })
+
+    # Extract text facts (ix:nonNumeric)
+    text_pattern = r'<ix:nonNumeric\s+([^>]+)>([^<]*)</ix:nonNumeric>'
+    for match in re.finditer(text_pattern, xhtml_content, re.DOTALL):
+        attrs_str = match.group(1)
+        value = match.group(2).strip()
+
+        attrs = {}
+        for attr_match in re.finditer(r'(\w+)=["\']([^"\']*)["\']', attrs_str):
+            attrs[attr_match.group(1)] = attr_match.group(2)
+
+        fact_name = attrs.get("name", "")
+        if ":" in fact_name:
+            namespace = fact_name.split(":")[0]
+            facts["namespaces"].add(namespace)
+
+        facts["text"].append({
+            "name": fact_name,
+            "value": value,
+            "context": attrs.get("contextRef", ""),
+        })
+
+    # Extract context definitions
+    context_pattern = r'<xbrli:context\s+id=["\']([^"\']+)["\']>(.*?)</xbrli:context>'
+    for match in re.finditer(context_pattern, xhtml_content, re.DOTALL):
+        context_id = match.group(1)
+        context_content = match.group(2)
+
+        # Extract period
+        period_match = re.search(r'<xbrli:instant>([^<]+)</xbrli:instant>', context_content)
+        if period_match:
+            facts["contexts"][context_id] = {"type": "instant", "date": period_match.group(1)}
+        else:
+            start_match = re.search(r'<xbrli:startDate>([^<]+)</xbrli:startDate>', context_content)
+            end_match = re.search(r'<xbrli:endDate>([^<]+)</xbrli:endDate>', context_content)
+            if start_match and end_match:
+                facts["contexts"][context_id] = {
+                    "type": "duration",
+                    "start": start_match.group(1),
+                    "end": end_match.group(1)
+                }
+
+    return facts
+
+
+class XbrlFactScanner:
+    """
+    Single-pass, event-driven XBRL fact extractor.
+
+    One regex finds the start/end tags of ix facts, ix:exclude and the
+    xbrli context/unit elements; a small state machine turns those events
+    into facts. Text between events is captured for every open fact, so
+    facts nested in facts (numbers inside a text block) and values wrapped
+    in markup (<span>1 250</span>) come out whole.
+
+    Same result shape as extract_xbrl_facts, with these differences:
+    - fact values include text in nested markup, minus ix:exclude, with
+      entities decoded
+    - numeric values honour sign="-", and are parsed exactly in one batch
+      when the scan is closed (normalize_xbrl_values)
+    - contexts are found regardless of attribute order; units are filled in
+      ("iso4217:SEK", "iso4217:SEK/xbrli:shares")
+
+    Usage:
+        scanner = XbrlFactScanner()
+        for text in chunks:
+            scanner.feed(text)
+        facts = scanner.close()
+    """
+
+    def __init__(self):
+        self.facts = {
+            "numeric": [],
+            "text": [],
+            "contexts": {},
+            "units": {},
+            "namespaces": set()
+        }
+        self._pending = ""  # unprocessed tail (an incomplete tag)
+        # sign attribute per numeric fact; facts before _parsed have values
+        self._signs: List[Optional[str]] = []
+        self._parsed = 0
+        # Open ix facts: [kind, attrs, text parts]
+        self._open: List[list] = []
+        self._exclude_depth = 0
+        self._context: Optional[Dict[str, str]] = None
+        self._period_field: Optional[str] = None
+        self._unit: Optional[Dict[str, List[str]]] = None
+        self._unit_part = "measures"
+        self._measure: Optional[List[str]] = None
+
+    def feed(self, text: str):
+        text = self._pending + text
+        # Hold back an unfinished tag for the next chunk
+        last_open = text.rfind("<")
+        if last_open != -1 and text.find(">", last_open) == -1:
+            self._pending = text[last_open:]
+            text = text[:last_open]
+        else:
+            self._pending = ""
+        self._scan(text)
+
+    def close(self) -> dict:
+        if self._pending:
+            self._scan(self._pending)
+            self._pending = ""
+        self._parse_values()
+        return self.facts
+
+    def _parse_values(self):
+        numeric = self.facts["numeric"][self._parsed:]
+        signs = self._signs[self._parsed:]
+        if not numeric:
+            return
+        if NUMPY_AVAILABLE:
+            values = to_float64(*normalize_xbrl_values(
+                [f["value_raw"] for f in numeric], [f["scale"] for f in numeric], signs
+            )).tolist()
+            for fact, value in zip(numeric, values):
+                fact["value_parsed"] = None if value != value else value  # NaN: not a number
+        else:
+            for fact, sign in zip(numeric, signs):
+                parsed = parse_decimal(fact["value_raw"], fact["scale"], sign)
+                fact["value_parsed"] = None if parsed is None else float(Decimal(parsed[0]).scaleb(parsed[1]))
+        self._parsed = len(self.facts["numeric"])
+
+    # =========================================================================
+    # EVENTS
+    # =========================================================================
+
+    def _capturing(self) -> bool:
+        return bool((self._open and not self._exclude_depth) or self._period_field or self._measure is not None)
+
+    def _capture(self, text: str):
+        if self._open and not self._exclude_depth:
+            for fact in self._open:
+                fact[2].append(text)
+        if self._period_field:
+            self._context[self._period_field] += text
+        if self._measure is not None:
+            self._measure.append(text)
+
+    def _scan(self, text: str):
+        pos = 0
+        capturing = self._capturing()
+        add_fact = self._add_fact
+        for match in _EVENT_TAG.finditer(text):
+            fact, fact_attrs, fact_value, leaf, leaf_value, closing, tag, attrs_str = match.groups()
+            if capturing:
+                start = match.start()
+                if start > pos:
+                    self._capture(text[pos:start])
+            pos = match.end()
+
+            if fact:
+                # Whole flat fact in one event
+                if capturing:
+                    self._capture(fact_value)
+                add_fact(fact, _parse_attrs(fact_attrs) if fact_attrs else {}, _clean_text(fact_value))
+                continue
+
+            if leaf:
+                tag = _LEAF_TAGS[leaf]
+                self._start(tag, {})
+                self._capture(leaf_value)
+                self._end(tag)
+            elif closing:
+                self._end(tag)
+            else:
+                self._start(tag, _parse_attrs(attrs_str))
+                if attrs_str.endswith("/"):
+                    self._end(tag)
+            capturing = self._capturing()
+
+        if capturing and pos < len(text):
+            self._capture(text[pos:])
+
+    def _start(self, tag: str, attrs: Dict[str, str]):
+        if tag == "ix:nonFraction" or tag == "ix:nonNumeric":
+            self._open.append([tag, attrs, []])
+        elif tag == "ix:exclude":
+            self._exclude_depth += 1
+        elif tag == "xbrli:context":
+            self._context = {"id": attrs.get("id", "")}
+        elif tag in _PERIOD_FIELDS:
+            if self._context is not None:
+                self._period_field = _PERIOD_FIELDS[tag]
+                self._context.setdefault(self._period_field, "")
+        elif tag == "xbrli:unit":
+            self._unit = {"id": attrs.get("id", ""), "measures": [], "denominator": []}
+            self._unit_part = "measures"
+        elif tag == "xbrli:unitDenominator":
+            self._unit_part = "denominator"
+        elif tag == "xbrli:measure" and self._unit is not None:
+            self._measure = []
+
+    def _end(self, tag: str):
+        if tag == "ix:nonFraction" or tag == "ix:nonNumeric":
+            # Close the innermost fact of this kind (tolerates sloppy nesting)
+            for i in range(len(self._open) - 1, -1, -1):
+                if self._open[i][0] == tag:
+                    _, attrs, parts = self._open.pop(i)
+                    self._add_fact(tag, attrs, _clean_text(_MARKUP.sub("", "".join(parts))))
+                    break
+        elif tag == "ix:exclude":
+            self._exclude_depth = max(0, self._exclude_depth - 1)
+        elif tag == "xbrli:context":
+            if self._context is not None:
+                self._add_context(self._context)
+                self._context = None
+        elif tag in _PERIOD_FIELDS:
+            self._period_field = None
+        elif tag == "xbrli:measure":
+            if self._measure is not None:
+                self._unit[self._unit_part].append(_clean_text("".join(self._measure)))
+                self._measure = None
+        elif tag == "xbrli:unit" and self._unit is not None:
+            unit = "*".join(self._unit["measures"])
+            if self._unit["denominator"]:
+                unit += "/" + "*".join(self._unit["denominator"])
+            self.facts["units"][self._unit["id"]] = unit
+            self._unit = None
+
+    # =========================================================================
+    # RESULTS
+    # =========================================================================
+
+    def _add_fact(self, tag: str, attrs: Dict[str, str], value: str):
+        fact_name = attrs.get("name", "")
+        if ":" in fact_name:
+            self.facts["namespaces"].add(fact_name.split(":")[0])
+
+        if tag == "ix:nonNumeric":
+            self.facts["text"].append({
+                "name": fact_name,
+                "value": value,
+                "context": attrs.get("contextRef", ""),
+            })
+            return
+
+        try:
+            scale = int(attrs.get("scale", 0))
+        except ValueError:
+            scale = 0
+        # value_parsed is filled in by close(), for all facts at once
+        self._signs.append(attrs.get("sign"))
+
+        self.facts["numeric"].append({
+            "name": fact_name,
+            "value_raw": value,
+            "value_parsed": None,
+            "context": attrs.get("contextRef", ""),
+            "unit": attrs.get("unitRef", ""),
+            "decimals": attrs.get("decimals", ""),
+            "scale": scale,
+        })
+
+    def _add_context(self, context: Dict[str, str]):
+        if "instant" in context:
+            self.facts["contexts"][context["id"]] = {"type": "instant", "date": context["instant"].strip()}
+        elif "startDate" in context and "endDate" in context:
+            self.facts["contexts"][context["id"]] = {
+                "type": "duration",
+                "start": context["startDate"].strip(),
+                "end": context["endDate"].strip()
+            }
+
+
+def _parse_attrs(attrs_str: str) -> Dict[str, str]:
+    attrs = dict(_ATTR.findall(attrs_str))
+    if "&" in attrs_str:
+        attrs = {key: unescape(value) for key, value in attrs.items()}
+    return attrs
+
+
+def _clean_text(text: str) -> str:
+    return (unescape(text) if "&" in text else text).strip()
+
+
+def extract_xbrl_facts_single_pass(source: Union[bytes, str, BinaryIO]) -> dict:
+    """
+    Extract all XBRL facts with XbrlFactScanner.
+
+    Binary streams are decoded incrementally (UTF-8) and fed in chunks, so
+    only the facts and one chunk are held in memory.
+    """
+    scanner = XbrlFactScanner()
+    if isinstance(source, str):
+        scanner.feed(source)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        scanner.feed(bytes(source).decode("utf-8", errors="ignore"))
+    else:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        while True:
+            chunk = source.read(STREAM_READ_BYTES)
+            scanner.feed(decoder.decode(chunk, final=not chunk))
+            if not chunk:
+                break
+    return scanner.close()
+
+
+def analyze_ixbrl_archive(content: Union[bytes, BinaryIO], orgnr: str, doc_info: dict) -> dict:
+    """Analyze an iXBRL ZIP archive, given as bytes or a seekable binary file."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        archive = io.BytesIO(content)
+    else:
+        archive = content
+    archive.seek(0, io.SEEK_END)
+    size = archive.tell()
+    archive.seek(0)
+    magic = archive.read(4)
+    archive.seek(0)
+
+    analysis = {
+        "orgnr": orgnr,
+        "document_id": doc_info.get("dokumentId", ""),
+        "period_end": doc_info.get("rapporteringsperiodTom", ""),
+        "registration_date": doc_info.get("registreringstidpunkt", ""),
+        "file_format": doc_info.get("filformat", ""),
+        "file_size_kb": size / 1024,
+        "is_zip": False,
+        "xhtml_files": [],
+        "all_facts": [],
+        "fact_names": set(),
+        "namespaces": set(),
+        "contexts": {},
+        "error": None,
+    }
+
+    # Check if ZIP
+    if magic == b'PK\x03\x04':
+        analysis["is_zip"] = True
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                for fname in zf.namelist():
+                    if fname.endswith('.xhtml') or fname.endswith('.html'):
+                        analysis["xhtml_files"].append(fname)
+
+                        # Extract XBRL facts in one pass, streaming the member
+                        with zf.open(fname) as member:
+                            facts = extract_xbrl_facts_single_pass(member)
+                        analysis["all_facts"].extend(facts["numeric"])
+                        analysis["all_facts"].extend([{**f, "type": "text"} for f in facts["text"]])
+                        analysis["namespaces"].update(facts["namespaces"])
+                        analysis["contexts"].update(facts["contexts"])
+
+                        for f in facts["numeric"]:
+                            analysis["fact_names"].add(f["name"])
+                        for f in facts["text"]:
+                            analysis["fact_names"].add(f["name"])
+        except Exception as e:
+            analysis["error"] = str(e)
+
+    # Convert sets to lists for JSON serialization
+    analysis["fact_names"] = list(analysis["fact_names"])
+    analysis["namespaces"] = list(analysis["namespaces"])
+
+    return analysis
@@ -0,0 +1,287 @@
+"""
+Parallel iXBRL parsing for batches of annual reports
+
+Parsing is CPU-bound, so a batch (e.g. re-parsing every stored report
+after a taxonomy change) is fanned out to a process pool:
+- jobs are sent in chunks, so per-task overhead is paid once per chunk
+- workers read archives themselves (from a path or the document cache);
+  only the job description crosses the process boundary on the way in
+- results come back as CompactReport: facts in typed arrays indexing one
+  string table, instead of pickled lists of per-fact dicts
+- results are yielded as chunks complete, with a bounded number of chunks
+  in flight, so memory stays flat however long the batch is
+- a worker that dies (e.g. out of memory) breaks the pool: the chunks in
+  flight are reported failed and the rest go to a new pool
+
+CompactReport.to_analysis() gives the same dict as analyze_ixbrl_archive.
+"""
+
+import os
+import math
+from array import array
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    from .ixbrl import analyze_ixbrl_archive
+except ImportError:
+    from ixbrl import analyze_ixbrl_archive
+
+# Jobs per task sent to a worker, and chunks in flight per worker
+CHUNK_SIZE = 8
+MAX_CHUNK_SIZE = 32
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+class ParseJob(NamedTuple):
+    """One archive to parse; without a path it is read from the document cache by dokumentId."""
+    orgnr: str
+    doc: Dict[str, Any]
+    path: Optional[str] = None
+
+
+@dataclass
+class CompactReport:
+    """
+    Parsed annual report in columnar form.
+
+    Fact i has name strings[name[i]], context strings[context[i]] and so
+    on; value is NaN where the numeric value could not be parsed. For text
+    facts (is_text[i] == 1) raw holds the text and unit/decimals are "".
+    """
+    orgnr: str
+    document_id: str
+    period_end: str
+    registration_date: str
+    file_format: str
+    file_size_kb: float
+    is_zip: bool
+    xhtml_files: List[str]
+    namespaces: List[str]
+    contexts: Dict[str, Dict[str, str]]
+    error: Optional[str] = None
+    strings: List[str] = field(default_factory=list)
+    is_text: array = field(default_factory=lambda: array("b"))
+    name: array = field(default_factory=lambda: array("I"))
+    context: array = field(default_factory=lambda: array("I"))
+    unit: array = field(default_factory=lambda: array("I"))
+    decimals: array = field(default_factory=lambda: array("I"))
+    raw: array = field(default_factory=lambda: array("I"))
+    scale: array = field(default_factory=lambda: array("i"))
+    value: array = field(default_factory=lambda: array("d"))
+
+    @classmethod
+    def from_analysis(cls, analysis: Dict[str, Any]) -> "CompactReport":
+        report = cls(
+            orgnr=analysis["orgnr"],
+            document_id=analysis["document_id"],
+            period_end=analysis["period_end"],
+            registration_date=analysis["registration_date"],
+            file_format=analysis["file_format"],
+            file_size_kb=analysis["file_size_kb"],
+            is_zip=analysis["is_zip"],
+            xhtml_files=analysis["xhtml_files"],
+            namespaces=analysis["namespaces"],
+            contexts=analysis["contexts"],
+            error=analysis["error"],
+        )
+        index: Dict[str, int] = {}
+
+        def intern(s: str) -> int:
+            i = index.get(s)
+            if i is None:
+                i = index[s] = len(report.strings)
+                report.strings.append(s)
+            return i
+
+        for fact in analysis["all_facts"]:
+            text = fact.get("type") == "text"
+            report.is_text.append(1 if text else 0)
+            report.name.append(intern(fact["name"]))
+            report.context.append(intern(fact["context"]))
+            if text:
+                report.unit.append(intern(""))
+                report.decimals.append(intern(""))
+                report.raw.append(intern(fact["value"]))
+                report.scale.append(0)
+                report.value.append(math.nan)
+            else:
+                parsed = fact["value_parsed"]
+                report.unit.append(intern(fact["unit"]))
+                report.decimals.append(intern(fact["decimals"]))
+                report.raw.append(intern(fact["value_raw"]))
+                report.scale.append(fact["scale"])
+                report.value.append(math.nan if parsed is None else parsed)
+        return report
+
+    @property
+    def fact_count(self) -> int:
+        return len(self.name)
+
+    def fact_names(self) -> List[str]:
+        strings = self.strings
+        return list({strings[i] for i in self.name})
+
+    def to_analysis(self) -> Dict[str, Any]:
+        """Expand to the dict returned by analyze_ixbrl_archive."""
+        strings = self.strings
+        facts = []
+        for i in range(self.fact_count):
+            if self.is_text[i]:
+                facts.append({
+                    "name": strings[self.name[i]],
+                    "value": strings[self.raw[i]],
+                    "context": strings[self.context[i]],
+                    "type": "text",
+                })
+            else:
+                value = self.value[i]
+                facts.append({
+                    "name": strings[self.name[i]],
+                    "value_raw": strings[self.raw[i]],
+                    "value_parsed": None if math.isnan(value) else value,
+                    "context": strings[self.context[i]],
+                    "unit": strings[self.unit[i]],
+                    "decimals": strings[self.decimals[i]],
+                    "scale": self.scale[i],
+                })
+        return {
+            "orgnr": self.orgnr,
+            "document_id": self.document_id,
+            "period_end": self.period_end,
+            "registration_date": self.registration_date,
+            "file_format": self.file_format,
+            "file_size_kb": self.file_size_kb,
+            "is_zip": self.is_zip,
+            "xhtml_files": self.xhtml_files,
+            "all_facts": facts,
+            "fact_names": self.fact_names(),
+            "namespaces": self.namespaces,
+            "contexts": self.contexts,
+            "error": self.error,
+        }
+
+
+def _open_cached(dokument_id: str):
+    try:
+        from ..scrapers.document_cache import get_document_cache
+    except ImportError:
+        from scrapers.document_cache import get_document_cache
+    return get_document_cache().open(dokument_id)
+
+
+def _failed(job: ParseJob, error: str) -> CompactReport:
+    return CompactReport(
+        orgnr=job.orgnr,
+        document_id=job.doc.get("dokumentId", ""),
+        period_end=job.doc.get("rapporteringsperiodTom", ""),
+        registration_date=job.doc.get("registreringstidpunkt", ""),
+        file_format=job.doc.get("filformat", ""),
+        file_size_kb=0.0,
+        is_zip=False,
+        xhtml_files=[],
+        namespaces=[],
+        contexts={},
+        error=error,
+    )
+
+
+def parse_job(job: ParseJob) -> CompactReport:
+    """Parse one archive; problems are reported in CompactReport.error, not raised."""
+    try:
+        archive = open(job.path, "rb") if job.path else _open_cached(job.doc.get("dokumentId", ""))
+    except Exception as e:
+        return _failed(job, str(e))
+    if archive is None:
+        return _failed(job, "not in document cache")
+    with archive:
+        return CompactReport.from_analysis(analyze_ixbrl_archive(archive, job.orgnr, job.doc))
+
+
+def _parse_chunk(jobs: List[ParseJob]) -> List[CompactReport]:
+    return [parse_job(job) for job in jobs]
+
+
+def _chunks(jobs: Iterable[ParseJob], size: int) -> Iterator[List[ParseJob]]:
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_archives_parallel(
+    jobs: Iterable[ParseJob],
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[Tuple[ParseJob, CompactReport]]:
+    """
+    Parse archives in a process pool, yielding (job, report) as they complete.
+
+    Args:
+        jobs: Archives to parse (any iterable; consumed lazily)
+        workers: Processes (default: CPU count); 1 parses in this process
+        chunk_size: Jobs per task (default: spread a sized batch over
+            ~4 tasks per worker, within 1..MAX_CHUNK_SIZE)
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        if hasattr(jobs, "__len__"):
+            chunk_size = max(1, min(MAX_CHUNK_SIZE, len(jobs) // (workers * 4)))
+        else:
+            chunk_size = CHUNK_SIZE
+
+    if workers == 1:
+        for job in jobs:
+            yield job, parse_job(job)
+        return
+
+    chunks = _chunks(jobs, chunk_size)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    # future -> (chunk, executor it was submitted to)
+    pending = {}
+
+    def replace_broken(broken: ProcessPoolExecutor):
+        nonlocal executor
+        if executor is broken:
+            broken.shutdown(wait=False)
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit_next() -> bool:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        try:
+            future = executor.submit(_parse_chunk, chunk)
+        except BrokenProcessPool:
+            replace_broken(executor)
+            future = executor.submit(_parse_chunk, chunk)
+        pending[future] = (chunk, executor)
+        return True
+
+    try:
+        for _ in range(workers * CHUNKS_IN_FLIGHT_PER_WORKER):
+            if not submit_next():
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk, submitted_to = pending.pop(future)
+                try:
+                    reports = future.result()
+                except BrokenProcessPool as e:
+                    # Not retried: the chunk may be what killed the worker
+                    replace_broken(submitted_to)
+                    reports = [_failed(job, f"worker failed: {e}") for job in chunk]
+                except Exception as e:
+                    reports = [_failed(job, f"worker failed: {e}") for job in chunk]
+                submit_next()
+                yield from zip(chunk, reports)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,216 @@
+"""
+Exact numeric normalisation for XBRL fact values
+
+A displayed ix:nonFraction value becomes an exact decimal,
+mantissa * 10**exponent, with the fact's scale folded into the exponent:
+"1 234,5" with scale="3" is (12345, 2). Handles Swedish formatting
+(spaces, non-breaking spaces, decimal comma), negatives written with "-",
+U+2212 or parentheses, and the sign="-" attribute.
+
+- parse_decimal: one value, pure Python
+- normalize_xbrl_values: a whole batch in one NumPy pass over the bytes of
+  all values (int64 mantissas, int32 exponents); values the vector path
+  can't represent (more than 18 digits, exponent notation, stray
+  characters) go through parse_decimal
+- to_int64 / to_float64 / to_decimals: convert a normalised batch
+
+NumPy is optional; without it NUMPY_AVAILABLE is False and only
+parse_decimal can be used.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Largest digit count that always fits an int64 mantissa
+MAX_DIGITS = 18
+
+_CLEAN = str.maketrans({
+    "\u2212": "-",  # minus sign
+    "\u2013": "-",  # en dash
+    ",": ".",
+    " ": None,
+    "\xa0": None,
+    "\u202f": None,  # narrow no-break space
+    "\t": None,
+    "\n": None,
+    "\r": None,
+})
+
+
+def parse_decimal(value_str: str, scale: int = 0, sign: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """Exact (mantissa, exponent) for one displayed value, or None if it isn't a number."""
+    clean = value_str.translate(_CLEAN)
+    negative = False
+    if clean.startswith("(") and clean.endswith(")"):
+        clean = clean[1:-1]
+        negative = True
+    try:
+        value = Decimal(clean)
+    except InvalidOperation:
+        return None
+    if not value.is_finite():
+        return None
+
+    value_sign, digits, exponent = value.as_tuple()
+    mantissa = int("".join(map(str, digits)) or "0")
+    # A displayed minus, parentheses and sign="-" all mean the same
+    # negative value; they never cancel out
+    negative = negative or bool(value_sign) or sign == "-"
+    return (-mantissa if negative else mantissa), exponent + scale
+
+
+if NUMPY_AVAILABLE:
+    _POW10 = np.array([10 ** i for i in range(MAX_DIGITS + 1)], dtype=np.int64)
+    _POW10_FLOAT = np.array([float(10 ** i) for i in range(23)])  # exact up to 10**22
+    _INT64_MAX = np.iinfo(np.int64).max
+    _BYTE_DIGIT_0 = ord("0")
+    _BYTE_MINUS, _BYTE_OPEN, _BYTE_CLOSE = ord("-"), ord("("), ord(")")
+
+    # Byte classes for the vector path
+    _DIGIT, _DOT, _MINUS, _OPEN, _CLOSE, _OTHER, _END = range(7)
+    _CLASSES = 8
+    _BYTE_CLASS = np.full(256, _OTHER, dtype=np.int32)
+    _BYTE_CLASS[ord("0"):ord("9") + 1] = _DIGIT
+    _BYTE_CLASS[ord(".")] = _DOT
+    _BYTE_CLASS[_BYTE_MINUS] = _MINUS
+    _BYTE_CLASS[_BYTE_OPEN] = _OPEN
+    _BYTE_CLASS[_BYTE_CLOSE] = _CLOSE
+    _BYTE_CLASS[0] = _END
+
+
+def normalize_xbrl_values(
+    values: Sequence[str],
+    scales: Optional[Sequence[int]] = None,
+    signs: Optional[Sequence[Optional[str]]] = None,
+) -> "Tuple[np.ndarray, np.ndarray, np.ndarray]":
+    """
+    Normalise a batch of displayed values.
+
+    Args:
+        values: Displayed values (text of ix:nonFraction)
+        scales: scale attribute per value (default 0)
+        signs: sign attribute per value ("-" marks the value negative; default none)
+
+    Returns:
+        (mantissa int64, exponent int32, valid bool); value i is
+        mantissa[i] * 10**exponent[i] where valid[i]
+    """
+    n = len(values)
+    scales = np.zeros(n, dtype=np.int32) if scales is None else np.asarray(scales, dtype=np.int32)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=bool)
+
+    # All values in one NUL-terminated buffer; non-ASCII left after
+    # cleaning becomes "?" and marks the value irregular
+    text = "\x00".join(values).translate(_CLEAN) + "\x00"
+    buf = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)
+    ends = np.flatnonzero(buf == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Value index of every byte (its NUL included), and per value how
+    # many bytes of each class it has
+    seg = np.repeat(np.arange(n, dtype=np.int32), ends - starts + 1)
+    byte_class = _BYTE_CLASS[buf]
+    counts = np.bincount(seg * _CLASSES + byte_class, minlength=n * _CLASSES).reshape(n, _CLASSES)
+    digit_count = counts[:, _DIGIT]
+    minuses, opens, closes = counts[:, _MINUS], counts[:, _OPEN], counts[:, _CLOSE]
+
+    first = buf[starts]
+    last = buf[ends - 1]
+    negative = (minuses > 0) | (opens > 0)
+    # Only "-1234" and "(1234)" take the vector path
+    irregular = (
+        (counts[:, _OTHER] > 0)
+        | (digit_count > MAX_DIGITS)
+        | (counts[:, _DOT] > 1)
+        | (minuses > 1)
+        | (opens > 1)
+        | (opens != closes)
+        | ((minuses > 0) & ((first != _BYTE_MINUS) | (opens > 0)))
+        | ((opens > 0) & ((first != _BYTE_OPEN) | (last != _BYTE_CLOSE)))
+    )
+
+    # Only digits matter from here: for each, its value and how many
+    # digits (and decimal points) follow it within the same value
+    digit_pos = np.flatnonzero(byte_class == _DIGIT)
+    digit_seg = seg[digit_pos]
+    digits_through_value = np.cumsum(digit_count)
+    digits_after = digits_through_value[digit_seg] - np.arange(1, digit_pos.size + 1)
+    is_dot = byte_class == _DOT
+    dots_so_far = np.cumsum(is_dot, dtype=np.int32)
+    dots_before_value = dots_so_far[starts] - is_dot[starts]
+    after_dot = dots_so_far[digit_pos] > dots_before_value[digit_seg]
+    fraction_digits = np.bincount(digit_seg[after_dot], minlength=n)
+
+    terms = (buf[digit_pos] - _BYTE_DIGIT_0).astype(np.int64) * _POW10[np.minimum(digits_after, MAX_DIGITS)]
+    first_digit = digits_through_value - digit_count
+
+    mantissa = np.zeros(n, dtype=np.int64)
+    has_digits = digit_count > 0
+    if terms.size:
+        mantissa[has_digits] = np.add.reduceat(terms, first_digit[has_digits])
+
+    if signs is not None:
+        negative[[i for i, sign in enumerate(signs) if sign == "-"]] = True
+    mantissa = np.where(negative, -mantissa, mantissa)
+    exponent = scales - fraction_digits.astype(np.int32)
+    valid = has_digits & ~irregular
+
+    for i in np.flatnonzero(irregular):
+        parsed = parse_decimal(values[i], int(scales[i]), signs[i] if signs is not None else None)
+        if parsed is not None:
+            m, e = parsed
+            while abs(m) > _INT64_MAX and m % 10 == 0:  # 1234000...000 fits as 1234e+n
+                m, e = m // 10, e + 1
+            if abs(m) <= _INT64_MAX:
+                mantissa[i], exponent[i] = m, e
+                valid[i] = True
+                continue
+        valid[i] = False
+    return mantissa, exponent, valid
+
+
+def to_int64(mantissa: "np.ndarray", exponent: "np.ndarray", valid: "np.ndarray") -> "Tuple[np.ndarray, np.ndarray]":
+    """
+    Whole-number values as int64 (e.g. SEK amounts).
+
+    Returns:
+        (values, ok); ok is False where the value is invalid, has a
+        fraction or doesn't fit int64
+    """
+    values = np.zeros(len(mantissa), dtype=np.int64)
+    ok = valid & (exponent >= 0) & (exponent <= MAX_DIGITS)
+    idx = np.flatnonzero(ok)
+    factor = _POW10[exponent[idx]]
+    fits = np.abs(mantissa[idx]) <= _INT64_MAX // factor
+    values[idx[fits]] = mantissa[idx[fits]] * factor[fits]
+    ok[idx[~fits]] = False
+    return values, ok
+
+
+def to_float64(mantissa: "np.ndarray", exponent: "np.ndarray", valid: "np.ndarray") -> "np.ndarray":
+    """Nearest float64 to each exact value (NaN where invalid)."""
+    values = np.full(len(mantissa), np.nan)
+    # A mantissa below 2**53 and 10**|exponent| up to 10**22 are both exact
+    # floats, so one multiply or divide rounds correctly
+    fast = valid & (np.abs(mantissa) < 2 ** 53) & (np.abs(exponent) <= 22)
+    up = fast & (exponent >= 0)
+    down = fast & (exponent < 0)
+    values[up] = mantissa[up].astype(np.float64) * _POW10_FLOAT[exponent[up]]
+    values[down] = mantissa[down].astype(np.float64) / _POW10_FLOAT[-exponent[down]]
+    for i in np.flatnonzero(valid & ~fast):
+        values[i] = float(Decimal(int(mantissa[i])).scaleb(int(exponent[i])))
+    return values
+
+
+def to_decimals(mantissa: "np.ndarray", exponent: "np.ndarray", valid: "np.ndarray") -> list:
+    """Exact values as Decimal (None where invalid)."""
+    return [
+        Decimal(int(m)).scaleb(int(e)) if ok else None
+        for m, e, ok in zip(mantissa.tolist(), exponent.tolist(), valid.tolist())
+    ]
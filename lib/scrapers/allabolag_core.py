@@ -0,0 +1,650 @@
+"""
+Allabolag.se parsing core
+
+Turns allabolag page JSON into our company format. Shared by both
+AllabolagScraper classes (lib/scrapers/allabolag.py and
+src/scrapers/allabolag_scraper.py), so parsing fixes and speedups apply to
+both; the scrapers only fetch pages and store results.
+
+Handles:
+- Next.js pages (props.pageProps.company), with fallbacks for older keys
+- The old window.__INITIAL_DATA__ format (companyOverview)
+- Organisation pages (related companies)
+
+Usage:
+    main_data = extract_page_data(main_html)
+    org_data = extract_page_data(org_html)
+    company = structure_company(main_data, org_data, orgnr)
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .next_data import Html, extract_initial_data, extract_next_data
+
+# Map Allabolag account codes to our database fields
+ACCOUNT_CODE_MAP = {
+    # Resultaträkning
+    'SDI': 'revenue',
+    'AVI': 'other_income',
+    'RRK': 'operating_costs',
+    'RVK': 'raw_materials',
+    'HVK': 'goods',
+    'ADI': 'depreciation_intangible',
+    'ADK': 'depreciation_tangible',
+    'AEK': 'other_external_costs',
+    'LFL': 'inventory_change',
+    'RR': 'operating_profit',
+    'FI': 'financial_income',
+    'FK': 'financial_costs',
+    'RFFN': 'profit_after_financial',
+    'DR': 'net_profit',
+
+    # Balansräkning - Tillgångar
+    'SIA': 'intangible_assets',
+    'SMA': 'tangible_assets',
+    'SFA': 'financial_assets',
+    'SVL': 'inventory',
+    'SKG': 'receivables',
+    'SKO': 'cash',
+    'SGE': 'total_assets',
+
+    # Balansräkning - Skulder & EK
+    'AKT': 'share_capital',
+    'SEK': 'equity',
+    'SOB': 'untaxed_reserves',
+    'SAS': 'provisions',
+    'SLS': 'long_term_liabilities',
+    'SKS': 'short_term_liabilities',
+
+    # Nyckeltal
+    'avk_eget_kapital': 'return_on_equity',
+    'avk_totalt_kapital': 'return_on_assets',
+    'EKA': 'equity_ratio',
+    'RG': 'profit_margin',
+    'kassalikviditet': 'quick_ratio',
+
+    # Personal
+    'ANT': 'num_employees',
+    'loner_styrelse_vd': 'salaries_board_ceo',
+    'loner_ovriga': 'salaries_other',
+    'sociala_avgifter': 'social_costs',
+    'RPE': 'revenue_per_employee',
+}
+
+# Codes reported as counts or percentages, not TSEK
+NO_MULTIPLY_CODES = frozenset({'ANT', 'EKA', 'RG', 'RPE', 'avk_eget_kapital', 'avk_totalt_kapital', 'kassalikviditet'})
+
+# code -> (field, multiplier), resolved once instead of per account row
+_ACCOUNT_FIELDS = {
+    code: (field, 1 if code in NO_MULTIPLY_CODES else 1000)
+    for code, field in ACCOUNT_CODE_MAP.items()
+}
+
+ROLE_CATEGORY_MAP = {
+    # Board roles
+    'Styrelseledamot': 'BOARD',
+    'Styrelsesuppleant': 'BOARD',
+    'Styrelseordförande': 'BOARD',
+    'Ledamot': 'BOARD',
+    'Suppleant': 'BOARD',
+    'Ordförande': 'BOARD',
+    # Management roles
+    'Vice verkställande direktör': 'MANAGEMENT',
+    'Verkställande direktör': 'MANAGEMENT',
+    'Extern verkställande direktör': 'MANAGEMENT',
+    'VD': 'MANAGEMENT',
+    # Auditor roles
+    'Revisor': 'AUDITOR',
+    'Revisorssuppleant': 'AUDITOR',
+    'Huvudansvarig revisor': 'AUDITOR',
+    'Lekmannarevisor': 'AUDITOR',
+    # Other roles
+    'Extern firmatecknare': 'OTHER',  # not really management
+    'Bolagsman': 'OTHER',
+    'Komplementär': 'OTHER',
+    'Likvidator': 'OTHER',
+}
+
+ROLE_GROUP_MAP = {
+    'Management': 'MANAGEMENT',
+    'Board': 'BOARD',
+    'Revision': 'AUDITOR',
+    'Other': 'OTHER'
+}
+
+# Announcements kept per company
+MAX_ANNOUNCEMENTS = 10
+
+
+# =============================================================================
+# PAGE EXTRACTION
+# =============================================================================
+
+def extract_page_data(html: Optional[Html], legacy: bool = True) -> Optional[Dict]:
+    """
+    Page data from an allabolag page: Next.js pageProps, or with `legacy`
+    the old window.__INITIAL_DATA__ object.
+    """
+    if not html:
+        return None
+
+    data = extract_next_data(html)
+    if isinstance(data, dict):
+        page_props = (data.get('props') or {}).get('pageProps') or {}
+        if page_props.get('company'):
+            return page_props
+
+    if legacy:
+        return extract_initial_data(html)
+    return None
+
+
+# =============================================================================
+# FIELD PARSERS
+# =============================================================================
+
+def parse_birth_year(birth_date: Optional[str]) -> Optional[int]:
+    """Parse birth year from date string like '01.02.1989'."""
+    if not birth_date:
+        return None
+    parts = birth_date.split('.')
+    if len(parts) >= 3:
+        try:
+            return int(parts[2])
+        except ValueError:
+            pass
+    return None
+
+
+def map_role_category(group_name: str, role_type: str) -> str:
+    """
+    Map Allabolag role group and type to our category.
+
+    Args:
+        group_name: One of 'Management', 'Board', 'Revision', 'Other'
+        role_type: The specific role like 'Verkställande direktör', 'Ledamot', etc.
+
+    Returns:
+        Category string: 'MANAGEMENT', 'BOARD', 'AUDITOR', or 'OTHER'
+    """
+    category = ROLE_CATEGORY_MAP.get(role_type)
+    if category:
+        return category
+    return ROLE_GROUP_MAP.get(group_name, 'OTHER')
+
+
+def parse_employees(employees: Any) -> Optional[int]:
+    """Employee count from an int or a string like '12' or a range like '1-4' (lower bound)."""
+    if not employees:
+        return None
+    if isinstance(employees, str):
+        try:
+            return int(employees.split('-', 1)[0])
+        except ValueError:
+            return None
+    return int(employees)
+
+
+def parse_financial_period(period: Dict, is_consolidated: bool) -> Optional[Dict]:
+    """Parse a financial period from Next.js format (amounts in TSEK -> SEK)."""
+    if not period:
+        return None
+
+    year = period.get('year')
+    if year:
+        try:
+            year = int(year)
+        except (ValueError, TypeError):
+            year = None
+
+    try:
+        period_months = int(period.get('length', '12'))
+    except (ValueError, TypeError):
+        period_months = 12
+
+    result = {
+        'period_year': year,
+        'period_months': period_months,
+        'is_consolidated': 1 if is_consolidated else 0,
+        'source': 'allabolag'
+    }
+
+    # accounts = [{"code": "ADI", "amount": "36258"}, ...]
+    account_fields = _ACCOUNT_FIELDS
+    for acc in period.get('accounts') or ():
+        mapped = account_fields.get(acc.get('code'))
+        if mapped is None:
+            continue
+        amount = acc.get('amount')
+        if amount is None:
+            continue
+        field, multiplier = mapped
+        try:
+            result[field] = int(float(amount) * multiplier)
+        except (ValueError, TypeError):
+            pass
+
+    return result
+
+
+def parse_legacy_financial_period(period: Dict, is_consolidated: bool) -> Optional[Dict]:
+    """Parse a financial period from the old format (konton dict, values as-is)."""
+    if not period:
+        return None
+
+    result = {
+        'period_year': period.get('ar'),
+        'period_months': period.get('manader', 12),
+        'is_consolidated': 1 if is_consolidated else 0,
+        'source': 'allabolag'
+    }
+
+    for code, value in (period.get('konton') or {}).items():
+        field = ACCOUNT_CODE_MAP.get(code)
+        if field:
+            result[field] = value
+
+    return result
+
+
+def _parse_periods(parser, company: Dict, company_key: str, corporate_key: str) -> List[Dict]:
+    financials = []
+    for key, is_consolidated in ((company_key, False), (corporate_key, True)):
+        for period in company.get(key) or ():
+            fin = parser(period, is_consolidated)
+            if fin:
+                financials.append(fin)
+    return financials
+
+
+def _related_companies(org_data: Optional[Dict]) -> List[Dict]:
+    if not org_data:
+        return []
+
+    subsidiaries = (
+        (org_data.get('companyOverview') or {}).get('dotterbolag') or
+        org_data.get('relatedCompanies') or
+        (org_data.get('company') or {}).get('relatedCompanies') or
+        []
+    )
+    return [
+        {
+            'related_orgnr': rel.get('orgnr') or rel.get('orgNumber'),
+            'related_name': rel.get('namn') or rel.get('name'),
+            'relation_type': rel.get('relation_type', 'subsidiary'),
+            'source': 'allabolag'
+        }
+        for rel in subsidiaries if isinstance(rel, dict)
+    ]
+
+
+# =============================================================================
+# STRUCTURING
+# =============================================================================
+
+def structure_company(main_data: Dict, org_data: Optional[Dict], orgnr: str) -> Dict[str, Any]:
+    """Structure page data of either format into our company format."""
+    if 'company' in main_data:
+        return structure_nextjs_company(main_data, org_data, orgnr)
+    return structure_legacy_company(main_data, org_data, orgnr)
+
+
+def structure_nextjs_company(main_data: Dict, org_data: Optional[Dict], orgnr: str) -> Dict[str, Any]:
+    """Structure data from the Next.js format (props.pageProps.company)."""
+    company = main_data.get('company') or {}
+
+    result = {
+        'orgnr': orgnr,
+        'name': company.get('name') or company.get('legalName'),
+        'company_type': (company.get('companyType') or {}).get('code'),
+        'status': (company.get('status') or {}).get('status', 'UNKNOWN'),
+        'purpose': company.get('purpose'),
+        'registered_date': company.get('registrationDate'),
+        'foundation_year': company.get('foundationYear'),
+        'source_basic': 'allabolag'
+    }
+
+    # Postal address
+    postal = company.get('postalAddress')
+    if postal:
+        result['postal_street'] = postal.get('addressLine')
+        result['postal_code'] = postal.get('zipCode')
+        result['postal_city'] = postal.get('postPlace')
+
+    # Visitor address
+    visitor = company.get('visitorAddress')
+    if visitor:
+        result['visiting_street'] = visitor.get('addressLine')
+        result['visiting_code'] = visitor.get('zipCode')
+        result['visiting_city'] = visitor.get('postPlace')
+
+    # Contact info
+    result['phone'] = company.get('phone') or company.get('legalPhone')
+    result['email'] = company.get('email')
+    result['website'] = company.get('homePage')
+
+    # Location / GPS + municipality/county
+    location = company.get('location') or {}
+    coords = location.get('coordinates', [{}])
+    if coords:
+        result['latitude'] = coords[0].get('ycoordinate')
+        result['longitude'] = coords[0].get('xcoordinate')
+
+    result['municipality'] = location.get('municipality')
+    result['municipality_code'] = location.get('municipalityCode')
+    result['county'] = location.get('county')
+    result['county_code'] = location.get('countyCode')
+
+    # LEI code (Legal Entity Identifier)
+    result['lei_code'] = company.get('leiCode') or company.get('lei')
+
+    # ===== Registrations (F-skatt, Moms, Arbetsgivare) =====
+    result['moms_registered'] = 1 if company.get('registeredForVat') else 0
+    result['employer_registered'] = 1 if company.get('registeredForPayrollTax') else 0
+
+    vat_desc = company.get('registeredForVatDescription') or ''
+    has_fskatt = 'f-skatt' in vat_desc.lower()
+    registry_entries = company.get('registryStatusEntries')
+    if not has_fskatt and isinstance(registry_entries, list):
+        has_fskatt = any(
+            isinstance(entry, dict) and entry.get('label') == 'registeredForPrepayment' and entry.get('value')
+            for entry in registry_entries
+        )
+    result['f_skatt'] = 1 if has_fskatt else 0
+
+    # Fallback: old registrations dict/list format
+    if not (result['f_skatt'] or result['moms_registered'] or result['employer_registered']):
+        registrations = company.get('registrations') or {}
+        if isinstance(registrations, dict):
+            result['f_skatt'] = 1 if registrations.get('fTax') or registrations.get('fSkatt') else 0
+            result['moms_registered'] = 1 if registrations.get('vat') or registrations.get('moms') else 0
+            result['employer_registered'] = 1 if registrations.get('employer') or registrations.get('arbetsgivare') else 0
+        elif isinstance(registrations, list):
+            reg_types = [r.get('type', '').lower() for r in registrations if isinstance(r, dict)]
+            result['f_skatt'] = 1 if any('f-skatt' in t or 'fskatt' in t for t in reg_types) else 0
+            result['moms_registered'] = 1 if any('moms' in t or 'vat' in t for t in reg_types) else 0
+            result['employer_registered'] = 1 if any('arbetsgivar' in t or 'employer' in t for t in reg_types) else 0
+
+    # ===== Parent company / Group structure =====
+    corp_structure = company.get('corporateStructure')
+    if corp_structure:
+        num_subsidiaries = corp_structure.get('numberOfSubsidiaries', 0)
+        num_companies = corp_structure.get('numberOfCompanies', 0)
+        result['is_group'] = 1 if (num_subsidiaries and num_subsidiaries > 0) else 0
+        result['companies_in_group'] = num_companies if num_companies else None
+
+        parent_orgnr = corp_structure.get('parentCompanyOrganisationNumber')
+        if parent_orgnr:
+            result['parent_orgnr'] = parent_orgnr
+            result['parent_name'] = corp_structure.get('parentCompanyName')
+
+    # Fallback: old 'group' format
+    if not result.get('is_group'):
+        group = company.get('group')
+        if group:
+            result['is_group'] = 1 if group.get('isGroup') or group.get('koncern') else 0
+            result['companies_in_group'] = group.get('numberOfCompanies') or group.get('antalBolag')
+
+            parent = group.get('parent')
+            if parent:
+                result['parent_orgnr'] = parent.get('orgnr') or parent.get('organizationNumber')
+                result['parent_name'] = parent.get('name') or parent.get('namn')
+
+    # Alternative parent structure (direct on company)
+    if not result.get('parent_orgnr'):
+        parent = company.get('parent')
+        if parent:
+            result['parent_orgnr'] = parent.get('orgnr') or parent.get('organizationNumber')
+            result['parent_name'] = parent.get('name') or parent.get('namn')
+
+    # ===== Share capital =====
+    share_capital = company.get('shareCapital')
+    if share_capital:
+        try:
+            # Can be string "500000" or int
+            result['share_capital'] = int(float(share_capital))
+        except (ValueError, TypeError):
+            pass
+
+    # Financial summary (TSEK)
+    try:
+        result['revenue'] = int(float(company['revenue']) * 1000) if company.get('revenue') else None
+        result['net_profit'] = int(float(company['profit']) * 1000) if company.get('profit') else None
+    except (ValueError, TypeError):
+        result['revenue'] = None
+        result['net_profit'] = None
+
+    try:
+        result['num_employees'] = parse_employees(company.get('numberOfEmployees'))
+    except (ValueError, TypeError):
+        result['num_employees'] = None
+
+    # Industries / SNI codes: "71110 Arkitektverksamhet"
+    industries = []
+    for nace in company.get('naceIndustries') or ():
+        code, sep, description = nace.partition(' ')
+        if sep:
+            industries.append({
+                'sni_code': code,
+                'sni_description': description,
+                'is_primary': 0 if industries else 1
+            })
+    result['industries'] = industries
+
+    # Financials: companyAccounts (company) and corporateAccounts (consolidated)
+    result['financials'] = _parse_periods(parse_financial_period, company, 'companyAccounts', 'corporateAccounts')
+
+    # Summary fields from the latest non-consolidated period
+    latest = next((f for f in result['financials'] if not f.get('is_consolidated')), None)
+    if latest:
+        if result.get('revenue') is None:
+            result['revenue'] = latest.get('revenue')
+        if result.get('net_profit') is None:
+            result['net_profit'] = latest.get('net_profit')
+        if result.get('num_employees') is None:
+            result['num_employees'] = latest.get('num_employees')
+        result['total_assets'] = latest.get('total_assets')
+        result['equity'] = latest.get('equity')
+        result['equity_ratio'] = latest.get('equity_ratio')
+        result['return_on_equity'] = latest.get('return_on_equity')
+
+    # Board, Management, Revision and Other roles
+    roles = []
+    for group in (company.get('roles') or {}).get('roleGroups') or ():
+        group_name = group.get('name', '')
+        for role_entry in group.get('roles') or ():
+            # Skip company entries (like "Ernst & Young Aktiebolag")
+            if role_entry.get('type') == 'Company':
+                continue
+            role_type = role_entry.get('role', '')
+            roles.append({
+                'name': role_entry.get('name'),
+                'birth_year': parse_birth_year(role_entry.get('birthDate')),
+                'role_type': role_type,
+                'role_category': map_role_category(group_name, role_type),
+                'source': 'allabolag'
+            })
+
+    # Fallback: contactPerson
+    if not roles:
+        contact = company.get('contactPerson')
+        if contact and contact.get('name'):
+            roles.append({
+                'name': contact.get('name'),
+                'birth_year': parse_birth_year(contact.get('birthDate')),
+                'role_type': contact.get('role'),
+                'role_category': ROLE_CATEGORY_MAP.get(contact.get('role'), 'BOARD'),
+                'source': 'allabolag'
+            })
+    result['roles'] = roles
+
+    # Related companies - from the organisation page
+    result['related_companies'] = _related_companies(org_data)
+
+    # Trademarks - from pageProps.trademarks
+    result['trademarks'] = []
+    for tm in (main_data.get('trademarks') or {}).get('trademarks') or ():
+        registration = tm.get('registration') or {}
+        result['trademarks'].append({
+            'name': tm.get('title'),
+            'registration_number': registration.get('id'),
+            'status': 'registered' if registration.get('id') else 'pending',
+            'class_codes': None,  # Not provided by Allabolag
+            'registration_date': registration.get('date'),
+            'expiry_date': registration.get('expiry'),
+            'source': 'allabolag'
+        })
+
+    # Announcements (kungörelser) - try multiple key names
+    announcements_data = (
+        company.get('announcements') or
+        company.get('kungorelser') or
+        main_data.get('announcements') or
+        []
+    )
+    result['announcements'] = [
+        {
+            'announcement_type': ann.get('type') or ann.get('typ'),
+            'announcement_date': ann.get('date') or ann.get('datum'),
+            'description': ann.get('text') or ann.get('description'),
+            'source': 'allabolag'
+        }
+        for ann in announcements_data[:MAX_ANNOUNCEMENTS]
+    ]
+
+    return result
+
+
+def structure_legacy_company(main_data: Dict, org_data: Optional[Dict], orgnr: str) -> Dict[str, Any]:
+    """Structure data from the old format (companyOverview)."""
+    company_data = main_data.get('companyOverview') or {}
+
+    result = {
+        'orgnr': orgnr,
+        'name': company_data.get('namn'),
+        'company_type': company_data.get('foretagsform'),
+        'status': 'ACTIVE' if company_data.get('status') == 'Aktivt' else company_data.get('status'),
+        'purpose': company_data.get('ataInfo'),
+        'registered_date': company_data.get('regDatum'),
+        'foundation_year': company_data.get('grundat'),
+        'source': 'allabolag'
+    }
+
+    # Address
+    addr = company_data.get('adress')
+    if addr:
+        result['postal_street'] = addr.get('gata')
+        result['postal_code'] = addr.get('postnummer')
+        result['postal_city'] = addr.get('ort')
+
+    addr = company_data.get('besoksadress')
+    if addr:
+        result['visiting_street'] = addr.get('gata')
+        result['visiting_code'] = addr.get('postnummer')
+        result['visiting_city'] = addr.get('ort')
+
+    # Contact
+    result['phone'] = company_data.get('telefon')
+    result['email'] = company_data.get('email')
+    result['website'] = company_data.get('hemsida')
+
+    # GPS
+    coords = company_data.get('koordinater')
+    if coords:
+        result['latitude'] = coords.get('lat')
+        result['longitude'] = coords.get('lng')
+
+    # Registrations
+    result['f_skatt'] = 1 if company_data.get('fskatt') else 0
+    result['moms_registered'] = 1 if company_data.get('momsregistrerad') else 0
+    result['employer_registered'] = 1 if company_data.get('arbetsgivarregistrerad') else 0
+
+    # Board & Management
+    result['roles'] = [
+        {
+            'name': person.get('namn'),
+            'birth_year': person.get('fodelsear'),
+            'role_type': person.get('typ'),
+            'role_category': ROLE_CATEGORY_MAP.get(person.get('typ'), 'OTHER'),
+            'source': 'allabolag'
+        }
+        for person in company_data.get('befattningar') or ()
+    ]
+
+    # Signatories
+    result['signatories'] = list(company_data.get('firmatecknare') or ())
+
+    # Financials
+    result['financials'] = _parse_periods(
+        parse_legacy_financial_period, company_data, 'companyAccounts', 'corporateAccounts'
+    )
+
+    # Corporate structure
+    result['is_group'] = company_data.get('koncern', False)
+    result['companies_in_group'] = company_data.get('antalKoncernbolag')
+
+    parent = company_data.get('moderbolag')
+    if parent:
+        result['parent_orgnr'] = parent.get('orgnr')
+        result['parent_name'] = parent.get('namn')
+
+    # Related companies from org page
+    result['related_companies'] = []
+    if org_data:
+        for rel in (org_data.get('companyOverview') or {}).get('dotterbolag') or ():
+            result['related_companies'].append({
+                'related_orgnr': rel.get('orgnr'),
+                'related_name': rel.get('namn'),
+                'relation_type': 'subsidiary',
+                'source': 'allabolag'
+            })
+
+    # Announcements
+    result['announcements'] = [
+        {
+            'date': ann.get('datum'),
+            'type': ann.get('typ'),
+            'text': ann.get('text')
+        }
+        for ann in (company_data.get('kungorelser') or [])[:MAX_ANNOUNCEMENTS]
+    ]
+
+    # Industries
+    result['industries'] = [
+        {
+            'sni_code': sni.get('kod'),
+            'sni_description': sni.get('namn'),
+            'is_primary': 1 if i == 0 else 0,
+            'source': 'allabolag'
+        }
+        for i, sni in enumerate(company_data.get('snikoder') or ())
+    ]
+
+    # Quick summary from latest year
+    if result['financials']:
+        latest = result['financials'][0]
+        result['revenue'] = latest.get('revenue')
+        result['net_profit'] = latest.get('net_profit')
+        result['total_assets'] = latest.get('total_assets')
+        result['equity'] = latest.get('equity')
+        result['num_employees'] = latest.get('num_employees')
+        result['equity_ratio'] = latest.get('equity_ratio')
+        result['return_on_equity'] = latest.get('return_on_equity')
+
+    return result
+
+
+def parse_search_results(data: Optional[Dict], limit: int = 10) -> List[Dict]:
+    """Companies from a search page's data."""
+    if not data:
+        return []
+    return [
+        {
+            'orgnr': item.get('orgnr'),
+            'name': item.get('namn'),
+            'city': item.get('ort'),
+            'status': item.get('status'),
+            'source': 'allabolag'
+        }
+        for item in ((data.get('searchResults') or {}).get('companies') or [])[:limit]
+    ]
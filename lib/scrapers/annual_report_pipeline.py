@@ -0,0 +1,290 @@
+"""
+Bulk annual-report sync for many companies
+
+Runs the per-company sync (document list -> download -> parse -> store) as
+a pipeline over a list of orgnrs. Each stage has its own worker pool and
+bounded queue, so downloads for one company overlap with parsing and
+storing of others, and a slow stage applies back-pressure instead of
+buffering reports in memory.
+
+- list/download: VDM client calls, paced by the shared rate governor;
+  reports are downloaded into spooled temp files, not held as bytes
+- parse: CPU-bound, run in an executor (threads by default); gets the
+  archive as a seekable file
+- store: caller-supplied, run in a thread
+
+A company counts as done once all its selected documents are stored (or
+skipped); the caller checkpoints on that, so an interrupted run resumes
+without repeating finished companies. Downloads are served from the
+document cache on reruns.
+"""
+
+import time
+import asyncio
+from dataclasses import dataclass, field
+from concurrent.futures import Executor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional
+
+try:
+    from ..logging_config import get_source_logger
+except ImportError:
+    import logging
+    def get_source_logger(name):
+        return logging.getLogger(name)
+
+logger = get_source_logger("annual_report_pipeline")
+
+# Default workers per stage
+LIST_WORKERS = 4
+DOWNLOAD_WORKERS = 8
+PARSE_WORKERS = 4
+STORE_WORKERS = 2
+QUEUE_SIZE = 32
+
+
+@dataclass
+class PipelineStats:
+    companies: int = 0
+    companies_done: int = 0
+    companies_failed: int = 0
+    documents: int = 0
+    downloaded: int = 0
+    parsed: int = 0
+    stored: int = 0
+    skipped: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        finished = self.companies_done + self.companies_failed
+        return {
+            "companies": self.companies,
+            "companies_done": self.companies_done,
+            "companies_failed": self.companies_failed,
+            "documents": self.documents,
+            "downloaded": self.downloaded,
+            "parsed": self.parsed,
+            "stored": self.stored,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 1),
+            "companies_per_min": round(finished / elapsed * 60, 1) if elapsed > 0 else 0
+        }
+
+
+def select_documents(documents: List[Dict], years: int) -> List[Dict]:
+    """The `years` most recent reports, by reporting period end."""
+    documents = [d for d in documents if d.get("dokumentId")]
+    documents.sort(key=lambda d: d.get("rapporteringsperiodTom") or "", reverse=True)
+    return documents[:years]
+
+
+class AnnualReportPipeline:
+    """
+    Staged annual-report sync over many companies.
+
+    Usage:
+        pipeline = AnnualReportPipeline(
+            client,
+            parse=analyze_ixbrl_archive,
+            store=store_facts,
+            on_company_done=checkpoint,
+        )
+        stats = await pipeline.run(orgnrs)
+    """
+
+    def __init__(
+        self,
+        client,
+        parse: Callable[[BinaryIO, str, Dict], Any],
+        store: Callable[[str, Dict, Any], None],
+        years: int = 5,
+        skip_document: Optional[Callable[[str, Dict], bool]] = None,
+        on_company_done: Optional[Callable[[str, bool], None]] = None,
+        list_workers: int = LIST_WORKERS,
+        download_workers: int = DOWNLOAD_WORKERS,
+        parse_workers: int = PARSE_WORKERS,
+        store_workers: int = STORE_WORKERS,
+        queue_size: int = QUEUE_SIZE,
+        parse_executor: Optional[Executor] = None,
+    ):
+        """
+        Initialize pipeline.
+
+        Args:
+            client: BolagsverketVDMClient (async methods are used)
+            parse: (archive file, orgnr, document) -> parsed report
+            store: (orgnr, document, parsed) -> None; raise to mark the document failed
+            years: Most recent reports per company to sync
+            skip_document: (orgnr, document) -> True if already stored
+            on_company_done: (orgnr, ok) called once all documents of a company finished
+            *_workers: Concurrency per stage
+            queue_size: Max items waiting between two stages
+            parse_executor: Executor for parse (default: the loop's thread pool)
+        """
+        self.client = client
+        self.parse = parse
+        self.store = store
+        self.years = years
+        self.skip_document = skip_document
+        self.on_company_done = on_company_done
+        self.workers = {
+            "list": list_workers,
+            "download": download_workers,
+            "parse": parse_workers,
+            "store": store_workers,
+        }
+        self.queue_size = queue_size
+        self.parse_executor = parse_executor
+
+        self.stats = PipelineStats()
+        self._pending: Dict[str, int] = {}
+        self._failed: set = set()
+
+    # =========================================================================
+    # BOOKKEEPING
+    # =========================================================================
+
+    def _company_started(self, orgnr: str, documents: int):
+        if documents:
+            self._pending[orgnr] = documents
+        else:
+            self._company_finished(orgnr)
+
+    def _document_finished(self, orgnr: str, ok: bool):
+        if not ok:
+            self.stats.failed += 1
+            self._failed.add(orgnr)
+        self._pending[orgnr] -= 1
+        if self._pending[orgnr] == 0:
+            del self._pending[orgnr]
+            self._company_finished(orgnr)
+
+    def _company_finished(self, orgnr: str):
+        ok = orgnr not in self._failed
+        self._failed.discard(orgnr)
+        if ok:
+            self.stats.companies_done += 1
+        else:
+            self.stats.companies_failed += 1
+        if self.on_company_done:
+            try:
+                self.on_company_done(orgnr, ok)
+            except Exception as e:
+                logger.error(f"on_company_done failed for {orgnr}: {e}")
+
+    # =========================================================================
+    # STAGES
+    # =========================================================================
+
+    async def _list_stage(self, orgnr: str, out: asyncio.Queue):
+        try:
+            documents = await self.client.get_document_list_async(orgnr)
+            if documents is None:
+                raise RuntimeError("request failed")
+            documents = select_documents(documents, self.years)
+        except Exception as e:
+            logger.error(f"Document list failed for {orgnr}: {e}")
+            self._failed.add(orgnr)
+            self._company_started(orgnr, 0)
+            return
+
+        todo = []
+        for doc in documents:
+            if self.skip_document and self.skip_document(orgnr, doc):
+                self.stats.skipped += 1
+            else:
+                todo.append(doc)
+        self.stats.documents += len(todo)
+
+        self._company_started(orgnr, len(todo))
+        for doc in todo:
+            await out.put((orgnr, doc))
+
+    async def _download_stage(self, item, out: asyncio.Queue):
+        orgnr, doc = item
+        archive = await self.client.download_document_file_async(doc["dokumentId"])
+        if archive is None:
+            self._document_finished(orgnr, False)
+            return
+        self.stats.downloaded += 1
+        await out.put((orgnr, doc, archive))
+
+    async def _parse_stage(self, item, out: asyncio.Queue):
+        orgnr, doc, archive = item
+        loop = asyncio.get_running_loop()
+        try:
+            parsed = await loop.run_in_executor(self.parse_executor, self.parse, archive, orgnr, doc)
+        except Exception as e:
+            logger.error(f"Parse failed for {orgnr}/{doc['dokumentId']}: {e}")
+            self._document_finished(orgnr, False)
+            return
+        finally:
+            archive.close()
+        self.stats.parsed += 1
+        await out.put((orgnr, doc, parsed))
+
+    async def _store_stage(self, item, out: Optional[asyncio.Queue]):
+        orgnr, doc, parsed = item
+        try:
+            await asyncio.to_thread(self.store, orgnr, doc, parsed)
+        except Exception as e:
+            logger.error(f"Store failed for {orgnr}/{doc['dokumentId']}: {e}")
+            self._document_finished(orgnr, False)
+            return
+        self.stats.stored += 1
+        self._document_finished(orgnr, True)
+
+    async def _worker(self, stage, inbox: asyncio.Queue, out: Optional[asyncio.Queue]):
+        while True:
+            item = await inbox.get()
+            try:
+                await stage(item, out)
+            except Exception as e:
+                logger.error(f"Pipeline stage {stage.__name__} failed: {e}")
+                if isinstance(item, tuple) and item[0] in self._pending:
+                    self._document_finished(item[0], False)
+            finally:
+                inbox.task_done()
+
+    # =========================================================================
+    # RUN
+    # =========================================================================
+
+    async def run(self, orgnrs: Iterable[str]) -> PipelineStats:
+        """Sync all companies; returns the stats once every stage has drained."""
+        orgnrs = list(dict.fromkeys(orgnrs))
+        self.stats = PipelineStats(companies=len(orgnrs))
+
+        stages = [
+            ("list", self._list_stage),
+            ("download", self._download_stage),
+            ("parse", self._parse_stage),
+            ("store", self._store_stage),
+        ]
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+        workers = []
+        for i, (name, stage) in enumerate(stages):
+            out = queues[i + 1] if i + 1 < len(queues) else None
+            workers.append([
+                asyncio.create_task(self._worker(stage, queues[i], out))
+                for _ in range(max(1, self.workers[name]))
+            ])
+
+        try:
+            for orgnr in orgnrs:
+                await queues[0].put(orgnr)
+            # Drain stage by stage: once a stage's inbox is empty and its
+            # workers are idle, nothing more can arrive downstream of it
+            for queue, tasks in zip(queues, workers):
+                await queue.join()
+                for task in tasks:
+                    task.cancel()
+        finally:
+            for tasks in workers:
+                for task in tasks:
+                    task.cancel()
+            await asyncio.gather(*(t for tasks in workers for t in tasks), return_exceptions=True)
+
+        return self.stats
@@ -8,19 +8,36 @@ API Endpoints (Production):
 
 Features:
 - OAuth 2.0 Client Credentials authentication
-- Both sync and async HTTP support
+- Both sync and async HTTP support over long-lived connection pools
+  (keep-alive, HTTP/2 for async when h2 is installed)
 - Automatic token refresh
+- One shared rate governor per API host (AIMD, Retry-After) for all
+  callers, instead of per-call backoff
+- Annual report downloads cached on disk (document_cache)
 - Structured logging
 """
 
 import os
 import time
 import asyncio
+import tempfile
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import BinaryIO, Dict, Any, Optional, List
+from urllib.parse import urlparse
 
 import requests
 import httpx
+from requests.adapters import HTTPAdapter
+
+from .document_cache import CHUNK_BYTES, SPOOL_MAX_BYTES, get_document_cache
+from .rate_limiter import AdaptiveRateLimiter, get_host_limiter, parse_retry_after, register_host_defaults
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 try:
     from ..logging_config import get_source_logger
@@ -32,6 +49,20 @@ except ImportError:
 
 logger = get_source_logger("bolagsverket_vdm")
 
+JSON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
+# Shared governor for the API gateway: AIMD between these bounds, pausing
+# all callers on 429/5xx (Retry-After when given). SCRAPER_HOST_RATES or
+# configure_host() override it.
+VDM_RATE_SETTINGS = {
+    "rate": float(os.environ.get("VDM_START_RATE", "2.0")),
+    "min_rate": 0.2,
+    "max_rate": float(os.environ.get("VDM_MAX_RATE", "10.0")),
+    "burst": 4,
+    "latency_target": 5.0,
+    "backoff_seconds": 5.0,
+}
+
 
 class BolagsverketVDMClient:
     """
@@ -53,7 +84,9 @@ class BolagsverketVDMClient:
 
     Token handling:
     - Tokens are valid for 3600 seconds (1 hour)
-    - Proactive renewal: 5 minutes before expiration
+    - Proactive renewal: 5 minutes before expiration (in the background
+      for async callers)
+    - Single flight: concurrent callers share one refresh
     - Reactive renewal: On 401 response, retry with new token
     """
 
@@ -63,11 +96,16 @@ class BolagsverketVDMClient:
 
     # Token management
     TOKEN_MARGIN_SECONDS = 300  # Renew 5 min before expiration
+    TOKEN_MIN_VALIDITY_SECONDS = 30  # Below this, callers wait for the renewal
+    TOKEN_RETRY_SECONDS = 5  # After a failed refresh, don't retry sooner
     MAX_RETRIES = 1  # Max retries on 401
 
-    # Rate limiting / backoff for 429
-    MAX_429_RETRIES = 3  # Max retries on 429 Too Many Requests
-    BACKOFF_BASE_SECONDS = 5  # Base wait time (exponential: 5, 10, 20)
+    # Retries on 429/5xx; the wait between them comes from the shared governor
+    MAX_429_RETRIES = 3
+
+    # Connection pools (portal + gateway hosts), kept for the client's lifetime
+    POOL_SIZE = 10
+    HTTP_LIMITS = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE, keepalive_expiry=60.0)
 
     def __init__(
         self,
@@ -97,105 +135,330 @@ class BolagsverketVDMClient:
             self.token_url = self.TOKEN_URL
             self.api_base_url = self.API_BASE_URL
 
+        self._api_host = urlparse(self.api_base_url).hostname
+        register_host_defaults(self._api_host, **VDM_RATE_SETTINGS)
+
         # Token management
         self._access_token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
-
-        # HTTP clients
+        self._token_failed_at: Optional[float] = None
+        self._token_lock_sync = threading.Lock()
+        self._token_lock_async: Optional[asyncio.Lock] = None
+        self._token_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._token_renewal: Optional[asyncio.Task] = None
+        self.token_refreshes = 0
+
+        # HTTP clients (opened lazily, closed with close()/aclose())
         self._sync_session: Optional[requests.Session] = None
         self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
 
     @property
     def is_configured(self) -> bool:
         """Check if client has valid credentials."""
         return bool(self.client_id and self.client_secret)
 
+    # =========================================================================
+    # HTTP CLIENTS
+    # =========================================================================
+
+    def _get_session(self) -> requests.Session:
+        if self._sync_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.POOL_SIZE)
+            session.mount("https://", adapter)
+            self._sync_session = session
+        return self._sync_session
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self.HTTP_LIMITS,
+                timeout=30
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    def close(self):
+        """Close the sync connection pool."""
+        if self._sync_session is not None:
+            self._sync_session.close()
+            self._sync_session = None
+
+    async def aclose(self):
+        """Close both connection pools (and stop a pending token renewal)."""
+        self.close()
+        if self._token_renewal is not None and not self._token_renewal.done():
+            self._token_renewal.cancel()
+        self._token_renewal = None
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
     # =========================================================================
     # TOKEN MANAGEMENT
     # =========================================================================
 
-    def _invalidate_token(self):
-        """Invalidate cached token (forces refresh on next request)."""
+    def _token_valid_for(self, seconds: float) -> bool:
+        """True if the cached token is still valid `seconds` from now."""
+        return bool(self._access_token and self._token_expires_at) and \
+            datetime.now() < self._token_expires_at - timedelta(seconds=seconds)
+
+    def _invalidate_token(self, token: Optional[str] = None):
+        """
+        Invalidate cached token (forces refresh on next request).
+
+        With `token`, only if it is still the cached one: a 401 for a request
+        sent with an old token must not discard a token another caller
+        already refreshed.
+        """
+        if token is not None and token != self._access_token:
+            return
         self._access_token = None
         self._token_expires_at = None
         logger.debug("Token invalidated")
 
+    def _token_request(self) -> Dict[str, Any]:
+        return {
+            "headers": {"Content-Type": "application/x-www-form-urlencoded"},
+            "data": {
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "scope": "vardefulla-datamangder:ping vardefulla-datamangder:read"
+            },
+            "timeout": 30
+        }
+
+    def _store_token(self, token_data: Dict[str, Any]) -> Optional[str]:
+        self._access_token = token_data.get("access_token")
+        expires_in = token_data.get("expires_in", 3600)
+        self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+        self._token_failed_at = None
+        self.token_refreshes += 1
+
+        logger.debug(
+            "OAuth token refreshed",
+            expires_in=expires_in
+        )
+        return self._access_token
+
+    def _refresh_failed_recently(self) -> bool:
+        # Waiters that queued behind a failed refresh shouldn't each retry it
+        return self._token_failed_at is not None and \
+            time.monotonic() - self._token_failed_at < self.TOKEN_RETRY_SECONDS
+
     def _get_token_sync(self) -> Optional[str]:
-        """Get or refresh OAuth token (sync)."""
+        """Get or refresh OAuth token (sync). One refresh at a time across threads."""
         if not self.is_configured:
             return None
 
         # Return cached token if still valid (with margin before expiration)
-        if self._access_token and self._token_expires_at:
-            if datetime.now() < self._token_expires_at - timedelta(seconds=self.TOKEN_MARGIN_SECONDS):
-                return self._access_token
-
-        try:
-            response = requests.post(
-                self.token_url,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "scope": "vardefulla-datamangder:ping vardefulla-datamangder:read"
-                },
-                timeout=30
-            )
-            response.raise_for_status()
+        if self._token_valid_for(self.TOKEN_MARGIN_SECONDS):
+            return self._access_token
 
-            token_data = response.json()
-            self._access_token = token_data.get("access_token")
-            expires_in = token_data.get("expires_in", 3600)
-            self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+        with self._token_lock_sync:
+            # Another thread may have refreshed while we waited
+            if self._token_valid_for(self.TOKEN_MARGIN_SECONDS):
+                return self._access_token
+            if self._refresh_failed_recently():
+                return self._access_token if self._token_valid_for(0) else None
 
-            logger.debug(
-                "OAuth token refreshed",
-                expires_in=expires_in
-            )
+            try:
+                response = self._get_session().post(self.token_url, **self._token_request())
+                response.raise_for_status()
+                return self._store_token(response.json())
+
+            except Exception as e:
+                logger.error(f"Failed to get OAuth token: {e}")
+                self._token_failed_at = time.monotonic()
+                # Still usable until it actually expires
+                return self._access_token if self._token_valid_for(0) else None
+
+    def _get_token_lock_async(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._token_lock_async is None or self._token_lock_loop is not loop:
+            self._token_lock_async = asyncio.Lock()
+            self._token_lock_loop = loop
+            self._token_renewal = None
+        return self._token_lock_async
+
+    async def _refresh_token_async(self) -> Optional[str]:
+        """Fetch a new token unless another coroutine just did (single flight)."""
+        async with self._get_token_lock_async():
+            if self._token_valid_for(self.TOKEN_MARGIN_SECONDS):
+                return self._access_token
+            if self._refresh_failed_recently():
+                return self._access_token if self._token_valid_for(0) else None
 
-            return self._access_token
+            try:
+                response = await self._get_async_client().post(self.token_url, **self._token_request())
+                response.raise_for_status()
+                return self._store_token(response.json())
 
-        except Exception as e:
-            logger.error(f"Failed to get OAuth token: {e}")
-            return None
+            except Exception as e:
+                logger.error(f"Failed to get OAuth token (async): {e}")
+                self._token_failed_at = time.monotonic()
+                return self._access_token if self._token_valid_for(0) else None
 
     async def _get_token_async(self) -> Optional[str]:
-        """Get or refresh OAuth token (async)."""
+        """
+        Get or refresh OAuth token (async).
+
+        Inside the renewal margin the current token is returned at once and a
+        single background task renews it; callers only wait when the token
+        is (nearly) expired, and then all of them wait for the same refresh.
+        """
         if not self.is_configured:
             logger.warning("Bolagsverket VDM client not configured (missing client_id or client_secret)")
             return None
 
-        # Return cached token if still valid (with margin before expiration)
-        if self._access_token and self._token_expires_at:
-            if datetime.now() < self._token_expires_at - timedelta(seconds=self.TOKEN_MARGIN_SECONDS):
-                return self._access_token
+        if self._token_valid_for(self.TOKEN_MARGIN_SECONDS):
+            return self._access_token
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.token_url,
-                    headers={"Content-Type": "application/x-www-form-urlencoded"},
-                    data={
-                        "grant_type": "client_credentials",
-                        "client_id": self.client_id,
-                        "client_secret": self.client_secret,
-                        "scope": "vardefulla-datamangder:ping vardefulla-datamangder:read"
-                    },
-                    timeout=30
-                )
-                response.raise_for_status()
+        if self._token_valid_for(self.TOKEN_MIN_VALIDITY_SECONDS):
+            self._get_token_lock_async()  # drops a renewal task from another loop
+            if self._token_renewal is None or self._token_renewal.done():
+                self._token_renewal = asyncio.create_task(self._refresh_token_async())
+            return self._access_token
 
-                token_data = response.json()
-                self._access_token = token_data.get("access_token")
-                expires_in = token_data.get("expires_in", 3600)
-                self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+        return await self._refresh_token_async()
 
-                return self._access_token
+    # =========================================================================
+    # RATE GOVERNOR
+    # =========================================================================
 
-        except Exception as e:
-            logger.error(f"Failed to get OAuth token (async): {e}")
-            return None
+    def _governor(self) -> AdaptiveRateLimiter:
+        """Process-wide limiter for the API gateway, shared by all clients and callers."""
+        return get_host_limiter(self._api_host)
+
+    def _should_retry(self, status: Optional[int], attempt: int, what: str) -> bool:
+        """True for 429/5xx/connection errors with retries left (the governor does the waiting)."""
+        if status is not None and status != 429 and status < 500:
+            return False
+        if attempt < self.MAX_429_RETRIES:
+            logger.warning(f"Got {status or 'connection error'} for {what} (retry {attempt + 1}/{self.MAX_429_RETRIES})")
+            return True
+        if status == 429:
+            logger.error(f"429 rate limit exceeded for {what} after {self.MAX_429_RETRIES} retries")
+        return False
+
+    def _request(self, method: str, path: str, headers: Dict[str, str], what: str,
+                 **kwargs) -> Optional[requests.Response]:
+        """
+        Send an API request through the shared governor (sync).
+
+        Adds the bearer token; retries once with a new token on 401 and up
+        to MAX_429_RETRIES times on 429/5xx/connection errors. Returns the
+        last response, or None without a token. Connection errors on the
+        last attempt are raised. With stream=True the caller must close()
+        the response.
+        """
+        governor = self._governor()
+        auth_retries = attempt = 0
+        while True:
+            token = self._get_token_sync()
+            if not token:
+                logger.warning(f"No OAuth token available for {what}")
+                return None
+
+            governor.acquire()
+            start = time.perf_counter()
+            try:
+                response = self._get_session().request(
+                    method, f"{self.api_base_url}{path}",
+                    headers={**headers, "Authorization": f"Bearer {token}"},
+                    **kwargs
+                )
+            except requests.exceptions.RequestException:
+                governor.record(None, time.perf_counter() - start)
+                if self._should_retry(None, attempt, what):
+                    attempt += 1
+                    continue
+                raise
+
+            status = response.status_code
+            governor.record(status, time.perf_counter() - start,
+                            parse_retry_after(response.headers.get("Retry-After")))
+
+            if status == 401 and auth_retries < self.MAX_RETRIES:
+                logger.warning(f"Got 401 for {what}, refreshing token and retrying...")
+                response.close()
+                self._invalidate_token(token)
+                auth_retries += 1
+                continue
+            if self._should_retry(status, attempt, what):
+                response.close()
+                attempt += 1
+                continue
+            return response
+
+    async def _request_async(self, method: str, path: str, headers: Dict[str, str], what: str,
+                             stream: bool = False, **kwargs) -> Optional[httpx.Response]:
+        """
+        Send an API request through the shared governor (async). See _request.
+
+        With stream=True the body is not read; the caller must aclose() the response.
+        """
+        governor = self._governor()
+        auth_retries = attempt = 0
+        while True:
+            token = await self._get_token_async()
+            if not token:
+                logger.warning(f"No OAuth token available for {what}")
+                return None
+
+            await governor.acquire_async()
+            start = time.perf_counter()
+            try:
+                client = self._get_async_client()
+                request = client.build_request(
+                    method, f"{self.api_base_url}{path}",
+                    headers={**headers, "Authorization": f"Bearer {token}"},
+                    **kwargs
+                )
+                response = await client.send(request, stream=stream)
+            except httpx.HTTPError:
+                governor.record(None, time.perf_counter() - start)
+                if self._should_retry(None, attempt, what):
+                    attempt += 1
+                    continue
+                raise
+
+            status = response.status_code
+            governor.record(status, time.perf_counter() - start,
+                            parse_retry_after(response.headers.get("Retry-After")))
+
+            if status == 401 and auth_retries < self.MAX_RETRIES:
+                logger.warning(f"Got 401 for {what}, refreshing token and retrying...")
+                await response.aclose()
+                self._invalidate_token(token)
+                auth_retries += 1
+                continue
+            if self._should_retry(status, attempt, what):
+                await response.aclose()
+                attempt += 1
+                continue
+            return response
+
+    def get_rate_stats(self) -> Dict[str, Any]:
+        return {**self._governor().get_stats(), "token_refreshes": self.token_refreshes}
 
     # =========================================================================
     # SYNC API
@@ -225,43 +488,27 @@ class BolagsverketVDMClient:
         # Already has hyphen in input - use as-is
         return orgnr_clean, orgnr
 
-    def get_company(self, orgnr: str, _retry_count: int = 0) -> Optional[Dict[str, Any]]:
+    def get_company(self, orgnr: str) -> Optional[Dict[str, Any]]:
         """
         Get company information from Bolagsverket VDM API (sync).
 
         Args:
             orgnr: Organization number (with or without hyphen)
-            _retry_count: Internal retry counter (do not set manually)
 
         Returns:
             Standardized company data dict or None if not found
         """
         orgnr_clean, orgnr_formatted = self._format_orgnr(orgnr)
-
-        token = self._get_token_sync()
-        if not token:
-            logger.warning("No OAuth token available")
-            return None
-
         start_time = time.perf_counter()
 
         try:
-            response = requests.post(
-                f"{self.api_base_url}/organisationer",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                },
+            response = self._request(
+                "POST", "/organisationer", JSON_HEADERS, orgnr,
                 json={"identitetsbeteckning": orgnr_formatted},
                 timeout=30
             )
-
-            # Handle 401 with retry
-            if response.status_code == 401 and _retry_count < self.MAX_RETRIES:
-                logger.warning(f"Got 401 for {orgnr}, refreshing token and retrying...")
-                self._invalidate_token()
-                return self.get_company(orgnr, _retry_count + 1)
+            if response is None:
+                return None
 
             if response.status_code == 404:
                 logger.info(f"Company not found: {orgnr}")
@@ -294,58 +541,39 @@ class BolagsverketVDMClient:
     # ASYNC API
     # =========================================================================
 
-    async def get_company_async(self, orgnr: str, _retry_count: int = 0) -> Optional[Dict[str, Any]]:
+    async def get_company_async(self, orgnr: str) -> Optional[Dict[str, Any]]:
         """
         Get company information from Bolagsverket VDM API (async).
 
         Args:
             orgnr: Organization number (with or without hyphen)
-            _retry_count: Internal retry counter (do not set manually)
 
         Returns:
             Standardized company data dict or None if not found
         """
         orgnr_clean, orgnr_formatted = self._format_orgnr(orgnr)
-
-        token = await self._get_token_async()
-        if not token:
-            return None
-
         start_time = time.perf_counter()
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_base_url}/organisationer",
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/json",
-                        "Accept": "application/json"
-                    },
-                    json={"identitetsbeteckning": orgnr_formatted},
-                    timeout=30
-                )
-
-                # Handle 401 with retry
-                if response.status_code == 401 and _retry_count < self.MAX_RETRIES:
-                    logger.warning(f"Got 401 for {orgnr}, refreshing token and retrying...")
-                    self._invalidate_token()
-                    return await self.get_company_async(orgnr, _retry_count + 1)
-
-                if response.status_code == 404:
-                    return None
+            response = await self._request_async(
+                "POST", "/organisationer", JSON_HEADERS, orgnr,
+                json={"identitetsbeteckning": orgnr_formatted},
+                timeout=30
+            )
+            if response is None or response.status_code == 404:
+                return None
 
-                response.raise_for_status()
-                data = response.json()
+            response.raise_for_status()
+            data = response.json()
 
-                duration_ms = (time.perf_counter() - start_time) * 1000
-                logger.info(
-                    f"Async fetched {orgnr} from Bolagsverket VDM",
-                    orgnr=orgnr,
-                    duration_ms=round(duration_ms, 2)
-                )
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            logger.info(
+                f"Async fetched {orgnr} from Bolagsverket VDM",
+                orgnr=orgnr,
+                duration_ms=round(duration_ms, 2)
+            )
 
-                return self._parse_response(data, orgnr_clean)
+            return self._parse_response(data, orgnr_clean)
 
         except Exception as e:
             logger.error(f"Async error fetching {orgnr}: {e}")
@@ -359,134 +587,94 @@ class BolagsverketVDMClient:
     # DOCUMENT LIST (Årsredovisningar)
     # =========================================================================
 
-    def get_document_list(self, orgnr: str, _retry_count: int = 0) -> List[Dict]:
+    def get_document_list(self, orgnr: str) -> Optional[List[Dict]]:
         """
         Get list of annual reports for a company (sync).
 
-        Returns list of document metadata with dokumentId for download.
+        Returns list of document metadata with dokumentId for download,
+        [] if the company has no reports, or None if the request failed.
         """
         _, orgnr_formatted = self._format_orgnr(orgnr)
 
-        token = self._get_token_sync()
-        if not token:
-            return []
-
         try:
-            response = requests.post(
-                f"{self.api_base_url}/dokumentlista",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
+            response = self._request(
+                "POST", "/dokumentlista", {"Content-Type": "application/json"}, f"document list {orgnr}",
                 json={"identitetsbeteckning": orgnr_formatted},
                 timeout=30
             )
-
-            # Handle 401 with retry
-            if response.status_code == 401 and _retry_count < self.MAX_RETRIES:
-                logger.warning(f"Got 401 for document list {orgnr}, refreshing token...")
-                self._invalidate_token()
-                return self.get_document_list(orgnr, _retry_count + 1)
+            if response is None:
+                return None
 
             if response.status_code != 200:
-                return []
+                logger.warning(f"Document list failed for {orgnr}: status={response.status_code}")
+                return None
 
             data = response.json()
             return data.get("dokument", [])
 
         except Exception as e:
             logger.error(f"Error getting document list for {orgnr}: {e}")
-            return []
+            return None
 
-    async def get_document_list_async(
-        self, orgnr: str, _retry_count: int = 0, _429_retry_count: int = 0
-    ) -> List[Dict]:
-        """Get list of annual reports for a company (async)."""
-        _, orgnr_formatted = self._format_orgnr(orgnr)
+    async def get_document_list_async(self, orgnr: str) -> Optional[List[Dict]]:
+        """
+        Get list of annual reports for a company (async).
 
-        token = await self._get_token_async()
-        if not token:
-            logger.warning(f"No OAuth token available for document list {orgnr}")
-            return []
+        Returns [] if the company has no reports, None if the request failed.
+        """
+        _, orgnr_formatted = self._format_orgnr(orgnr)
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_base_url}/dokumentlista",
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={"identitetsbeteckning": orgnr_formatted},
-                    timeout=30
-                )
-
-                # Handle 401 with retry (token refresh)
-                if response.status_code == 401 and _retry_count < self.MAX_RETRIES:
-                    logger.warning(f"Got 401 for document list {orgnr}, refreshing token...")
-                    self._invalidate_token()
-                    return await self.get_document_list_async(orgnr, _retry_count + 1, _429_retry_count)
-
-                # Handle 429 with exponential backoff
-                if response.status_code == 429 and _429_retry_count < self.MAX_429_RETRIES:
-                    wait_time = self.BACKOFF_BASE_SECONDS * (2 ** _429_retry_count)
-                    logger.warning(
-                        f"Got 429 for document list {orgnr}, waiting {wait_time}s "
-                        f"(retry {_429_retry_count + 1}/{self.MAX_429_RETRIES})"
-                    )
-                    await asyncio.sleep(wait_time)
-                    return await self.get_document_list_async(orgnr, _retry_count, _429_retry_count + 1)
-
-                if response.status_code == 429:
-                    logger.error(f"429 rate limit exceeded for {orgnr} after {self.MAX_429_RETRIES} retries")
-                    return []
+            response = await self._request_async(
+                "POST", "/dokumentlista", {"Content-Type": "application/json"}, f"document list {orgnr}",
+                json={"identitetsbeteckning": orgnr_formatted},
+                timeout=30
+            )
+            if response is None:
+                return None
 
-                if response.status_code != 200:
-                    logger.warning(f"Document list failed for {orgnr}: status={response.status_code}")
-                    return []
+            if response.status_code != 200:
+                logger.warning(f"Document list failed for {orgnr}: status={response.status_code}")
+                return None
 
-                data = response.json()
-                documents = data.get("dokument", [])
-                logger.info(f"Found {len(documents)} documents for {orgnr}")
-                return documents
+            data = response.json()
+            documents = data.get("dokument", [])
+            logger.info(f"Found {len(documents)} documents for {orgnr}")
+            return documents
 
         except Exception as e:
             logger.error(f"Async error getting document list for {orgnr}: {e}")
-            return []
+            return None
 
     # =========================================================================
     # DOCUMENT DOWNLOAD (Årsredovisningar - ZIP/XBRL)
     # =========================================================================
 
-    def download_document(self, dokument_id: str, _retry_count: int = 0) -> Optional[bytes]:
+    def download_document(self, dokument_id: str, timeout: float = 60) -> Optional[bytes]:
         """
         Download annual report document as ZIP (sync).
 
+        Served from the on-disk document cache when already downloaded.
+
         Args:
             dokument_id: Document ID from get_document_list
+            timeout: Request timeout in seconds
 
         Returns:
             ZIP file content as bytes, or None on failure
         """
-        token = self._get_token_sync()
-        if not token:
-            return None
+        cache = get_document_cache()
+        cached = cache.get(dokument_id)
+        if cached is not None:
+            return cached
 
         try:
-            response = requests.get(
-                f"{self.api_base_url}/dokument/{dokument_id}",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Accept": "application/zip"
-                },
-                timeout=60
+            response = self._request(
+                "GET", f"/dokument/{dokument_id}", {"Accept": "application/zip"}, f"document {dokument_id}",
+                timeout=timeout
             )
-
-            # Handle 401 with retry
-            if response.status_code == 401 and _retry_count < self.MAX_RETRIES:
-                logger.warning(f"Got 401 for document {dokument_id}, refreshing token...")
-                self._invalidate_token()
-                return self.download_document(dokument_id, _retry_count + 1)
+            if response is None:
+                return None
 
             if response.status_code != 200:
                 logger.warning(f"Failed to download {dokument_id}: {response.status_code}")
@@ -499,76 +687,148 @@ class BolagsverketVDMClient:
                 logger.warning(f"Downloaded content is not a ZIP: {dokument_id}")
                 return None
 
+            cache.put(dokument_id, content)
             return content
 
         except Exception as e:
             logger.error(f"Error downloading document {dokument_id}: {e}")
             return None
 
-    async def download_document_async(
-        self, dokument_id: str, _retry_count: int = 0, _429_retry_count: int = 0
-    ) -> Optional[bytes]:
+    async def download_document_async(self, dokument_id: str, timeout: float = 60) -> Optional[bytes]:
         """
         Download annual report document as ZIP (async).
 
+        Served from the on-disk document cache when already downloaded.
+
         Args:
             dokument_id: Document ID from get_document_list_async
+            timeout: Request timeout in seconds
 
         Returns:
             ZIP file content as bytes, or None on failure
         """
-        token = await self._get_token_async()
-        if not token:
-            return None
+        cache = get_document_cache()
+        cached = await asyncio.to_thread(cache.get, dokument_id)
+        if cached is not None:
+            return cached
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.api_base_url}/dokument/{dokument_id}",
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Accept": "application/zip"
-                    },
-                    timeout=60
-                )
+            response = await self._request_async(
+                "GET", f"/dokument/{dokument_id}", {"Accept": "application/zip"}, f"document {dokument_id}",
+                timeout=timeout
+            )
+            if response is None:
+                return None
 
-                # Handle 401 with retry (token refresh)
-                if response.status_code == 401 and _retry_count < self.MAX_RETRIES:
-                    logger.warning(f"Got 401 for document {dokument_id}, refreshing token...")
-                    self._invalidate_token()
-                    return await self.download_document_async(dokument_id, _retry_count + 1, _429_retry_count)
-
-                # Handle 429 with exponential backoff
-                if response.status_code == 429 and _429_retry_count < self.MAX_429_RETRIES:
-                    wait_time = self.BACKOFF_BASE_SECONDS * (2 ** _429_retry_count)
-                    logger.warning(
-                        f"Got 429 for document {dokument_id}, waiting {wait_time}s "
-                        f"(retry {_429_retry_count + 1}/{self.MAX_429_RETRIES})"
-                    )
-                    await asyncio.sleep(wait_time)
-                    return await self.download_document_async(dokument_id, _retry_count, _429_retry_count + 1)
-
-                if response.status_code == 429:
-                    logger.error(f"429 rate limit exceeded for document {dokument_id} after {self.MAX_429_RETRIES} retries")
-                    return None
+            if response.status_code != 200:
+                logger.warning(f"Failed to download {dokument_id}: {response.status_code}")
+                return None
+
+            content = response.content
+
+            # Verify it's a ZIP file (starts with PK)
+            if not content.startswith(b'PK'):
+                logger.warning(f"Downloaded content is not a ZIP: {dokument_id}")
+                return None
+
+            await asyncio.to_thread(cache.put, dokument_id, content)
+            return content
+
+        except Exception as e:
+            logger.error(f"Async error downloading document {dokument_id}: {e}")
+            return None
+
+    def download_document_file(self, dokument_id: str, timeout: float = 60) -> Optional[BinaryIO]:
+        """
+        Download annual report document as ZIP into a spooled temp file (sync).
 
+        Same as download_document, but the body is streamed in chunks and
+        the result is a seekable file positioned at 0 (kept in memory up to
+        SPOOL_MAX_BYTES, then on disk). The caller closes it.
+        """
+        cache = get_document_cache()
+        cached = cache.open(dokument_id)
+        if cached is not None:
+            return cached
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        try:
+            response = self._request(
+                "GET", f"/dokument/{dokument_id}", {"Accept": "application/zip"}, f"document {dokument_id}",
+                timeout=timeout, stream=True
+            )
+            if response is None:
+                spool.close()
+                return None
+
+            with response:
                 if response.status_code != 200:
                     logger.warning(f"Failed to download {dokument_id}: {response.status_code}")
+                    spool.close()
                     return None
+                for chunk in response.iter_content(CHUNK_BYTES):
+                    spool.write(chunk)
 
-                content = response.content
+            if not self._is_zip_file(spool):
+                logger.warning(f"Downloaded content is not a ZIP: {dokument_id}")
+                spool.close()
+                return None
+
+            cache.put_file(dokument_id, spool)
+            return spool
 
-                # Verify it's a ZIP file (starts with PK)
-                if not content.startswith(b'PK'):
-                    logger.warning(f"Downloaded content is not a ZIP: {dokument_id}")
+        except Exception as e:
+            logger.error(f"Error downloading document {dokument_id}: {e}")
+            spool.close()
+            return None
+
+    async def download_document_file_async(self, dokument_id: str, timeout: float = 60) -> Optional[BinaryIO]:
+        """Download annual report document as ZIP into a spooled temp file (async). See download_document_file."""
+        cache = get_document_cache()
+        cached = await asyncio.to_thread(cache.open, dokument_id)
+        if cached is not None:
+            return cached
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        try:
+            response = await self._request_async(
+                "GET", f"/dokument/{dokument_id}", {"Accept": "application/zip"}, f"document {dokument_id}",
+                stream=True, timeout=timeout
+            )
+            if response is None:
+                spool.close()
+                return None
+
+            try:
+                if response.status_code != 200:
+                    logger.warning(f"Failed to download {dokument_id}: {response.status_code}")
+                    spool.close()
                     return None
+                async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                    spool.write(chunk)
+            finally:
+                await response.aclose()
+
+            if not self._is_zip_file(spool):
+                logger.warning(f"Downloaded content is not a ZIP: {dokument_id}")
+                spool.close()
+                return None
 
-                return content
+            await asyncio.to_thread(cache.put_file, dokument_id, spool)
+            return spool
 
         except Exception as e:
             logger.error(f"Async error downloading document {dokument_id}: {e}")
+            spool.close()
             return None
 
+    @staticmethod
+    def _is_zip_file(fileobj: BinaryIO) -> bool:
+        fileobj.seek(0)
+        magic = fileobj.read(2)
+        fileobj.seek(0)
+        return magic == b'PK'
+
     # =========================================================================
     # DATA PARSING
     # =========================================================================
@@ -703,7 +963,7 @@ class BolagsverketVDMClient:
             return False
 
         try:
-            response = requests.get(
+            response = self._get_session().get(
                 f"{self.api_base_url}/isalive",
                 headers={"Authorization": f"Bearer {token}"},
                 timeout=10
@@ -722,25 +982,47 @@ class BolagsverketVDMClient:
             return False
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.api_base_url}/isalive",
-                    headers={"Authorization": f"Bearer {token}"},
-                    timeout=10
-                )
-                return response.status_code == 200 and response.text.strip() == "OK"
+            response = await self._get_async_client().get(
+                f"{self.api_base_url}/isalive",
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=10
+            )
+            return response.status_code == 200 and response.text.strip() == "OK"
         except Exception:
             return False
 
 
+# Shared clients per credentials/environment, so all callers reuse one pool
+_shared_clients: Dict[tuple, BolagsverketVDMClient] = {}
+_shared_lock = threading.Lock()
+
+
 def get_bolagsverket_vdm_client(
     client_id: str = None,
     client_secret: str = None,
     environment: str = "production"
 ) -> BolagsverketVDMClient:
-    """Factory function to create Bolagsverket VDM client."""
-    return BolagsverketVDMClient(
-        client_id=client_id,
-        client_secret=client_secret,
-        environment=environment
+    """Get the shared Bolagsverket VDM client for these credentials."""
+    key = (
+        client_id or os.environ.get("BOLAGSVERKET_CLIENT_ID"),
+        client_secret or os.environ.get("BOLAGSVERKET_CLIENT_SECRET"),
+        environment
     )
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = BolagsverketVDMClient(
+                client_id=client_id,
+                client_secret=client_secret,
+                environment=environment
+            )
+            _shared_clients[key] = client
+        return client
+
+
+async def close_shared_clients():
+    """Close the connection pools of all shared clients (e.g. on app shutdown)."""
+    with _shared_lock:
+        clients = list(_shared_clients.values())
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,360 @@
+"""
+On-disk cache for Bolagsverket VDM documents
+
+Annual reports never change once filed, so each document is downloaded
+once and served from disk afterwards (re-parsing, backfills, parser
+upgrades).
+
+Layout under VDM_DOCUMENT_CACHE_DIR:
+    refs/<dokumentId>          sha256 of the document's content
+    blobs/<ab>/<sha256>.z      zlib-compressed content
+    blobs/<ab>/<sha256>.raw    content that didn't compress (most ZIPs)
+
+Blobs are content-addressed, so identical documents are stored once.
+Reads verify the sha256 and drop entries that fail. Total blob size is
+kept under VDM_DOCUMENT_CACHE_MAX_MB by evicting least recently used
+blobs (reads touch the blob's mtime). All writes go through a temp file
+and os.replace, so several processes can share one directory.
+
+open()/put_file() do the same with files, in fixed-size chunks, so large
+reports never have to be held in memory.
+"""
+
+import os
+import re
+import zlib
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, BinaryIO
+
+try:
+    from ..logging_config import get_source_logger
+except ImportError:
+    import logging
+    def get_source_logger(name):
+        return logging.getLogger(name)
+
+logger = get_source_logger("document_cache")
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+
+VDM_DOCUMENT_CACHE_DIR = os.environ.get("VDM_DOCUMENT_CACHE_DIR", str(_REPO_ROOT / "data" / "vdm-documents"))
+VDM_DOCUMENT_CACHE_MAX_MB = float(os.environ.get("VDM_DOCUMENT_CACHE_MAX_MB", "2048"))
+
+# Keep the compressed copy only if it saves at least this much
+MIN_COMPRESSION_SAVING = 0.05
+
+# open() hands out files that stay in memory up to this size, then spill to disk
+SPOOL_MAX_BYTES = int(os.environ.get("VDM_SPOOL_MAX_BYTES", str(2 * 1024 * 1024)))
+CHUNK_BYTES = 64 * 1024
+
+_SAFE_ID = re.compile(r"[^A-Za-z0-9._-]")
+
+
+class DocumentCache:
+    """
+    Content-addressed document store keyed by dokumentId.
+
+    Usage:
+        cache = get_document_cache()
+        content = cache.get(dokument_id)
+        if content is None:
+            content = download(dokument_id)
+            cache.put(dokument_id, content)
+    """
+
+    def __init__(self, root: str = VDM_DOCUMENT_CACHE_DIR, max_bytes: int = int(VDM_DOCUMENT_CACHE_MAX_MB * 1024 * 1024)):
+        """
+        Initialize cache.
+
+        Args:
+            root: Cache directory (created on first write)
+            max_bytes: Upper bound for the total size of stored blobs
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._refs = self.root / "refs"
+        self._blobs = self.root / "blobs"
+
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # total blob bytes, scanned lazily
+
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        self.evictions = 0
+
+    # =========================================================================
+    # PATHS
+    # =========================================================================
+
+    def _ref_path(self, dokument_id: str) -> Path:
+        return self._refs / _SAFE_ID.sub("_", dokument_id)
+
+    def _blob_paths(self, digest: str) -> Tuple[Path, Path]:
+        folder = self._blobs / digest[:2]
+        return folder / f"{digest}.z", folder / f"{digest}.raw"
+
+    def _write_atomic(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    # =========================================================================
+    # READ / WRITE
+    # =========================================================================
+
+    def get(self, dokument_id: str) -> Optional[bytes]:
+        """Cached content for a document, or None (missing or failed integrity check)."""
+        try:
+            digest = self._ref_path(dokument_id).read_text().strip()
+        except OSError:
+            self.misses += 1
+            return None
+
+        compressed, raw = self._blob_paths(digest)
+        try:
+            if compressed.exists():
+                path, content = compressed, zlib.decompress(compressed.read_bytes())
+            else:
+                path, content = raw, raw.read_bytes()
+        except (OSError, zlib.error):
+            content = None
+
+        if content is None or hashlib.sha256(content).hexdigest() != digest:
+            if content is not None:
+                self.corrupt += 1
+                logger.warning(f"Dropping corrupt cached document {dokument_id}")
+            self._remove(self._ref_path(dokument_id), compressed, raw)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU: mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return content
+
+    def put(self, dokument_id: str, content: bytes) -> str:
+        """Store a document; returns its sha256. Write errors are logged, not raised."""
+        digest = hashlib.sha256(content).hexdigest()
+        compressed, raw = self._blob_paths(digest)
+
+        try:
+            if compressed.exists() or raw.exists():
+                added = 0
+            else:
+                packed = zlib.compress(content, 6)
+                if len(packed) <= len(content) * (1 - MIN_COMPRESSION_SAVING):
+                    self._write_atomic(compressed, packed)
+                    added = len(packed)
+                else:
+                    self._write_atomic(raw, content)
+                    added = len(content)
+
+            self._write_atomic(self._ref_path(dokument_id), digest.encode())
+        except OSError as e:
+            logger.warning(f"Could not cache document {dokument_id}: {e}")
+            return digest
+
+        if added:
+            with self._lock:
+                if self._size is not None:
+                    self._size += added
+            self._evict_if_needed()
+        return digest
+
+    def open(self, dokument_id: str) -> Optional[BinaryIO]:
+        """
+        Cached content as a file positioned at 0 (caller closes), or None.
+
+        Same integrity check as get(), done while streaming.
+        """
+        try:
+            digest = self._ref_path(dokument_id).read_text().strip()
+        except OSError:
+            self.misses += 1
+            return None
+
+        compressed, raw = self._blob_paths(digest)
+        out = None
+        try:
+            if compressed.exists():
+                path = compressed
+                out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+                decompressor = zlib.decompressobj()
+                with open(compressed, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                        out.write(decompressor.decompress(chunk))
+                out.write(decompressor.flush())
+            else:
+                path = raw
+                out = open(raw, "rb")
+            out.seek(0)
+            hasher = hashlib.sha256()
+            for chunk in iter(lambda: out.read(CHUNK_BYTES), b""):
+                hasher.update(chunk)
+            out.seek(0)
+            valid = hasher.hexdigest() == digest
+        except (OSError, zlib.error):
+            valid = None
+
+        if not valid:
+            if out is not None:
+                out.close()
+            if valid is False:
+                self.corrupt += 1
+                logger.warning(f"Dropping corrupt cached document {dokument_id}")
+            self._remove(self._ref_path(dokument_id), compressed, raw)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return out
+
+    def put_file(self, dokument_id: str, fileobj: BinaryIO) -> Optional[str]:
+        """
+        Store a document from a seekable file; returns its sha256.
+
+        The file is read in chunks and left positioned at 0. Write errors are
+        logged, not raised (returns None).
+        """
+        try:
+            fileobj.seek(0)
+            hasher = hashlib.sha256()
+            compressor = zlib.compressobj(6)
+            self._blobs.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self._blobs, prefix=".tmp-")
+            size = packed_size = 0
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in iter(lambda: fileobj.read(CHUNK_BYTES), b""):
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        packed = compressor.compress(chunk)
+                        packed_size += len(packed)
+                        f.write(packed)
+                    tail = compressor.flush()
+                    packed_size += len(tail)
+                    f.write(tail)
+
+                digest = hasher.hexdigest()
+                compressed, raw = self._blob_paths(digest)
+                added = 0
+                if not (compressed.exists() or raw.exists()):
+                    compressed.parent.mkdir(parents=True, exist_ok=True)
+                    if packed_size <= size * (1 - MIN_COMPRESSION_SAVING):
+                        os.replace(tmp, compressed)
+                        added = packed_size
+                    else:
+                        with open(tmp, "wb") as f:
+                            fileobj.seek(0)
+                            for chunk in iter(lambda: fileobj.read(CHUNK_BYTES), b""):
+                                f.write(chunk)
+                        os.replace(tmp, raw)
+                        added = size
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                fileobj.seek(0)
+
+            self._write_atomic(self._ref_path(dokument_id), digest.encode())
+        except OSError as e:
+            logger.warning(f"Could not cache document {dokument_id}: {e}")
+            return None
+
+        if added:
+            with self._lock:
+                if self._size is not None:
+                    self._size += added
+            self._evict_if_needed()
+        return digest
+
+    def invalidate(self, dokument_id: str):
+        """Forget a document (the blob stays until evicted; other refs may share it)."""
+        self._remove(self._ref_path(dokument_id))
+
+    # =========================================================================
+    # EVICTION
+    # =========================================================================
+
+    def _remove(self, *paths: Path):
+        for path in paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _scan_blobs(self) -> List[Tuple[float, int, Path]]:
+        blobs = []
+        if self._blobs.exists():
+            for path in self._blobs.glob("*/*"):
+                if path.name.startswith(".tmp-"):
+                    continue
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, path))
+        return blobs
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan_blobs())
+            if self._size <= self.max_bytes:
+                return
+
+            # Full scan: other processes may have added or touched blobs
+            blobs = sorted(self._scan_blobs())
+            total = sum(size for _, size, _ in blobs)
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in blobs:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+                self.evictions += 1
+            self._size = total
+        # Refs to evicted blobs are dropped lazily by get()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "dir": str(self.root),
+            "max_bytes": self.max_bytes,
+            "stored_bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+            "corrupt": self.corrupt,
+            "evictions": self.evictions
+        }
+
+
+# Singleton
+_cache: Optional[DocumentCache] = None
+
+
+def get_document_cache() -> DocumentCache:
+    """Get or create the document cache singleton."""
+    global _cache
+    if _cache is None:
+        _cache = DocumentCache()
+    return _cache
@@ -0,0 +1,98 @@
+"""
+Fast extraction of embedded page JSON (Next.js __NEXT_DATA__)
+
+Finds the payload of <script id="__NEXT_DATA__"> with plain string
+searches and decodes only that slice, instead of building a full HTML tree.
+Works on both str and bytes - pass response.content to skip decoding the
+whole page. Uses orjson when installed.
+"""
+
+import re
+import json
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+Html = Union[str, bytes]
+
+_INITIAL_DATA_RE = re.compile(r'window\.__INITIAL_DATA__\s*=\s*({.*?});', re.DOTALL)
+_INITIAL_DATA_RE_BYTES = re.compile(rb'window\.__INITIAL_DATA__\s*=\s*({.*?});', re.DOTALL)
+
+
+def _markers(html: Html, *markers: str):
+    if isinstance(html, bytes):
+        return tuple(m.encode() for m in markers)
+    return markers
+
+
+def find_script_payload(html: Html, script_id: str = "__NEXT_DATA__") -> Optional[Html]:
+    """
+    Return the raw text of <script id="script_id">...</script>, or None.
+
+    Located by offset: find the id attribute, step back to the opening
+    <script, forward to the end of the tag and to the closing </script>.
+    """
+    script_open, tag_end, script_close = _markers(html, "<script", ">", "</script>")
+
+    for quote in ('"', "'"):
+        (id_attr,) = _markers(html, f"id={quote}{script_id}{quote}")
+        idx = html.find(id_attr)
+        while idx >= 0:
+            # The attribute must belong to a <script> tag that is still open at
+            # idx; an element with the same id earlier in the page is skipped
+            tag_start = html.rfind(script_open, 0, idx)
+            if tag_start < 0 or html.find(tag_end, tag_start, idx) >= 0:
+                idx = html.find(id_attr, idx + len(id_attr))
+                continue
+
+            start = html.find(tag_end, idx)
+            if start < 0:
+                return None
+            start += 1
+            end = html.find(script_close, start)
+            if end < 0:
+                return None
+            return html[start:end]
+
+    return None
+
+
+def extract_next_data(html: Html) -> Optional[Any]:
+    """Decode the __NEXT_DATA__ JSON document, or None if missing/invalid."""
+    payload = find_script_payload(html, "__NEXT_DATA__")
+    if not payload or not payload.strip():
+        return None
+    try:
+        return _loads(payload)
+    except ValueError:  # json/orjson JSONDecodeError are ValueErrors
+        return None
+
+
+def extract_initial_data(html: Html) -> Optional[Any]:
+    """
+    Decode the old `window.__INITIAL_DATA__ = {...};` format, or None.
+
+    The regex only runs on the script that contains the assignment, not on
+    the whole page.
+    """
+    marker, script_open, script_close = _markers(html, "window.__INITIAL_DATA__", "<script", "</script>")
+    idx = html.find(marker)
+    if idx < 0:
+        return None
+
+    start = html.rfind(script_open, 0, idx)
+    end = html.find(script_close, idx)
+    script = html[max(start, 0):end if end >= 0 else len(html)]
+
+    pattern = _INITIAL_DATA_RE_BYTES if isinstance(html, bytes) else _INITIAL_DATA_RE
+    match = pattern.search(script)
+    if not match:
+        return None
+    try:
+        return _loads(match.group(1))
+    except ValueError:
+        return None
@@ -0,0 +1,237 @@
+"""
+Adaptive rate limiter for scrapers
+
+Token bucket (GCRA) shared by any number of sync and async callers, with
+AIMD rate control:
+- Additive increase after each fast, successful response
+- Multiplicative decrease on 429/5xx (and a pause honouring Retry-After)
+- Gentle decrease when latency rises above a target
+
+Callers reserve a slot under a lock and then sleep outside it, so workers
+never hold the lock while waiting.
+
+Limiters are shared per host across the process via get_host_limiter();
+per-host rates come from configure_host() or SCRAPER_HOST_RATES
+("host=rate[:max_rate],..."). Clients can register_host_defaults() for
+the hosts they call; explicit configuration wins over those.
+
+Reservations are handed out in arrival order, so waiting callers are
+served first come, first served.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Optional, Dict, Any, Callable
+from urllib.parse import urlparse
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared request pacer that converges on the rate a host tolerates.
+
+    Usage:
+        limiter = AdaptiveRateLimiter(rate=1.0, max_rate=5.0)
+
+        await limiter.acquire_async()      # or limiter.acquire()
+        start = time.perf_counter()
+        response = await client.get(url)
+        limiter.record(response.status_code, time.perf_counter() - start)
+    """
+
+    def __init__(self,
+                 rate: float = 1.0,
+                 min_rate: float = 0.2,
+                 max_rate: float = 5.0,
+                 burst: int = 1,
+                 increase: float = 0.05,
+                 decrease: float = 0.5,
+                 latency_target: float = 2.0,
+                 backoff_seconds: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize limiter.
+
+        Args:
+            rate: Starting rate in requests per second
+            min_rate: Lower bound for the rate
+            max_rate: Upper bound for the rate
+            burst: Requests allowed back-to-back before pacing kicks in
+            increase: Requests/s added after each healthy response
+            decrease: Rate multiplier on 429/5xx
+            latency_target: Responses slower than this (seconds) lower the rate slightly
+            backoff_seconds: Pause after a 429/5xx when no Retry-After is given
+            clock: Monotonic time source in seconds
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.backoff_seconds = backoff_seconds
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._tat = 0.0  # theoretical arrival time of the next request
+        self._last_decrease = float("-inf")
+
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.waited_seconds = 0.0
+
+    # =========================================================================
+    # PACING
+    # =========================================================================
+
+    def reserve(self) -> float:
+        """Reserve the next slot. Returns seconds to wait before sending."""
+        with self._lock:
+            now = self._clock()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            wait = max(0.0, tat - now - (self.burst - 1) * interval)
+            self._tat = tat + interval
+            self.requests += 1
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait (without blocking the loop) until a request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # =========================================================================
+    # FEEDBACK
+    # =========================================================================
+
+    def record(self, status_code: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """
+        Feed back the outcome of a request.
+
+        Args:
+            status_code: HTTP status (None for connection errors/timeouts)
+            latency: Response time in seconds
+            retry_after: Parsed Retry-After header, if any
+        """
+        with self._lock:
+            now = self._clock()
+
+            if status_code is None or status_code == 429 or status_code >= 500:
+                if status_code == 429:
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+                # One decrease per backoff window: in-flight requests sent at the
+                # old rate will fail too and shouldn't compound the cut
+                if now - self._last_decrease >= self.backoff_seconds:
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self._last_decrease = now
+                pause = retry_after if retry_after is not None else self.backoff_seconds
+                # Shift past the burst allowance so the next reservation really waits `pause`
+                self._tat = max(self._tat, now + pause + (self.burst - 1) / self.rate)
+                return
+
+            if latency > self.latency_target:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            elif status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "waited_seconds": round(self.waited_seconds, 1)
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (HTTP dates are ignored)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+# =============================================================================
+# PER-HOST REGISTRY
+# =============================================================================
+
+def _parse_host_rates(value: str) -> Dict[str, Dict[str, float]]:
+    """Parse 'host=rate[:max_rate],...' (e.g. 'www.allabolag.se=1:3')."""
+    config = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        host, _, rates = entry.partition("=")
+        try:
+            rate, _, max_rate = rates.partition(":")
+            config[host.strip().lower()] = {
+                "rate": float(rate),
+                "max_rate": float(max_rate) if max_rate else float(rate)
+            }
+        except ValueError:
+            continue
+    return config
+
+
+# Per-host settings, overridable with SCRAPER_HOST_RATES
+HOST_RATE_LIMITS: Dict[str, Dict[str, float]] = _parse_host_rates(
+    os.environ.get("SCRAPER_HOST_RATES", "")
+)
+
+_host_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def configure_host(host: str, **settings):
+    """
+    Set limiter settings for a host (AdaptiveRateLimiter keyword arguments).
+
+    Replaces the host's limiter, so call it before scraping starts.
+    """
+    host = host.lower()
+    with _registry_lock:
+        HOST_RATE_LIMITS[host] = settings
+        _host_limiters.pop(host, None)
+
+
+def register_host_defaults(host: str, **settings):
+    """Default limiter settings for a host, unless it is already configured."""
+    host = host.lower()
+    with _registry_lock:
+        HOST_RATE_LIMITS.setdefault(host, settings)
+
+
+def get_host_limiter(host: str, default_rate: float = 1.0) -> AdaptiveRateLimiter:
+    """
+    Get the process-wide limiter for a host.
+
+    All scraper instances and coroutines hitting the same host share it.
+    Hosts without configuration get a fixed `default_rate` (no ramp-up),
+    which still backs off on 429/5xx.
+    """
+    host = (host or "").lower()
+    with _registry_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            settings = HOST_RATE_LIMITS.get(host) or {"rate": default_rate, "max_rate": default_rate}
+            limiter = AdaptiveRateLimiter(**settings)
+            _host_limiters[host] = limiter
+        return limiter
+
+
+def get_host_limiter_for_url(url: str, default_rate: float = 1.0) -> AdaptiveRateLimiter:
+    return get_host_limiter(urlparse(url).hostname, default_rate)
@@ -3,24 +3,44 @@
 Batch-uppdatering av Allabolag-data.
 
 - Uppdaterar ca 200 bolag per dygn
-- Respekterar cache (last_synced_at)
+- Prioriterar bolag där data troligen ändrats: nya POIT-kungörelser,
+  nyemissioner och bevakade bolag före bolag som bara är gamla
+- Respekterar cache (last_synced_at), utom för bolag med nya händelser
 - Lagrar till company_details/company_roles/company_financials
+- Parallella workers med delad adaptiv rate limiter (ökar takten tills
+  allabolag svarar med 429/5xx eller blir långsamt)
+- Skrivningar buffras och skrivs för FLUSH_SIZE bolag åt gången
+- Checkpoint efter varje skrivning - en avbruten körning återupptas
 """
 
 import os
 import sys
-import time
-from datetime import datetime, timezone
+import json
+import asyncio
+from datetime import datetime, timezone, timedelta
 
 from supabase import create_client
 
 # Local import
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 from scrapers.allabolag_scraper import AllabolagScraper
+from scrapers.allabolag_writer import AllabolagWriteBuffer, WriteBufferFlushError
+from scrapers.refresh_priority import RefreshPrioritizer
+from scrapers.rate_limiter import configure_host, get_host_limiter
 
 BATCH_SIZE = int(os.environ.get("ALLABOLAG_BATCH_SIZE", "200"))
 CACHE_HOURS = int(os.environ.get("ALLABOLAG_CACHE_HOURS", "168"))
+WORKERS = int(os.environ.get("ALLABOLAG_WORKERS", "4"))
+START_RATE = float(os.environ.get("ALLABOLAG_START_RATE", "1.0"))
+MAX_RATE = float(os.environ.get("ALLABOLAG_MAX_RATE", "5.0"))
+FLUSH_SIZE = int(os.environ.get("ALLABOLAG_FLUSH_SIZE", "50"))
+FLUSH_MAX_AGE = 30.0
+STALE_LOCK_HOURS = 6
 JOB_NAME = "allabolag_daily"
+CHECKPOINT_PATH = os.environ.get(
+    "ALLABOLAG_CHECKPOINT",
+    os.path.join(os.path.dirname(__file__), "..", "data", "allabolag-batch-checkpoint.json")
+)
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
@@ -32,13 +52,24 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 sb = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
+def lock_is_stale(started_at):
+    """A run that crashed never releases its lock - ignore it after STALE_LOCK_HOURS."""
+    if not started_at:
+        return True
+    try:
+        started = datetime.fromisoformat(started_at.replace("Z", "+00:00"))
+    except ValueError:
+        return True
+    return datetime.now(timezone.utc) - started > timedelta(hours=STALE_LOCK_HOURS)
+
+
 def acquire_job_lock():
     now = datetime.now(timezone.utc).isoformat()
     job = sb.table("sync_jobs").select("status, started_at").eq("job_name", JOB_NAME).execute()
 
     if job.data:
         row = job.data[0]
-        if row.get("status") == "running":
+        if row.get("status") == "running" and not lock_is_stale(row.get("started_at")):
             print("Job already running, exiting")
             return False
 
@@ -65,48 +96,176 @@ def fetch_company_orgnrs():
     return [row.get("orgnr") for row in (result.data or []) if row.get("orgnr")]
 
 
-def fetch_last_synced():
-    result = sb.table("company_details").select("orgnr, last_synced_at").execute()
-    return {row["orgnr"]: row.get("last_synced_at") for row in (result.data or []) if row.get("orgnr")}
+def fetch_last_synced(orgnrs, chunk_size=200):
+    """last_synced_at for the given companies only, one `in_` query per chunk."""
+    last_synced = {}
+    for i in range(0, len(orgnrs), chunk_size):
+        result = sb.table("company_details") \
+            .select("orgnr, last_synced_at") \
+            .in_("orgnr", orgnrs[i:i + chunk_size]) \
+            .execute()
+        last_synced.update({row["orgnr"]: row.get("last_synced_at") for row in (result.data or [])})
+    return last_synced
 
 
-def sort_candidates(orgnrs, last_synced_map):
-    def key(orgnr):
-        ts = last_synced_map.get(orgnr)
-        if not ts:
-            return (0, datetime.min)
-        try:
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-        except ValueError:
-            dt = datetime.min
-        return (1, dt)
+def prioritize_candidates(orgnrs, last_synced_map):
+    """
+    Rank by change likelihood (staleness + POIT/offering/watchlist signals).
 
-    return sorted(orgnrs, key=key)
+    Returns the ranked RefreshCandidates, highest priority first.
+    """
+    prioritizer = RefreshPrioritizer(cache_hours=CACHE_HOURS)
+    prioritizer.load_signals(sb)
+    print(f"Change signals: {len(prioritizer.signals)} companies, {len(prioritizer.watchers)} watched")
+    return prioritizer.rank(orgnrs, last_synced_map)
 
 
-def main():
-    if not acquire_job_lock():
-        return
+def load_checkpoint():
+    """Return the interrupted run's checkpoint, or None."""
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if not checkpoint.get("candidates"):
+        return None
+    return checkpoint
+
 
+def save_checkpoint(checkpoint):
+    """Write atomically so a kill mid-write can't corrupt the file."""
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    tmp_path = CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+
+def clear_checkpoint():
     try:
-        orgnrs = fetch_company_orgnrs()
-        last_synced = fetch_last_synced()
-        candidates = sort_candidates(orgnrs, last_synced)[:BATCH_SIZE]
-
-        scraper = AllabolagScraper(
-            supabase_url=SUPABASE_URL,
-            supabase_key=SUPABASE_KEY,
-            cache_hours=CACHE_HOURS
-        )
-
-        for idx, orgnr in enumerate(candidates, start=1):
-            print(f"[{idx}/{len(candidates)}] Scraping {orgnr}")
+        os.remove(CHECKPOINT_PATH)
+    except FileNotFoundError:
+        pass
+
+
+async def run_batch(candidates, checkpoint):
+    # Process-wide limiter for allabolag, shared by every worker and request
+    configure_host("www.allabolag.se", rate=START_RATE, max_rate=MAX_RATE, burst=WORKERS)
+    limiter = get_host_limiter("www.allabolag.se")
+    done = set(checkpoint["done"])
+    # Companies with changes since their last sync skip the cache check
+    forced = set(checkpoint.get("force", []))
+    pending = [orgnr for orgnr in candidates if orgnr not in done]
+    if done:
+        print(f"Resuming: {len(done)} done, {len(pending)} left")
+
+    queue = asyncio.Queue()
+    for orgnr in pending:
+        queue.put_nowait(orgnr)
+
+    buffer = AllabolagWriteBuffer(sb, flush_size=FLUSH_SIZE, max_age=FLUSH_MAX_AGE)
+    flush_lock = asyncio.Lock()
+
+    def mark_done(orgnr):
+        checkpoint["done"].append(orgnr)
+        checkpoint["failed"].pop(orgnr, None)
+
+    async def flush():
+        # Companies count as done only once their rows are written
+        async with flush_lock:
             try:
-                scraper.scrape_company(orgnr)
+                written = await asyncio.to_thread(buffer.flush)
+            except WriteBufferFlushError as exc:
+                print(exc)
+                for orgnr in exc.orgnrs:
+                    checkpoint["failed"][orgnr] = "write failed"
+                written = []
+            for orgnr in written:
+                mark_done(orgnr)
+            save_checkpoint(checkpoint)
+
+    async def worker():
+        while True:
+            try:
+                orgnr = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            buffered = False
+            try:
+                result, buffered = await scraper.scrape_and_buffer_async(orgnr, force=orgnr in forced)
+                if result is None:
+                    checkpoint["failed"][orgnr] = "no data"
             except Exception as exc:
                 print(f"Failed {orgnr}: {exc}")
-            time.sleep(1.2)
+                checkpoint["failed"][orgnr] = str(exc)
+
+            if not buffered:
+                # Cached or failed - nothing to write
+                checkpoint["done"].append(orgnr)
+                save_checkpoint(checkpoint)
+            elif buffer.is_due():
+                await flush()
+            print(f"[{len(checkpoint['done'])}/{len(candidates)}] {orgnr} (rate {limiter.rate:.2f}/s)")
+
+    async def flusher(workers_done):
+        # Time-based trigger for a buffer that fills slowly
+        while not workers_done.is_set():
+            await asyncio.sleep(1)
+            if buffer.is_due():
+                await flush()
+
+    # One pooled client for the whole batch: a handful of keep-alive connections
+    async with AllabolagScraper(
+        supabase_url=SUPABASE_URL,
+        supabase_key=SUPABASE_KEY,
+        cache_hours=CACHE_HOURS,
+        write_buffer=buffer
+    ) as scraper:
+        # One bulk query per 200 companies instead of two queries per company
+        await asyncio.to_thread(scraper.prefetch_cache, pending)
+
+        workers_done = asyncio.Event()
+        flush_task = asyncio.create_task(flusher(workers_done))
+        await asyncio.gather(*(worker() for _ in range(WORKERS)))
+        workers_done.set()
+        await flush_task
+        await flush()
+
+    print(f"Rate limiter: {limiter.get_stats()}")
+    print(f"Write buffer: {buffer.get_stats()}")
+
+
+def main():
+    if not acquire_job_lock():
+        return
+
+    try:
+        checkpoint = load_checkpoint()
+        if checkpoint:
+            candidates = checkpoint["candidates"]
+        else:
+            orgnrs = fetch_company_orgnrs()
+            last_synced = fetch_last_synced(orgnrs)
+            ranked = prioritize_candidates(orgnrs, last_synced)[:BATCH_SIZE]
+            candidates = [c.orgnr for c in ranked]
+            checkpoint = {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "candidates": candidates,
+                "force": [c.orgnr for c in ranked if c.force],
+                "priorities": [c.to_dict() for c in ranked],
+                "done": [],
+                "failed": {}
+            }
+            save_checkpoint(checkpoint)
+
+        asyncio.run(run_batch(candidates, checkpoint))
 
+        print(f"Done: {len(checkpoint['done'])} companies, {len(checkpoint['failed'])} failed")
+        if len(set(checkpoint["done"])) >= len(candidates):
+            clear_checkpoint()
+        else:
+            # Unwritten companies are picked up by the next run
+            print(f"Keeping checkpoint: {len(candidates) - len(set(checkpoint['done']))} companies not written")
         release_job_lock("done")
     except Exception as exc:
         print(f"Batch failed: {exc}")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Bulk-synk av årsredovisningar (iXBRL) från Bolagsverket VDM.
+
+- Kör en lista med orgnr genom en pipeline: dokumentlista -> nedladdning
+  -> parsning -> lagring, med egen samtidighet per steg
+- Alla VDM-anrop går genom den delade hastighetsregulatorn
+- Nedladdade dokument cachas på disk (VDM_DOCUMENT_CACHE_DIR)
+- Fakta sparas som JSON per dokument under ANNUAL_REPORT_FACTS_DIR;
+  dokument som redan finns hoppas över (utom med --force)
+- Checkpoint efter varje klart bolag - en avbruten körning återupptas
+- --reparse: parsar om alla lagrade dokument från dokumentcachen i en
+  processpool (t.ex. efter taxonomi- eller parserändring), utan VDM-anrop
+- Nya/omparsade dokument skrivs till det kolumnära faktalagret
+  (XBRL_FACT_STORE_DIR) i omgångar, om pyarrow finns
+
+Användning:
+    python scripts/annual-report-batch-sync.py orgnr.txt --years 5
+    python scripts/annual-report-batch-sync.py --watchlist
+    cat orgnr.txt | python scripts/annual-report-batch-sync.py -
+    python scripts/annual-report-batch-sync.py --reparse [orgnr.txt]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.scrapers.bolagsverket_vdm import get_bolagsverket_vdm_client, close_shared_clients
+from lib.scrapers.annual_report_pipeline import AnnualReportPipeline
+from lib.parsers.ixbrl import analyze_ixbrl_archive
+from lib.parsers.ixbrl_batch import ParseJob, parse_archives_parallel
+from lib.api.xbrl_fact_store import get_xbrl_fact_store
+
+LIST_WORKERS = int(os.environ.get("ANNUAL_REPORT_LIST_WORKERS", "4"))
+DOWNLOAD_WORKERS = int(os.environ.get("ANNUAL_REPORT_DOWNLOAD_WORKERS", "8"))
+PARSE_WORKERS = int(os.environ.get("ANNUAL_REPORT_PARSE_WORKERS", "4"))
+STORE_WORKERS = int(os.environ.get("ANNUAL_REPORT_STORE_WORKERS", "2"))
+REPARSE_WORKERS = int(os.environ.get("ANNUAL_REPORT_REPARSE_WORKERS", os.cpu_count() or 1))
+PROGRESS_INTERVAL = 30.0
+FACT_STORE_BATCH = int(os.environ.get("XBRL_FACT_STORE_BATCH", "2000"))
+FACTS_DIR = os.environ.get(
+    "ANNUAL_REPORT_FACTS_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "annual-reports")
+)
+CHECKPOINT_PATH = os.environ.get(
+    "ANNUAL_REPORT_CHECKPOINT",
+    os.path.join(os.path.dirname(__file__), "..", "data", "annual-report-sync-checkpoint.json")
+)
+
+
+def normalize_orgnr(value):
+    return "".join(ch for ch in str(value or "") if ch.isdigit())
+
+
+def read_orgnrs(path):
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        return [orgnr for orgnr in (normalize_orgnr(line.split("#")[0]) for line in f) if orgnr]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def load_watchlist():
+    """All orgnrs in user_watchlists."""
+    from supabase import create_client
+
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_KEY")
+    if not url or not key:
+        print("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY")
+        sys.exit(1)
+    sb = create_client(url, key)
+
+    orgnrs, offset, page_size = [], 0, 1000
+    while True:
+        rows = sb.table("user_watchlists").select("orgnr").range(offset, offset + page_size - 1).execute().data or []
+        orgnrs.extend(normalize_orgnr(row.get("orgnr")) for row in rows)
+        if len(rows) < page_size:
+            break
+        offset += page_size
+    return [orgnr for orgnr in orgnrs if orgnr]
+
+
+# ===== Checkpoint =====
+
+def load_checkpoint(orgnrs):
+    """The interrupted run's checkpoint, if it was for the same companies."""
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if checkpoint.get("orgnrs") != orgnrs:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint):
+    """Write atomically so a kill mid-write can't corrupt the file."""
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    tmp_path = CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+
+def clear_checkpoint():
+    try:
+        os.remove(CHECKPOINT_PATH)
+    except FileNotFoundError:
+        pass
+
+
+# ===== Lagring =====
+
+def facts_path(orgnr, doc):
+    period = (doc.get("rapporteringsperiodTom") or "okand")[:10]
+    return os.path.join(FACTS_DIR, orgnr, f"{period}_{doc['dokumentId']}.json")
+
+
+def store_facts(orgnr, doc, analysis):
+    if analysis.get("error"):
+        raise ValueError(analysis["error"])
+
+    path = facts_path(orgnr, doc)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {
+        "orgnr": orgnr,
+        "document_id": analysis["document_id"],
+        "period_end": analysis["period_end"],
+        "registration_date": analysis["registration_date"],
+        "xhtml_files": analysis["xhtml_files"],
+        "contexts": analysis["contexts"],
+        "facts": analysis["all_facts"],
+        "synced_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def update_fact_store(paths):
+    """Skriv lagrade dokument till faktalagret, FACT_STORE_BATCH åt gången."""
+    store = get_xbrl_fact_store()
+    if not store.available:
+        print("pyarrow saknas - faktalagret uppdateras inte")
+        return
+    rows = 0
+    for start in range(0, len(paths), FACT_STORE_BATCH):
+        records = []
+        for path in paths[start:start + FACT_STORE_BATCH]:
+            with open(path, encoding="utf-8") as f:
+                records.append(json.load(f))
+        rows += store.write(records)
+    if paths:
+        print(f"Faktalager: {len(paths)} dokument, {rows} fakta skrivna")
+
+
+def stored_documents(orgnrs=None):
+    """ParseJob för varje lagrat dokument (valfritt bara för vissa bolag)."""
+    if not os.path.isdir(FACTS_DIR):
+        return
+    wanted = set(orgnrs) if orgnrs else None
+    for orgnr in sorted(os.listdir(FACTS_DIR)):
+        if wanted is not None and orgnr not in wanted:
+            continue
+        folder = os.path.join(FACTS_DIR, orgnr)
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(folder, name), encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  VARNING: kan inte läsa {orgnr}/{name}: {e}")
+                continue
+            yield ParseJob(orgnr, {
+                "dokumentId": record["document_id"],
+                "rapporteringsperiodTom": record["period_end"],
+                "registreringstidpunkt": record["registration_date"],
+            })
+
+
+# ===== Körning =====
+
+def reparse(orgnrs):
+    """Parsa om lagrade dokument från dokumentcachen och skriv över faktan."""
+    print(f"Parsar om med {REPARSE_WORKERS} processer")
+    started = last_report = time.monotonic()
+    stored = failed = 0
+    stored_paths = []
+    for job, report in parse_archives_parallel(stored_documents(orgnrs), workers=REPARSE_WORKERS):
+        try:
+            stored_paths.append(store_facts(job.orgnr, job.doc, report.to_analysis()))
+            stored += 1
+        except Exception as e:
+            failed += 1
+            print(f"  ✗ {job.orgnr}/{job.doc['dokumentId']}: {e}")
+
+        if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            rate = (stored + failed) / (last_report - started) * 60
+            print(f"  {stored} omparsade, {failed} fel ({rate:.0f} dokument/min)")
+
+    elapsed = time.monotonic() - started
+    print(f"\nKlart: {stored} omparsade, {failed} fel på {elapsed:.0f} s")
+    update_fact_store(stored_paths)
+    if failed:
+        print("Dokument som saknas i cachen synkas om med --force")
+
+
+async def run(orgnrs, years, force):
+    client = get_bolagsverket_vdm_client()
+    if not client.is_configured:
+        print("Missing BOLAGSVERKET_CLIENT_ID or BOLAGSVERKET_CLIENT_SECRET")
+        sys.exit(1)
+
+    checkpoint = (not force and load_checkpoint(orgnrs)) or {
+        "orgnrs": orgnrs,
+        "done": [],
+        "failed": [],
+        "started_at": datetime.now(timezone.utc).isoformat(),
+    }
+    done = set(checkpoint["done"])
+    pending = [orgnr for orgnr in orgnrs if orgnr not in done]
+    if done:
+        print(f"Resuming: {len(done)} done, {len(pending)} left")
+
+    pipeline = None
+    last_report = time.monotonic()
+    stored_paths = []
+
+    def store(orgnr, doc, analysis):
+        stored_paths.append(store_facts(orgnr, doc, analysis))
+
+    def on_company_done(orgnr, ok):
+        nonlocal last_report
+        if ok:
+            checkpoint["done"].append(orgnr)
+            if orgnr in checkpoint["failed"]:
+                checkpoint["failed"].remove(orgnr)
+        elif orgnr not in checkpoint["failed"]:
+            checkpoint["failed"].append(orgnr)
+        save_checkpoint(checkpoint)
+
+        if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            s = pipeline.stats.to_dict()
+            print(f"  {s['companies_done'] + s['companies_failed']}/{s['companies']} bolag, "
+                  f"{s['stored']} lagrade, {s['skipped']} hoppade över, {s['failed']} fel "
+                  f"({s['companies_per_min']} bolag/min, takt {client.get_rate_stats()['rate']}/s)")
+
+    pipeline = AnnualReportPipeline(
+        client,
+        parse=analyze_ixbrl_archive,
+        store=store,
+        years=years,
+        skip_document=None if force else (lambda orgnr, doc: os.path.exists(facts_path(orgnr, doc))),
+        on_company_done=on_company_done,
+        list_workers=LIST_WORKERS,
+        download_workers=DOWNLOAD_WORKERS,
+        parse_workers=PARSE_WORKERS,
+        store_workers=STORE_WORKERS,
+    )
+
+    try:
+        stats = await pipeline.run(pending)
+    finally:
+        await close_shared_clients()
+        update_fact_store(stored_paths)
+
+    print(f"\nKlart: {json.dumps(stats.to_dict(), ensure_ascii=False)}")
+    print(f"VDM: {json.dumps(client.get_rate_stats())}")
+    if checkpoint["failed"]:
+        print(f"{len(checkpoint['failed'])} bolag misslyckades - kör igen för att försöka på nytt")
+    else:
+        clear_checkpoint()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk sync annual reports from Bolagsverket VDM")
+    parser.add_argument("orgnr_file", nargs="?", help="Fil med ett orgnr per rad ('-' för stdin)")
+    parser.add_argument("--watchlist", action="store_true", help="Synka alla bevakade bolag")
+    parser.add_argument("--years", type=int, default=5, help="Antal senaste år per bolag")
+    parser.add_argument("--force", action="store_true", help="Synka om även redan lagrade dokument")
+    parser.add_argument("--reparse", action="store_true", help="Parsa om lagrade dokument från cachen")
+    args = parser.parse_args()
+
+    if args.reparse:
+        orgnrs = load_watchlist() if args.watchlist else (read_orgnrs(args.orgnr_file) if args.orgnr_file else None)
+        reparse(orgnrs)
+        return
+
+    if args.watchlist:
+        orgnrs = load_watchlist()
+    elif args.orgnr_file:
+        orgnrs = read_orgnrs(args.orgnr_file)
+    else:
+        parser.error("ange orgnr_file eller --watchlist")
+
+    orgnrs = list(dict.fromkeys(orgnrs))
+    print(f"{len(orgnrs)} bolag, {args.years} år var")
+    asyncio.run(run(orgnrs, args.years, args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parsning av allabolag-sidor i lib/scrapers/allabolag_core.py.
+
+Mäter extraktion (sidans JSON) och strukturering (vårt format) var för sig.
+Båda AllabolagScraper-klasserna använder samma kärna, så siffrorna gäller
+både lib/ och src/.
+
+Användning:
+    python scripts/benchmark-allabolag-core.py
+    python scripts/benchmark-allabolag-core.py data/allabolag-pages --rounds 20
+
+Utan katalog används testsidorna i tests/fixtures/allabolag. Sidor som
+slutar på _organisation.html räknas som organisationssidor till bolaget
+med samma prefix.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.scrapers.allabolag_core import extract_page_data, structure_company
+
+DEFAULT_PAGES = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "allabolag")
+
+
+def timed(func, items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            func(*item)
+    return (time.perf_counter() - start) / (rounds * len(items)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Allabolag parsing core")
+    parser.add_argument("pages_dir", nargs="?", default=DEFAULT_PAGES, help="Katalog med sparade .html-sidor")
+    parser.add_argument("--rounds", type=int, default=200, help="Antal varv över alla sidor")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.pages_dir).glob("*.html") if not p.stem.endswith("_organisation"))
+    if not paths:
+        print(f"Inga .html-filer i {args.pages_dir}")
+        sys.exit(1)
+
+    pages = []
+    for path in paths:
+        org_path = path.with_name(f"{path.stem.replace('_company', '')}_organisation.html")
+        org = org_path.read_bytes() if org_path.exists() else None
+        pages.append((path.stem, path.read_bytes(), org))
+
+    total_mb = sum(len(main) + len(org or b"") for _, main, org in pages) / 1e6
+    print(f"{len(pages)} bolag, {total_mb:.2f} MB, {args.rounds} varv")
+
+    extract_ms = timed(lambda main, org: (extract_page_data(main), extract_page_data(org)),
+                       [(main, org) for _, main, org in pages], args.rounds)
+
+    parsed = []
+    for name, main, org in pages:
+        main_data = extract_page_data(main)
+        if main_data is None:
+            print(f"  VARNING: ingen siddata i {name}")
+            continue
+        parsed.append((main_data, extract_page_data(org), name))
+    structure_ms = timed(structure_company, parsed, args.rounds) if parsed else 0.0
+
+    print(f"  {'extraktion':<14} {extract_ms:8.3f} ms/bolag")
+    print(f"  {'strukturering':<14} {structure_ms:8.3f} ms/bolag")
+    total = extract_ms + structure_ms
+    print(f"\nTotalt {total:.3f} ms/bolag ({1000 / total:.0f} bolag/s per kärna)")
+
+
+if __name__ == "__main__":
+    main()
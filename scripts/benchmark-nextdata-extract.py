@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: __NEXT_DATA__-extraktion ur sparade allabolag-sidor.
+
+Jämför den gamla BeautifulSoup-varianten med offset-baserad extraktion
+(lib/scrapers/next_data.py) på str och bytes.
+
+Användning:
+    python scripts/benchmark-nextdata-extract.py data/allabolag-pages
+    python scripts/benchmark-nextdata-extract.py data/allabolag-pages --rounds 20
+
+Sidor sparas t.ex. med:
+    curl -s https://www.allabolag.se/5569398349 > data/allabolag-pages/5569398349.html
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.scrapers.next_data import extract_next_data, _loads
+
+
+def extract_bs4(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    script = soup.find('script', {'id': '__NEXT_DATA__'})
+    if script and script.string:
+        return json.loads(script.string)
+    return None
+
+
+def bench(name, func, pages, rounds):
+    start = time.perf_counter()
+    found = 0
+    for _ in range(rounds):
+        for page in pages:
+            if func(page) is not None:
+                found += 1
+    elapsed = time.perf_counter() - start
+    per_page_ms = elapsed / (rounds * len(pages)) * 1000
+    print(f"  {name:<28} {per_page_ms:8.3f} ms/sida  ({found // rounds}/{len(pages)} hittade)")
+    return per_page_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark __NEXT_DATA__ extraction")
+    parser.add_argument("pages_dir", help="Katalog med sparade .html-sidor")
+    parser.add_argument("--rounds", type=int, default=5, help="Antal varv över alla sidor")
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.pages_dir).glob("*.html"))
+    if not paths:
+        print(f"Inga .html-filer i {args.pages_dir}")
+        sys.exit(1)
+
+    raw = [p.read_bytes() for p in paths]
+    texts = [b.decode("utf-8", errors="replace") for b in raw]
+    total_mb = sum(len(b) for b in raw) / 1e6
+
+    print(f"{len(paths)} sidor, {total_mb:.1f} MB, {args.rounds} varv")
+    print(f"JSON-dekoder: {_loads.__module__}")
+
+    # Same result from every method
+    for path, text, data in zip(paths, texts, raw):
+        if extract_bs4(text) != extract_next_data(text) or extract_next_data(text) != extract_next_data(data):
+            print(f"  VARNING: olika resultat för {path.name}")
+
+    baseline = bench("BeautifulSoup + json", extract_bs4, texts, args.rounds)
+    fast_str = bench("offset (str)", extract_next_data, texts, args.rounds)
+    fast_bytes = bench("offset (bytes)", extract_next_data, raw, args.rounds)
+
+    print(f"\nSnabbare: {baseline / fast_str:.1f}x (str), {baseline / fast_bytes:.1f}x (bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: XBRL-faktaextraktion i lib/parsers/ixbrl.py.
+
+Jämför regex-vägen (en regex-skanning per taggtyp plus attribut-regex per
+träff) med enkelpass-skannern (en skanning, händelsestyrd) och räknar
+fakta som bara den ena hittar (t.ex. värden med nästlad markup).
+
+Användning:
+    python scripts/benchmark-xbrl-facts.py
+    python scripts/benchmark-xbrl-facts.py test_annual_reports --rounds 20
+
+Katalogen kan innehålla .zip-arkiv (som från VDM) och/eller .xhtml-filer.
+Standard är test_annual_reports/ om den finns, annars exempelrapporten i
+tests/fixtures/xbrl.
+"""
+
+import os
+import sys
+import time
+import zipfile
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.parsers.ixbrl import extract_xbrl_facts, extract_xbrl_facts_single_pass
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+REPORTS_DIR = REPO_ROOT / "test_annual_reports"
+FIXTURE_DIR = REPO_ROOT / "tests" / "fixtures" / "xbrl"
+
+
+def load_documents(directory):
+    """(namn, bytes) för varje XHTML-fil, även de i ZIP-arkiv."""
+    documents = []
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix == ".zip":
+            try:
+                with zipfile.ZipFile(path) as zf:
+                    for name in zf.namelist():
+                        if name.endswith((".xhtml", ".html")):
+                            documents.append((f"{path.name}/{name}", zf.read(name)))
+            except zipfile.BadZipFile:
+                print(f"  VARNING: trasigt arkiv {path.name}")
+        elif path.suffix in (".xhtml", ".html"):
+            documents.append((path.name, path.read_bytes()))
+    return documents
+
+
+def regex_path(content):
+    return extract_xbrl_facts(content.decode("utf-8", errors="ignore"))
+
+
+def timed(func, documents, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, content in documents:
+            func(content)
+    return (time.perf_counter() - start) / (rounds * len(documents)) * 1000
+
+
+def fact_keys(facts):
+    numeric = {(f["name"], f["context"], f["value_raw"]) for f in facts["numeric"]}
+    text = {(f["name"], f["context"]) for f in facts["text"]}
+    return numeric | text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XBRL fact extraction")
+    default_dir = REPORTS_DIR if REPORTS_DIR.exists() else FIXTURE_DIR
+    parser.add_argument("reports_dir", nargs="?", default=str(default_dir), help="Katalog med .zip/.xhtml")
+    parser.add_argument("--rounds", type=int, default=50, help="Antal varv över alla dokument")
+    args = parser.parse_args()
+
+    documents = load_documents(args.reports_dir)
+    if not documents:
+        print(f"Inga XHTML-dokument i {args.reports_dir}")
+        sys.exit(1)
+
+    only_regex = only_single = 0
+    for _, content in documents:
+        regex = fact_keys(regex_path(content))
+        single = fact_keys(extract_xbrl_facts_single_pass(content))
+        only_regex += len(regex - single)
+        only_single += len(single - regex)
+
+    total_mb = sum(len(content) for _, content in documents) / 1e6
+    print(f"{len(documents)} dokument, {total_mb:.2f} MB, {args.rounds} varv")
+
+    regex_ms = timed(regex_path, documents, args.rounds)
+    single_ms = timed(extract_xbrl_facts_single_pass, documents, args.rounds)
+
+    print(f"  {'regex':<10} {regex_ms:8.3f} ms/dokument")
+    print(f"  {'enkelpass':<10} {single_ms:8.3f} ms/dokument  ({regex_ms / single_ms:.2f}x)")
+    print(f"\nFakta bara i enkelpass: {only_single} (nästlad markup m.m.)")
+    print(f"Fakta bara i regex:     {only_regex}")
+
+
+if __name__ == "__main__":
+    main()
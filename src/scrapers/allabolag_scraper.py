@@ -3,23 +3,47 @@ Allabolag.se Scraper with Supabase Integration
 Primary source for: board, management, financials, corporate structure
 
 Features:
-- Both sync and async HTTP support
+- Both sync and async HTTP support over long-lived pooled clients
+  (keep-alive, HTTP/2 when h2 is installed, gzip)
 - Structured logging
-- Rate limiting (minimum 1 second between requests)
+- Rate limiting shared per host across all instances and coroutines
+  (AdaptiveRateLimiter, default 1 request/second)
 - Supabase integration for company_details, company_roles, company_financials
-- Caching based on last_synced_at
+- Caching based on last_synced_at (bulk prefetch for batches)
+- Parsing shared with lib/scrapers/allabolag.py (allabolag_core)
 """
 
+import os
 import re
+import sys
 import json
 import time
+import hashlib
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 import httpx
 from supabase import create_client, Client
 
+from .rate_limiter import AdaptiveRateLimiter, get_host_limiter_for_url, parse_retry_after
+
+# Page extraction and parsing are shared with lib/scrapers
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from lib.scrapers.allabolag_core import (
+    ACCOUNT_CODE_MAP,
+    ROLE_CATEGORY_MAP,
+    extract_page_data,
+    structure_nextjs_company,
+)
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Import base scraper if it exists
 try:
     from .base import BaseScraper
@@ -47,185 +71,289 @@ class AllabolagScraper:
 
     BASE_URL = "https://www.allabolag.se"
 
-    # Map Allabolag account codes to our database fields
-    ACCOUNT_CODE_MAP = {
-        # Resultaträkning
-        'SDI': 'revenue',
-        'AVI': 'other_income',
-        'RRK': 'operating_costs',
-        'RVK': 'raw_materials',
-        'HVK': 'goods',
-        'ADI': 'depreciation_intangible',
-        'ADK': 'depreciation_tangible',
-        'AEK': 'other_external_costs',
-        'LFL': 'inventory_change',
-        'RR': 'operating_profit',
-        'FI': 'financial_income',
-        'FK': 'financial_costs',
-        'RFFN': 'profit_after_financial',
-        'DR': 'net_profit',
-
-        # Balansräkning - Tillgångar
-        'SIA': 'intangible_assets',
-        'SMA': 'tangible_assets',
-        'SFA': 'financial_assets',
-        'SVL': 'inventory',
-        'SKG': 'receivables',
-        'SKO': 'cash',
-        'SGE': 'total_assets',
-
-        # Balansräkning - Skulder & EK
-        'AKT': 'share_capital',
-        'SEK': 'equity',
-        'SOB': 'untaxed_reserves',
-        'SAS': 'provisions',
-        'SLS': 'long_term_liabilities',
-        'SKS': 'short_term_liabilities',
-
-        # Nyckeltal
-        'avk_eget_kapital': 'return_on_equity',
-        'avk_totalt_kapital': 'return_on_assets',
-        'EKA': 'equity_ratio',
-        'RG': 'profit_margin',
-        'kassalikviditet': 'quick_ratio',
-
-        # Personal
-        'ANT': 'num_employees',
-        'loner_styrelse_vd': 'salaries_board_ceo',
-        'loner_ovriga': 'salaries_other',
-        'sociala_avgifter': 'social_costs',
-        'RPE': 'revenue_per_employee',
-    }
-
-    ROLE_CATEGORY_MAP = {
-        # Board roles
-        'Styrelseledamot': 'BOARD',
-        'Styrelsesuppleant': 'BOARD',
-        'Styrelseordförande': 'BOARD',
-        'Ledamot': 'BOARD',
-        'Suppleant': 'BOARD',
-        'Ordförande': 'BOARD',
-        # Management roles
-        'Vice verkställande direktör': 'MANAGEMENT',
-        'Verkställande direktör': 'MANAGEMENT',
-        'Extern verkställande direktör': 'MANAGEMENT',
-        'VD': 'MANAGEMENT',
-        # Auditor roles
-        'Revisor': 'AUDITOR',
-        'Revisorssuppleant': 'AUDITOR',
-        'Huvudansvarig revisor': 'AUDITOR',
-        'Lekmannarevisor': 'AUDITOR',
-        # Other roles
-        'Extern firmatecknare': 'OTHER',
-        'Bolagsman': 'OTHER',
-        'Komplementär': 'OTHER',
-        'Likvidator': 'OTHER',
-    }
+    # Retries for 429/5xx/connection errors (after the limiter's backoff)
+    MAX_RETRIES = 2
+
+    # Connection pool shared by all requests from one scraper instance
+    HTTP_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=30.0)
+    HTTP_HEADERS = {'Accept-Encoding': 'gzip, deflate'}
+
+    # orgnrs per `in_` query in prefetch_cache
+    CACHE_CHUNK_SIZE = 200
+
+    # Shared with lib/scrapers/allabolag.py via allabolag_core
+    ACCOUNT_CODE_MAP = ACCOUNT_CODE_MAP
+    ROLE_CATEGORY_MAP = ROLE_CATEGORY_MAP
 
     def __init__(self,
                  supabase_url: Optional[str] = None,
                  supabase_key: Optional[str] = None,
                  delay: float = 1.0,
-                 cache_hours: int = 24):
+                 cache_hours: int = 24,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 write_buffer=None):
         """
         Initialize Allabolag scraper.
 
         Args:
             supabase_url: Supabase project URL (if None, no DB integration)
             supabase_key: Supabase service role key
-            delay: Minimum delay between requests (default 1.0s)
+            delay: Minimum delay between requests for hosts without a configured
+                rate (default 1.0s). The limiter is shared per host, so the first
+                instance to touch a host decides its default.
             cache_hours: Hours before re-scraping (default 24)
+            rate_limiter: Explicit limiter; overrides the process-wide per-host one
+            write_buffer: AllabolagWriteBuffer; results are queued for bulk writes
+                instead of saved one company at a time
         """
         self.delay = delay
         self.cache_hours = cache_hours
-        self.last_request = 0
+        self.rate_limiter = rate_limiter
+        self.write_buffer = write_buffer
+
+        # Created lazily, closed via close()/aclose() or the context managers
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Cache lookups served from bulk queries (consumed on use)
+        self._prefetched: Dict[str, Optional[Dict]] = {}
+        self._freshness: Dict[str, Optional[str]] = {}
+        # Section hashes seen during the cache check, reused by _save_to_supabase
+        self._known_hashes: Dict[str, Optional[Dict[str, str]]] = {}
 
         # Initialize Supabase client if credentials provided
         self.supabase: Optional[Client] = None
         if supabase_url and supabase_key:
             self.supabase = create_client(supabase_url, supabase_key)
 
-    def _rate_limit(self):
-        """Ensure minimum delay between requests."""
-        elapsed = time.time() - self.last_request
-        if elapsed < self.delay:
-            time.sleep(self.delay - elapsed)
-        self.last_request = time.time()
+    # =========================================================================
+    # HTTP CLIENTS
+    # =========================================================================
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=self.HTTP_LIMITS,
+                headers=self.HTTP_HEADERS,
+                timeout=30,
+                follow_redirects=True
+            )
+        return self._client
+
+    async def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_client_loop is not loop:
+            await self._close_stale_async_client()
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self.HTTP_LIMITS,
+                headers=self.HTTP_HEADERS,
+                timeout=30,
+                follow_redirects=True
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _close_stale_async_client(self):
+        """Close the AsyncClient opened on another event loop."""
+        client, loop = self._async_client, self._async_client_loop
+        self._async_client = None
+        self._async_client_loop = None
+
+        if loop.is_running():
+            # Still running in another thread: close it on its own loop
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            # Its loop is already closed (a finished asyncio.run); the client
+            # is marked closed and its sockets go with the garbage collector
+            print(f"Closed stale async client with open connections: {e}")
+
+    def close(self):
+        """Close the sync HTTP client."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        """Close both HTTP clients."""
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    # =========================================================================
+    # RATE LIMITING
+    # =========================================================================
 
-    async def _rate_limit_async(self):
-        """Async rate limiting."""
-        elapsed = time.time() - self.last_request
-        if elapsed < self.delay:
-            await asyncio.sleep(self.delay - elapsed)
-        self.last_request = time.time()
+    def _limiter(self, url: str) -> AdaptiveRateLimiter:
+        return self.rate_limiter or get_host_limiter_for_url(url, default_rate=1.0 / self.delay)
+
+    def _rate_limit(self, url: str):
+        """Wait for the host's next request slot."""
+        self._limiter(url).acquire()
+
+    async def _rate_limit_async(self, url: str):
+        """Async rate limiting (safe across concurrent coroutines)."""
+        await self._limiter(url).acquire_async()
+
+    def _record_response(self, url: str, response: Optional[httpx.Response], latency: float) -> bool:
+        """
+        Report a response to the host's rate limiter.
+
+        Returns:
+            True if the request should be retried (429/5xx/connection error)
+        """
+        status = response.status_code if response is not None else None
+        retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        self._limiter(url).record(status, latency, retry_after)
+        return status is None or status == 429 or status >= 500
 
     def _fetch_page(self, url: str) -> Optional[str]:
         """Fetch page with rate limiting (sync)."""
-        self._rate_limit()
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._rate_limit(url)
+            start = time.perf_counter()
+            response = None
 
-        try:
-            response = httpx.get(url, timeout=30, follow_redirects=True)
-            response.raise_for_status()
-            return response.text
-        except httpx.HTTPError as e:
-            print(f"HTTP error fetching {url}: {e}")
-            return None
+            try:
+                response = self._get_client().get(url)
+                retry = self._record_response(url, response, time.perf_counter() - start)
+                if retry and attempt < self.MAX_RETRIES:
+                    continue
+                response.raise_for_status()
+                return response.text
+            except httpx.HTTPError as e:
+                if response is None and self._record_response(url, None, time.perf_counter() - start) \
+                        and attempt < self.MAX_RETRIES:
+                    continue
+                print(f"HTTP error fetching {url}: {e}")
+                return None
+
+        return None
 
     async def _fetch_page_async(self, url: str) -> Optional[str]:
         """Fetch page with rate limiting (async)."""
-        await self._rate_limit_async()
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self._rate_limit_async(url)
+            start = time.perf_counter()
+            response = None
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, timeout=30, follow_redirects=True)
+            try:
+                client = await self._get_async_client()
+                response = await client.get(url)
+                retry = self._record_response(url, response, time.perf_counter() - start)
+                if retry and attempt < self.MAX_RETRIES:
+                    continue
                 response.raise_for_status()
                 return response.text
-        except httpx.HTTPError as e:
-            print(f"HTTP error fetching {url}: {e}")
-            return None
+            except httpx.HTTPError as e:
+                if response is None and self._record_response(url, None, time.perf_counter() - start) \
+                        and attempt < self.MAX_RETRIES:
+                    continue
+                print(f"HTTP error fetching {url}: {e}")
+                return None
+
+        return None
 
     def _extract_json_data(self, html: str) -> Optional[Dict]:
-        """Extract JSON data from script tags (Next.js format)."""
-        soup = BeautifulSoup(html, 'html.parser')
+        """Extract JSON data from the __NEXT_DATA__ script (Next.js format)."""
+        return extract_page_data(html, legacy=False)
 
-        # Try Next.js __NEXT_DATA__ format first (current format)
-        next_data_script = soup.find('script', {'id': '__NEXT_DATA__'})
-        if next_data_script and next_data_script.string:
+    def _is_stale(self, last_synced: Optional[str]) -> bool:
+        """True if last_synced_at is missing or older than cache_hours."""
+        if not last_synced:
+            return True
+        try:
+            synced_time = datetime.fromisoformat(last_synced.replace('Z', '+00:00'))
+        except ValueError:
+            return True
+        return datetime.now(synced_time.tzinfo) - synced_time > timedelta(hours=self.cache_hours)
+
+    def set_freshness(self, last_synced_map: Dict[str, Optional[str]]):
+        """
+        Provide precomputed last_synced_at values (orgnr -> timestamp).
+
+        _should_scrape uses them instead of querying. Each entry is used once.
+        """
+        self._freshness.update(last_synced_map)
+
+    def prefetch_cache(self, orgnrs: List[str]) -> int:
+        """
+        Load company_details rows for many companies with one `in_` query per chunk.
+
+        Freshness checks and cached-data lookups for these orgnrs are then
+        served from memory (each row is used once). Returns rows found.
+        """
+        if not self.supabase:
+            return 0
+
+        orgnrs = [o.replace('-', '') for o in orgnrs]
+        found = 0
+        for i in range(0, len(orgnrs), self.CACHE_CHUNK_SIZE):
+            chunk = orgnrs[i:i + self.CACHE_CHUNK_SIZE]
             try:
-                data = json.loads(next_data_script.string)
-                page_props = data.get('props', {}).get('pageProps', {})
-                if page_props.get('company'):
-                    return page_props
-            except json.JSONDecodeError:
-                pass
+                result = self.supabase.table('company_details')\
+                    .select('*')\
+                    .in_('orgnr', chunk)\
+                    .execute()
+            except Exception as e:
+                print(f"Error prefetching cache: {e}")
+                continue
 
-        return None
+            rows = {row['orgnr']: row for row in result.data or []}
+            found += len(rows)
+            for orgnr in chunk:
+                # None = known to be missing, no need to ask again
+                self._prefetched[orgnr] = rows.get(orgnr)
+
+        return found
 
     def _should_scrape(self, orgnr: str) -> bool:
         """Check if we should scrape (based on cache)."""
         if not self.supabase:
             return True
 
-        try:
-            result = self.supabase.table('company_details')\
-                .select('last_synced_at')\
-                .eq('orgnr', orgnr)\
-                .execute()
-
-            if not result.data:
-                return True
+        if orgnr in self._freshness:
+            return self._is_stale(self._freshness.pop(orgnr))
 
-            last_synced = result.data[0].get('last_synced_at')
-            if not last_synced:
+        if orgnr not in self._prefetched:
+            try:
+                # Fetch the whole row so a cache hit needs no second query
+                result = self.supabase.table('company_details')\
+                    .select('*')\
+                    .eq('orgnr', orgnr)\
+                    .execute()
+                self._prefetched[orgnr] = result.data[0] if result.data else None
+            except Exception as e:
+                print(f"Error checking cache: {e}")
                 return True
 
-            # Parse timestamp and check if older than cache_hours
-            synced_time = datetime.fromisoformat(last_synced.replace('Z', '+00:00'))
-            return datetime.now(synced_time.tzinfo) - synced_time > timedelta(hours=self.cache_hours)
-
-        except Exception as e:
-            print(f"Error checking cache: {e}")
-            return True
+        row = self._prefetched[orgnr]
+        stale = self._is_stale(row.get('last_synced_at') if row else None)
+        if stale:
+            self._prefetched.pop(orgnr, None)
+            self._known_hashes[orgnr] = (row.get('section_hashes') or {}) if row else None
+        return stale
 
     # =========================================================================
     # SYNC API
@@ -270,7 +398,9 @@ class AllabolagScraper:
         result = self._structure_nextjs_data(main_data, org_data, orgnr)
 
         # Save to Supabase if client configured
-        if self.supabase:
+        if self.write_buffer is not None:
+            self._buffer_result(result)
+        elif self.supabase:
             self._save_to_supabase(result)
 
         duration_ms = (time.perf_counter() - start_time) * 1000
@@ -293,12 +423,23 @@ class AllabolagScraper:
         Returns:
             Company data dict or None if not found
         """
+        result, _ = await self.scrape_and_buffer_async(orgnr, force)
+        return result
+
+    async def scrape_and_buffer_async(self, orgnr: str, force: bool = False) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Like scrape_company_async, also telling whether the result went to the write buffer.
+
+        Returns:
+            (company data dict or None, buffered); buffered is False for
+            cached data, companies not found and scrapers without a buffer
+        """
         orgnr = orgnr.replace('-', '')
 
-        # Check cache unless force
-        if not force and not self._should_scrape(orgnr):
+        # Check cache unless force (Supabase client is sync - run it off the loop)
+        if not force and not await asyncio.to_thread(self._should_scrape, orgnr):
             print(f"Using cached data for {orgnr}")
-            return self._get_cached_data(orgnr)
+            return await asyncio.to_thread(self._get_cached_data, orgnr), False
 
         start_time = time.perf_counter()
 
@@ -312,11 +453,11 @@ class AllabolagScraper:
         main_html, org_html = await asyncio.gather(main_task, org_task)
 
         if not main_html:
-            return None
+            return None, False
 
         main_data = self._extract_json_data(main_html)
         if not main_data:
-            return None
+            return None, False
 
         org_data = self._extract_json_data(org_html) if org_html else None
 
@@ -324,304 +465,25 @@ class AllabolagScraper:
         result = self._structure_nextjs_data(main_data, org_data, orgnr)
 
         # Save to Supabase if client configured
-        if self.supabase:
-            self._save_to_supabase(result)
+        buffered = False
+        if self.write_buffer is not None:
+            buffered = self._buffer_result(result)
+        elif self.supabase:
+            await asyncio.to_thread(self._save_to_supabase, result)
 
         duration_ms = (time.perf_counter() - start_time) * 1000
         print(f"Async scraped {orgnr} from allabolag in {duration_ms:.0f}ms")
 
-        return result
+        return result, buffered
 
     # =========================================================================
     # DATA PARSING
     # =========================================================================
 
     def _structure_nextjs_data(self, main_data: Dict, org_data: Optional[Dict], orgnr: str) -> Dict[str, Any]:
-        """Structure data from Next.js format (props.pageProps.company)."""
-        company = main_data.get('company', {})
-        trademarks_data = main_data.get('trademarks', {})
-
-        result = {
-            'orgnr': orgnr,
-            'name': company.get('name') or company.get('legalName'),
-            'company_type': company.get('companyType', {}).get('code'),
-            'status': company.get('status', {}).get('status', 'UNKNOWN'),
-            'purpose': company.get('purpose'),
-            'registered_date': company.get('registrationDate'),
-            'foundation_year': company.get('foundationYear'),
-            'source_basic': 'allabolag',
-            'last_synced_at': datetime.now().isoformat()
-        }
-
-        # Postal address
-        postal = company.get('postalAddress', {})
-        if postal:
-            result['postal_street'] = postal.get('addressLine')
-            result['postal_code'] = postal.get('zipCode')
-            result['postal_city'] = postal.get('postPlace')
-
-        # Visitor address
-        visitor = company.get('visitorAddress', {})
-        if visitor:
-            result['visiting_street'] = visitor.get('addressLine')
-            result['visiting_code'] = visitor.get('zipCode')
-            result['visiting_city'] = visitor.get('postPlace')
-
-        # Contact info
-        result['phone'] = company.get('phone') or company.get('legalPhone')
-        result['email'] = company.get('email')
-        result['website'] = company.get('homePage')
-
-        # Location / GPS
-        location = company.get('location', {})
-        coords = location.get('coordinates', [{}])
-        if coords:
-            result['latitude'] = coords[0].get('ycoordinate')
-            result['longitude'] = coords[0].get('xcoordinate')
-
-        result['municipality'] = location.get('municipality')
-        result['municipality_code'] = location.get('municipalityCode')
-        result['county'] = location.get('county')
-        result['county_code'] = location.get('countyCode')
-
-        # LEI code
-        result['lei_code'] = company.get('leiCode') or company.get('lei')
-
-        # Registrations
-        result['moms_registered'] = 1 if company.get('registeredForVat') else 0
-        result['employer_registered'] = 1 if company.get('registeredForPayrollTax') else 0
-
-        vat_desc = company.get('registeredForVatDescription', '') or ''
-        has_fskatt = 'f-skatt' in vat_desc.lower()
-
-        registry_entries = company.get('registryStatusEntries', [])
-        if isinstance(registry_entries, list):
-            for entry in registry_entries:
-                if isinstance(entry, dict):
-                    label = entry.get('label', '')
-                    value = entry.get('value', False)
-                    if label == 'registeredForPrepayment' and value:
-                        has_fskatt = True
-                        break
-
-        result['f_skatt'] = 1 if has_fskatt else 0
-
-        # Corporate structure
-        corp_structure = company.get('corporateStructure', {})
-        if corp_structure:
-            num_subsidiaries = corp_structure.get('numberOfSubsidiaries', 0)
-            num_companies = corp_structure.get('numberOfCompanies', 0)
-            result['is_group'] = 1 if (num_subsidiaries and num_subsidiaries > 0) else 0
-            result['companies_in_group'] = num_companies if num_companies else None
-
-            parent_orgnr = corp_structure.get('parentCompanyOrganisationNumber')
-            parent_name = corp_structure.get('parentCompanyName')
-            if parent_orgnr:
-                result['parent_orgnr'] = parent_orgnr
-                result['parent_name'] = parent_name
-
-        # Share capital
-        share_capital = company.get('shareCapital')
-        if share_capital:
-            try:
-                result['share_capital'] = int(float(share_capital))
-            except (ValueError, TypeError):
-                pass
-
-        # Financial summary
-        try:
-            result['revenue'] = int(float(company.get('revenue', 0)) * 1000) if company.get('revenue') else None
-            result['net_profit'] = int(float(company.get('profit', 0)) * 1000) if company.get('profit') else None
-        except (ValueError, TypeError):
-            result['revenue'] = None
-            result['net_profit'] = None
-
-        # Employee count
-        employees = company.get('numberOfEmployees')
-        if employees:
-            if isinstance(employees, str):
-                if '-' in employees:
-                    try:
-                        result['num_employees'] = int(employees.split('-')[0])
-                    except ValueError:
-                        result['num_employees'] = None
-                else:
-                    try:
-                        result['num_employees'] = int(employees)
-                    except ValueError:
-                        result['num_employees'] = None
-            else:
-                result['num_employees'] = int(employees)
-        else:
-            result['num_employees'] = None
-
-        # Industries / SNI codes
-        result['industries'] = []
-        for nace in company.get('naceIndustries', []):
-            if ' ' in nace:
-                parts = nace.split(' ', 1)
-                result['industries'].append({
-                    'sni_code': parts[0],
-                    'sni_description': parts[1] if len(parts) > 1 else None,
-                    'is_primary': 1 if not result['industries'] else 0
-                })
-
-        # Financials - parse from companyAccounts and corporateAccounts
-        result['financials'] = []
-
-        for period in company.get('companyAccounts', []):
-            fin = self._parse_financial_period_nextjs(period, is_consolidated=False)
-            if fin:
-                result['financials'].append(fin)
-
-        for period in company.get('corporateAccounts', []):
-            fin = self._parse_financial_period_nextjs(period, is_consolidated=True)
-            if fin:
-                result['financials'].append(fin)
-
-        # Update summary fields from latest financials
-        if result['financials']:
-            company_financials = [f for f in result['financials'] if not f.get('is_consolidated')]
-            if company_financials:
-                latest = company_financials[0]
-                if result.get('revenue') is None:
-                    result['revenue'] = latest.get('revenue')
-                if result.get('net_profit') is None:
-                    result['net_profit'] = latest.get('net_profit')
-                if result.get('num_employees') is None:
-                    result['num_employees'] = latest.get('num_employees')
-                result['total_assets'] = latest.get('total_assets')
-                result['equity'] = latest.get('equity')
-                result['equity_ratio'] = latest.get('equity_ratio')
-                result['return_on_equity'] = latest.get('return_on_equity')
-
-        # Board, Management, Revision and Other roles
-        result['roles'] = []
-        roles_data = company.get('roles', {})
-
-        role_groups = roles_data.get('roleGroups', [])
-        for group in role_groups:
-            group_name = group.get('name', '')
-            for role_entry in group.get('roles', []):
-                # Skip company entries
-                if role_entry.get('type') == 'Company':
-                    continue
-
-                role_type = role_entry.get('role', '')
-                result['roles'].append({
-                    'name': role_entry.get('name'),
-                    'birth_year': self._parse_birth_year(role_entry.get('birthDate')),
-                    'role_type': role_type,
-                    'role_category': self._map_role_category(group_name, role_type),
-                    'source': 'allabolag'
-                })
-
-        # Related companies from org page
-        result['related_companies'] = []
-        if org_data:
-            overview = org_data.get('companyOverview', {})
-            subsidiaries = overview.get('dotterbolag', [])
-
-            if not subsidiaries:
-                subsidiaries = org_data.get('relatedCompanies', [])
-            if not subsidiaries:
-                subsidiaries = org_data.get('company', {}).get('relatedCompanies', [])
-
-            for rel in subsidiaries:
-                if isinstance(rel, dict):
-                    result['related_companies'].append({
-                        'related_orgnr': rel.get('orgnr') or rel.get('orgNumber'),
-                        'related_name': rel.get('namn') or rel.get('name'),
-                        'relation_type': rel.get('relation_type', 'subsidiary'),
-                        'source': 'allabolag'
-                    })
-
-        # Announcements
-        result['announcements'] = []
-        announcements_data = (
-            company.get('announcements', []) or
-            company.get('kungorelser', []) or
-            main_data.get('announcements', []) or
-            []
-        )
-        for ann in announcements_data[:10]:
-            result['announcements'].append({
-                'announcement_type': ann.get('type') or ann.get('typ'),
-                'announcement_date': ann.get('date') or ann.get('datum'),
-                'description': ann.get('text') or ann.get('description'),
-                'source': 'allabolag'
-            })
-
-        return result
-
-    def _parse_birth_year(self, birth_date: str) -> Optional[int]:
-        """Parse birth year from date string like '01.02.1989'."""
-        if not birth_date:
-            return None
-        try:
-            parts = birth_date.split('.')
-            if len(parts) >= 3:
-                return int(parts[2])
-        except (ValueError, IndexError):
-            pass
-        return None
-
-    def _map_role_category(self, group_name: str, role_type: str) -> str:
-        """Map Allabolag role group and type to our category."""
-        if role_type in self.ROLE_CATEGORY_MAP:
-            return self.ROLE_CATEGORY_MAP[role_type]
-
-        group_mapping = {
-            'Management': 'MANAGEMENT',
-            'Board': 'BOARD',
-            'Revision': 'AUDITOR',
-            'Other': 'OTHER'
-        }
-        return group_mapping.get(group_name, 'OTHER')
-
-    def _parse_financial_period_nextjs(self, period: Dict, is_consolidated: bool) -> Optional[Dict]:
-        """Parse a financial period from Next.js format."""
-        if not period:
-            return None
-
-        year = period.get('year')
-        if year:
-            try:
-                year = int(year)
-            except (ValueError, TypeError):
-                year = None
-
-        length = period.get('length', '12')
-        try:
-            period_months = int(length)
-        except (ValueError, TypeError):
-            period_months = 12
-
-        result = {
-            'period_year': year,
-            'period_months': period_months,
-            'is_consolidated': 1 if is_consolidated else 0,
-            'source': 'allabolag'
-        }
-
-        # Codes that should NOT be multiplied by 1000
-        NO_MULTIPLY_CODES = {'ANT', 'EKA', 'RG', 'RPE', 'avk_eget_kapital', 'avk_totalt_kapital', 'kassalikviditet'}
-
-        accounts = period.get('accounts', [])
-        for acc in accounts:
-            code = acc.get('code')
-            amount = acc.get('amount')
-            if code and code in self.ACCOUNT_CODE_MAP and amount is not None:
-                field = self.ACCOUNT_CODE_MAP[code]
-                try:
-                    if code in NO_MULTIPLY_CODES:
-                        result[field] = int(float(amount))
-                    else:
-                        # Amount is in thousands (TSEK) - convert to SEK
-                        result[field] = int(float(amount) * 1000)
-                except (ValueError, TypeError):
-                    pass
-
+        """Structure data from Next.js format (see allabolag_core), stamped with the sync time."""
+        result = structure_nextjs_company(main_data, org_data, orgnr)
+        result['last_synced_at'] = datetime.now().isoformat()
         return result
 
     # =========================================================================
@@ -633,6 +495,9 @@ class AllabolagScraper:
         if not self.supabase:
             return None
 
+        if orgnr in self._prefetched:
+            return self._prefetched.pop(orgnr)
+
         try:
             result = self.supabase.table('company_details')\
                 .select('*')\
@@ -646,51 +511,124 @@ class AllabolagScraper:
             print(f"Error fetching cached data: {e}")
             return None
 
-    def _save_to_supabase(self, data: Dict[str, Any]) -> bool:
-        """Save scraped data to Supabase tables."""
-        if not self.supabase:
-            return False
+    def _buffer_result(self, data: Dict[str, Any]) -> bool:
+        """Queue a result in the write buffer, with stored hashes if the cache check saw them. Returns True once queued."""
+        orgnr = data['orgnr']
+        if orgnr in self._known_hashes:
+            self.write_buffer.add(data, self._known_hashes.pop(orgnr))
+        else:
+            self.write_buffer.add(data)
+        return True
+
+    def _load_section_hashes(self, orgnr: str) -> Optional[Dict[str, str]]:
+        """Section hashes from the last save (None if the company isn't stored yet)."""
+        if orgnr in self._known_hashes:
+            return self._known_hashes.pop(orgnr)
+
+        result = self.supabase.table('company_details')\
+            .select('section_hashes')\
+            .eq('orgnr', orgnr)\
+            .execute()
+        if not result.data:
+            return None
+        return result.data[0].get('section_hashes') or {}
 
-        try:
-            # Prepare company_details data
-            details = {k: v for k, v in data.items()
-                      if k not in ['roles', 'financials', 'related_companies',
-                                   'announcements', 'industries']}
-
-            # Upsert company_details
-            self.supabase.table('company_details')\
-                .upsert(details, on_conflict='orgnr')\
+    def _save_roles(self, orgnr: str, roles: List[Dict], record_history: bool) -> Dict[str, int]:
+        """Apply a minimal diff to company_roles and log it to company_role_changes."""
+        existing = self.supabase.table('company_roles')\
+            .select('id, ' + ', '.join(ROLE_KEY_FIELDS))\
+            .eq('orgnr', orgnr)\
+            .execute().data or []
+
+        to_insert, to_delete = diff_roles(existing, roles)
+
+        if to_delete:
+            self.supabase.table('company_roles')\
+                .delete()\
+                .in_('id', [row['id'] for row in to_delete])\
+                .execute()
+        if to_insert:
+            self.supabase.table('company_roles')\
+                .insert([{'orgnr': orgnr, **role} for role in to_insert])\
                 .execute()
 
-            # Save roles to company_roles
-            if data.get('roles'):
-                # Delete existing roles for this company
-                self.supabase.table('company_roles')\
-                    .delete()\
-                    .eq('orgnr', data['orgnr'])\
-                    .execute()
+        if record_history and (to_insert or to_delete):
+            changes = [
+                {'orgnr': orgnr, 'change_type': change_type, 'source': 'allabolag',
+                 **{f: row.get(f) for f in ROLE_KEY_FIELDS}}
+                for change_type, rows in (('added', to_insert), ('removed', to_delete))
+                for row in rows
+            ]
+            self.supabase.table('company_role_changes')\
+                .insert(changes)\
+                .execute()
 
-                # Insert new roles
-                roles = [{'orgnr': data['orgnr'], **role} for role in data['roles']]
-                self.supabase.table('company_roles')\
-                    .insert(roles)\
-                    .execute()
+        return {'added': len(to_insert), 'removed': len(to_delete)}
 
-            # Save financials to company_financials
-            if data.get('financials'):
-                # Delete existing financials
-                self.supabase.table('company_financials')\
-                    .delete()\
-                    .eq('orgnr', data['orgnr'])\
-                    .execute()
+    def _save_financials(self, orgnr: str, financials: List[Dict]) -> Dict[str, int]:
+        """Apply a minimal insert/update/delete diff to company_financials."""
+        existing = self.supabase.table('company_financials')\
+            .select('*')\
+            .eq('orgnr', orgnr)\
+            .execute().data or []
+
+        to_insert, to_update, to_delete = diff_financials(existing, financials)
+
+        if to_delete:
+            self.supabase.table('company_financials')\
+                .delete()\
+                .in_('id', to_delete)\
+                .execute()
+        for row_id, changes in to_update:
+            self.supabase.table('company_financials')\
+                .update(changes)\
+                .eq('id', row_id)\
+                .execute()
+        if to_insert:
+            self.supabase.table('company_financials')\
+                .insert([{'orgnr': orgnr, **fin} for fin in to_insert])\
+                .execute()
 
-                # Insert new financials
-                financials = [{'orgnr': data['orgnr'], **fin} for fin in data['financials']]
-                self.supabase.table('company_financials')\
-                    .insert(financials)\
+        return {'inserted': len(to_insert), 'updated': len(to_update), 'deleted': len(to_delete)}
+
+    def _save_to_supabase(self, data: Dict[str, Any]) -> bool:
+        """
+        Save scraped data to Supabase tables.
+
+        Each section (details, roles, financials) is hashed; unchanged sections
+        are skipped and changed ones get minimal diffs. Details and hashes are
+        written last, so an interrupted save is redone on the next scrape.
+        """
+        if not self.supabase:
+            return False
+
+        try:
+            orgnr = data['orgnr']
+            previous = self._load_section_hashes(orgnr)
+            plan = SavePlan(data, previous)
+            summary = []
+
+            if plan.roles_changed:
+                diff = self._save_roles(orgnr, data['roles'], record_history=previous is not None)
+                summary.append(f"roles +{diff['added']}/-{diff['removed']}")
+
+            if plan.financials_changed:
+                diff = self._save_financials(orgnr, data['financials'])
+                summary.append(f"financials +{diff['inserted']}/~{diff['updated']}/-{diff['deleted']}")
+
+            if plan.details_changed:
+                self.supabase.table('company_details')\
+                    .upsert(plan.details_row(), on_conflict='orgnr')\
+                    .execute()
+                summary.append("details")
+            else:
+                # Unchanged: only bump the sync time (and hashes of changed sections)
+                self.supabase.table('company_details')\
+                    .update(plan.sync_row())\
+                    .eq('orgnr', orgnr)\
                     .execute()
 
-            print(f"Saved {data['orgnr']} to Supabase")
+            print(f"Saved {orgnr} to Supabase ({', '.join(summary) or 'unchanged'})")
             return True
 
         except Exception as e:
@@ -698,10 +636,120 @@ class AllabolagScraper:
             return False
 
 
+# =============================================================================
+# SECTION HASHING AND DIFFS
+# =============================================================================
+
+ROLE_KEY_FIELDS = ('name', 'birth_year', 'role_type', 'role_category')
+FINANCIAL_KEY_FIELDS = ('period_year', 'period_months', 'is_consolidated')
+NON_DETAIL_KEYS = ('roles', 'financials', 'related_companies', 'announcements', 'industries', 'trademarks')
+
+
+class SavePlan:
+    """
+    Which sections of one scraped company need writing, and the new hashes.
+
+    `previous` is the stored section_hashes (None = company not stored yet).
+    """
+
+    def __init__(self, data: Dict[str, Any], previous: Optional[Dict[str, str]]):
+        stored = previous or {}
+        self.orgnr = data['orgnr']
+        self.details = {k: v for k, v in data.items() if k not in NON_DETAIL_KEYS}
+        self.hashes = {
+            'details': section_hash({k: v for k, v in self.details.items() if k != 'last_synced_at'}),
+            'roles': section_hash(sorted(data.get('roles') or [], key=_role_key)),
+            'financials': section_hash(sorted(data.get('financials') or [], key=_financial_key)),
+        }
+
+        # Empty sections are kept as-is (never wipe stored data on a bad scrape)
+        self.roles_changed = bool(data.get('roles')) and self.hashes['roles'] != stored.get('roles')
+        if not data.get('roles'):
+            self.hashes['roles'] = stored.get('roles')
+        self.financials_changed = bool(data.get('financials')) and self.hashes['financials'] != stored.get('financials')
+        if not data.get('financials'):
+            self.hashes['financials'] = stored.get('financials')
+        self.details_changed = previous is None or self.hashes['details'] != stored.get('details')
+
+    def details_row(self) -> Dict[str, Any]:
+        return {**self.details, 'section_hashes': self.hashes}
+
+    def sync_row(self) -> Dict[str, Any]:
+        return {'last_synced_at': self.details['last_synced_at'], 'section_hashes': self.hashes}
+
+
+def section_hash(value: Any) -> str:
+    """Stable SHA-256 of a JSON-serialisable section."""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _role_key(role: Dict) -> tuple:
+    return tuple(str(role.get(f)) for f in ROLE_KEY_FIELDS)
+
+
+def _financial_key(fin: Dict) -> tuple:
+    return tuple(str(fin.get(f)) for f in FINANCIAL_KEY_FIELDS)
+
+
+def diff_roles(existing: List[Dict], new: List[Dict]):
+    """
+    Multiset diff of roles on (name, birth_year, role_type, role_category).
+
+    Returns:
+        (roles to insert, existing rows to delete)
+    """
+    remaining: Dict[tuple, List[Dict]] = {}
+    for row in existing:
+        remaining.setdefault(_role_key(row), []).append(row)
+
+    to_insert = []
+    for role in new:
+        matches = remaining.get(_role_key(role))
+        if matches:
+            matches.pop()
+        else:
+            to_insert.append(role)
+
+    to_delete = [row for rows in remaining.values() for row in rows]
+    return to_insert, to_delete
+
+
+def diff_financials(existing: List[Dict], new: List[Dict]):
+    """
+    Diff financial periods on (period_year, period_months, is_consolidated).
+
+    Returns:
+        (periods to insert, [(row id, changed columns)], row ids to delete)
+    """
+    by_key: Dict[tuple, List[Dict]] = {}
+    for row in existing:
+        by_key.setdefault(_financial_key(row), []).append(row)
+
+    to_insert, to_update = [], []
+    for fin in new:
+        rows = by_key.get(_financial_key(fin))
+        if not rows:
+            to_insert.append(fin)
+            continue
+        row = rows.pop(0)
+        changes = {k: v for k, v in fin.items() if row.get(k) != v}
+        # Columns the new scrape no longer reports are cleared, as a reinsert would
+        changes.update({
+            k: None for k, v in row.items()
+            if v is not None and k not in fin and k not in ('id', 'orgnr', 'created_at')
+        })
+        if changes:
+            to_update.append((row['id'], changes))
+
+    to_delete = [row['id'] for rows in by_key.values() for row in rows]
+    return to_insert, to_update, to_delete
+
+
 # Convenience function
 def scrape_allabolag(orgnr: str,
                     supabase_url: Optional[str] = None,
                     supabase_key: Optional[str] = None) -> Optional[Dict]:
     """Quick scrape function with optional Supabase integration."""
-    scraper = AllabolagScraper(supabase_url=supabase_url, supabase_key=supabase_key)
-    return scraper.scrape_company(orgnr)
+    with AllabolagScraper(supabase_url=supabase_url, supabase_key=supabase_key) as scraper:
+        return scraper.scrape_company(orgnr)
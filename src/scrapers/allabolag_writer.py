@@ -0,0 +1,250 @@
+"""
+Write-behind buffer for Allabolag batch runs
+
+Collects structured scrape results and writes many companies at once:
+one query per table and operation per flush instead of ~5 round-trips per
+company. Uses the same section hashes and diffs as
+AllabolagScraper._save_to_supabase, so results are identical.
+
+Flushes are triggered by size (flush_size companies) or age (max_age
+seconds). flush() returns the orgnrs that were written, so callers can mark
+them done in a checkpoint only once they are durable; if the write fails it
+raises WriteBufferFlushError with the orgnrs of the dropped batch.
+"""
+
+import time
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+from .allabolag_scraper import (
+    ROLE_KEY_FIELDS,
+    SavePlan,
+    diff_financials,
+    diff_roles,
+)
+
+# Sentinel: stored hashes not known yet, look them up at flush
+UNKNOWN = object()
+
+
+class WriteBufferFlushError(Exception):
+    """A flush failed; orgnrs are the companies in the dropped batch."""
+
+    def __init__(self, orgnrs: List[str], cause: Exception):
+        super().__init__(f"Flush of {len(orgnrs)} companies failed: {cause}")
+        self.orgnrs = orgnrs
+
+
+class AllabolagWriteBuffer:
+    """
+    Usage:
+        buffer = AllabolagWriteBuffer(supabase, flush_size=50)
+        scraper = AllabolagScraper(..., write_buffer=buffer)
+
+        await scraper.scrape_company_async(orgnr)   # buffered, not written
+        if buffer.is_due():
+            written = await asyncio.to_thread(buffer.flush)
+    """
+
+    # Rows per insert/upsert call and ids per `in_` filter
+    CHUNK_SIZE = 500
+
+    def __init__(self, supabase, flush_size: int = 50, max_age: float = 30.0):
+        """
+        Initialize buffer.
+
+        Args:
+            supabase: Supabase client
+            flush_size: Companies per flush
+            max_age: Seconds before a non-full buffer is due anyway
+        """
+        self.supabase = supabase
+        self.flush_size = flush_size
+        self.max_age = max_age
+
+        self._pending: List[Tuple[Dict[str, Any], Any]] = []
+        self._pending_orgnrs = set()
+        # Swapped out by a flush that hasn't returned yet
+        self._flushing_orgnrs = set()
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.flushes = 0
+        self.companies_written = 0
+        self.round_trips = 0
+
+    def add(self, data: Dict[str, Any], previous_hashes: Any = UNKNOWN):
+        """Queue one structured company (as returned by _structure_nextjs_data)."""
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((data, previous_hashes))
+            self._pending_orgnrs.add(data['orgnr'])
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, orgnr: str) -> bool:
+        """True while orgnr is buffered or in a flush that hasn't returned."""
+        with self._lock:
+            return orgnr in self._pending_orgnrs or orgnr in self._flushing_orgnrs
+
+    def pending_orgnrs(self) -> List[str]:
+        return list(self._pending_orgnrs)
+
+    def is_due(self) -> bool:
+        if not self._pending:
+            return False
+        return len(self._pending) >= self.flush_size or time.monotonic() - self._oldest >= self.max_age
+
+    # =========================================================================
+    # FLUSH
+    # =========================================================================
+
+    def _chunks(self, items: List) -> List[List]:
+        return [items[i:i + self.CHUNK_SIZE] for i in range(0, len(items), self.CHUNK_SIZE)]
+
+    def _execute(self, query):
+        self.round_trips += 1
+        return query.execute()
+
+    def _select_in(self, table: str, columns: str, field: str, values: List) -> List[Dict]:
+        rows = []
+        for chunk in self._chunks(values):
+            result = self._execute(self.supabase.table(table).select(columns).in_(field, chunk))
+            rows.extend(result.data or [])
+        return rows
+
+    def _insert(self, table: str, rows: List[Dict]):
+        for chunk in self._chunks(rows):
+            self._execute(self.supabase.table(table).insert(chunk))
+
+    def _upsert(self, table: str, rows: List[Dict], on_conflict: str):
+        # PostgREST fills missing keys with NULL in multi-row writes, so only
+        # rows with identical columns go in the same call
+        groups: Dict[frozenset, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(frozenset(row), []).append(row)
+        for group in groups.values():
+            for chunk in self._chunks(group):
+                self._execute(self.supabase.table(table).upsert(chunk, on_conflict=on_conflict))
+
+    def _delete_ids(self, table: str, ids: List):
+        for chunk in self._chunks(ids):
+            self._execute(self.supabase.table(table).delete().in_('id', chunk))
+
+    def flush(self) -> List[str]:
+        """
+        Write all buffered companies. Returns the orgnrs written.
+
+        On error the batch is dropped from the buffer and WriteBufferFlushError
+        is raised with its orgnrs; callers should leave those unmarked so a
+        resume redoes them.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+            orgnrs, self._pending_orgnrs = self._pending_orgnrs, set()
+            self._flushing_orgnrs |= orgnrs
+            self._oldest = None
+
+        if not batch:
+            return []
+
+        try:
+            return self._write(batch)
+        except Exception as e:
+            raise WriteBufferFlushError(sorted(orgnrs), e) from e
+        finally:
+            with self._lock:
+                self._flushing_orgnrs -= orgnrs
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], Any]]) -> List[str]:
+        # Last result wins if a company was scraped twice
+        entries: Dict[str, Tuple[Dict[str, Any], Any]] = {data['orgnr']: (data, prev) for data, prev in batch}
+
+        unknown = [orgnr for orgnr, (_, prev) in entries.items() if prev is UNKNOWN]
+        stored_hashes: Dict[str, Optional[Dict]] = {}
+        if unknown:
+            for row in self._select_in('company_details', 'orgnr, section_hashes', 'orgnr', unknown):
+                stored_hashes[row['orgnr']] = row.get('section_hashes') or {}
+
+        plans: Dict[str, SavePlan] = {}
+        previous: Dict[str, Optional[Dict]] = {}
+        for orgnr, (data, prev) in entries.items():
+            previous[orgnr] = stored_hashes.get(orgnr) if prev is UNKNOWN else prev
+            plans[orgnr] = SavePlan(data, previous[orgnr])
+
+        self._flush_roles(entries, plans, previous)
+        self._flush_financials(entries, plans)
+
+        # Details last: hashes only move forward once the sections are written
+        self._upsert('company_details', [p.details_row() for p in plans.values() if p.details_changed], 'orgnr')
+        self._upsert(
+            'company_details',
+            [{'orgnr': p.orgnr, **p.sync_row()} for p in plans.values() if not p.details_changed],
+            'orgnr'
+        )
+
+        self.flushes += 1
+        self.companies_written += len(plans)
+        print(f"Flushed {len(plans)} companies to Supabase ({self.round_trips} round-trips so far)")
+        return list(plans)
+
+    def _flush_roles(self, entries, plans: Dict[str, SavePlan], previous: Dict[str, Optional[Dict]]):
+        changed = [orgnr for orgnr, plan in plans.items() if plan.roles_changed]
+        if not changed:
+            return
+
+        existing: Dict[str, List[Dict]] = {orgnr: [] for orgnr in changed}
+        columns = 'id, orgnr, ' + ', '.join(ROLE_KEY_FIELDS)
+        for row in self._select_in('company_roles', columns, 'orgnr', changed):
+            existing[row['orgnr']].append(row)
+
+        inserts, delete_ids, history = [], [], []
+        for orgnr in changed:
+            to_insert, to_delete = diff_roles(existing[orgnr], entries[orgnr][0]['roles'])
+            inserts.extend({'orgnr': orgnr, **role} for role in to_insert)
+            delete_ids.extend(row['id'] for row in to_delete)
+            if previous[orgnr] is not None:
+                history.extend(
+                    {'orgnr': orgnr, 'change_type': change_type, 'source': 'allabolag',
+                     **{f: row.get(f) for f in ROLE_KEY_FIELDS}}
+                    for change_type, rows in (('added', to_insert), ('removed', to_delete))
+                    for row in rows
+                )
+
+        self._delete_ids('company_roles', delete_ids)
+        self._insert('company_roles', inserts)
+        self._insert('company_role_changes', history)
+
+    def _flush_financials(self, entries, plans: Dict[str, SavePlan]):
+        changed = [orgnr for orgnr, plan in plans.items() if plan.financials_changed]
+        if not changed:
+            return
+
+        existing: Dict[str, List[Dict]] = {orgnr: [] for orgnr in changed}
+        for row in self._select_in('company_financials', '*', 'orgnr', changed):
+            existing[row['orgnr']].append(row)
+
+        inserts, updates, delete_ids = [], [], []
+        for orgnr in changed:
+            rows_by_id = {row['id']: row for row in existing[orgnr]}
+            to_insert, to_update, to_delete = diff_financials(existing[orgnr], entries[orgnr][0]['financials'])
+            inserts.extend({'orgnr': orgnr, **fin} for fin in to_insert)
+            # Full rows (same columns as selected) so updates can share one upsert
+            updates.extend({**rows_by_id[row_id], **changes} for row_id, changes in to_update)
+            delete_ids.extend(to_delete)
+
+        self._delete_ids('company_financials', delete_ids)
+        self._upsert('company_financials', updates, 'id')
+        self._insert('company_financials', inserts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "flushes": self.flushes,
+            "companies_written": self.companies_written,
+            "round_trips": self.round_trips,
+            "round_trips_per_company": round(self.round_trips / self.companies_written, 2)
+            if self.companies_written else 0,
+            "pending": len(self._pending)
+        }
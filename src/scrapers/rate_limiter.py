@@ -0,0 +1,22 @@
+"""
+Adaptive rate limiter for scrapers
+
+Moved to lib/scrapers/rate_limiter.py so the Bolagsverket VDM client shares
+the same per-host registry. Re-exported here for existing imports.
+"""
+
+import os
+import sys
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+from lib.scrapers.rate_limiter import (  # noqa: E402,F401
+    AdaptiveRateLimiter,
+    HOST_RATE_LIMITS,
+    configure_host,
+    get_host_limiter,
+    get_host_limiter_for_url,
+    parse_retry_after,
+    register_host_defaults,
+)
@@ -0,0 +1,256 @@
+"""
+Change-priority scheduling for Allabolag refreshes
+
+Ranks companies by how likely their Allabolag data changed since the last
+scrape, instead of by staleness alone:
+- Staleness: days since last_synced_at, relative to the cache period
+- Change signals newer than the last sync: POIT announcements (board
+  changes, bankruptcies, notices) and equity offerings, decaying with age
+- Watchlist membership: watched companies go stale faster
+
+A company with a signal newer than its last sync is marked `force` so the
+scraper refreshes it even if it is still inside the cache period.
+
+Usage:
+    prioritizer = RefreshPrioritizer(cache_hours=168)
+    prioritizer.load_signals(supabase)
+    ranked = prioritizer.rank(orgnrs, last_synced_map)[:200]
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional, List, Iterable
+
+# POIT categories that usually mean the Allabolag page changed
+POIT_CATEGORY_WEIGHTS = {
+    "bolagsverkets_registreringar": 3.0,  # board, signatories, share capital
+    "konkurser": 3.0,
+    "kallelser": 1.5,                     # general meetings, creditor notices
+    "skuldsaneringar": 0.5,
+    "familjeratt": 0.0,
+}
+DEFAULT_POIT_WEIGHT = 1.0
+
+OFFERING_STATUS_WEIGHTS = {
+    "completed": 3.0,  # new share count and capital
+    "active": 2.0,
+    "upcoming": 1.0,
+    "cancelled": 0.0,
+}
+DEFAULT_OFFERING_WEIGHT = 1.0
+
+SIGNAL_WINDOW_DAYS = 30
+SIGNAL_HALF_LIFE_DAYS = 7.0
+# Staleness counts this much more for watched companies
+WATCHLIST_WEIGHT = 0.5
+# Staleness stops growing after this many cache periods
+MAX_STALENESS = 4.0
+PAGE_SIZE = 1000
+
+
+def normalize_orgnr(orgnr: Optional[str]) -> Optional[str]:
+    """Digits only, so '556123-4567' and '5561234567' match."""
+    if not orgnr:
+        return None
+    digits = "".join(c for c in str(orgnr) if c.isdigit())
+    return digits or None
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """ISO date or timestamp as an aware UTC datetime, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@dataclass
+class ChangeSignal:
+    """One event suggesting a company's data changed"""
+    source: str  # 'poit' or 'offering'
+    kind: str    # POIT category or offering status
+    weight: float
+    at: datetime
+
+
+@dataclass
+class RefreshCandidate:
+    """A company with its priority score"""
+    orgnr: str
+    score: float
+    staleness: float
+    force: bool = False
+    reasons: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "orgnr": self.orgnr,
+            "score": round(self.score, 3) if math.isfinite(self.score) else "never_synced",
+            "force": self.force,
+            "reasons": self.reasons
+        }
+
+
+class RefreshPrioritizer:
+    """
+    Scores companies for the daily Allabolag budget.
+
+    score = staleness * (1 + WATCHLIST_WEIGHT if watched)
+            + sum(signal weight * 0.5 ** (age_days / half_life))
+
+    where staleness is time since last sync in cache periods (capped), and
+    only signals newer than the last sync count. Never-synced companies
+    always come first.
+    """
+
+    def __init__(self,
+                 cache_hours: float = 168,
+                 window_days: int = SIGNAL_WINDOW_DAYS,
+                 half_life_days: float = SIGNAL_HALF_LIFE_DAYS,
+                 watchlist_weight: float = WATCHLIST_WEIGHT):
+        """
+        Initialize prioritizer.
+
+        Args:
+            cache_hours: Cache period of the scraper (staleness 1.0 = due)
+            window_days: How far back change signals are loaded
+            half_life_days: Age at which a signal counts half
+            watchlist_weight: Extra staleness weight for watched companies
+        """
+        self.cache_hours = cache_hours
+        self.window_days = window_days
+        self.half_life_days = half_life_days
+        self.watchlist_weight = watchlist_weight
+
+        self.signals: Dict[str, List[ChangeSignal]] = {}
+        self.watchers: Dict[str, int] = {}
+
+    # =========================================================================
+    # SIGNALS
+    # =========================================================================
+
+    def add_signal(self, orgnr: Optional[str], signal: ChangeSignal):
+        orgnr = normalize_orgnr(orgnr)
+        if orgnr and signal.weight > 0:
+            self.signals.setdefault(orgnr, []).append(signal)
+
+    def add_watch(self, orgnr: Optional[str]):
+        orgnr = normalize_orgnr(orgnr)
+        if orgnr:
+            self.watchers[orgnr] = self.watchers.get(orgnr, 0) + 1
+
+    def add_poit_announcements(self, rows: Iterable[Dict[str, Any]]):
+        """Rows with orgnr, extracted_orgnrs, category and announcement_date/created_at."""
+        for row in rows:
+            at = parse_timestamp(row.get("announcement_date")) or parse_timestamp(row.get("created_at"))
+            if not at:
+                continue
+            category = row.get("category") or ""
+            signal = ChangeSignal("poit", category, POIT_CATEGORY_WEIGHTS.get(category, DEFAULT_POIT_WEIGHT), at)
+            # One signal per company even if the orgnr is repeated
+            orgnrs = {normalize_orgnr(o) for o in [row.get("orgnr"), *(row.get("extracted_orgnrs") or [])]}
+            for orgnr in orgnrs:
+                self.add_signal(orgnr, signal)
+
+    def add_equity_offerings(self, rows: Iterable[Dict[str, Any]]):
+        """Rows with company_orgnr, status and the offering's dates."""
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            # The most recent event that has happened: listing, end of subscription, or publication
+            dates = [parse_timestamp(row.get(key)) for key in
+                     ("listing_date", "subscription_end", "subscription_start", "created_at")]
+            past = [d for d in dates if d and d <= now]
+            if not past:
+                continue
+            status = row.get("status") or ""
+            weight = OFFERING_STATUS_WEIGHTS.get(status, DEFAULT_OFFERING_WEIGHT)
+            self.add_signal(row.get("company_orgnr"), ChangeSignal("offering", status, weight, max(past)))
+
+    def load_signals(self, supabase):
+        """
+        Load POIT announcements, equity offerings and watchlists from Supabase.
+
+        Only the signal window is loaded, which is small next to the company
+        list. A failing source is skipped, not fatal.
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=self.window_days)).date().isoformat()
+
+        try:
+            self.add_poit_announcements(_paged(
+                lambda: supabase.table("poit_announcements")
+                .select("orgnr, extracted_orgnrs, category, announcement_date, created_at")
+                .gte("announcement_date", since)
+            ))
+        except Exception as e:
+            print(f"Error loading POIT signals: {e}")
+
+        try:
+            self.add_equity_offerings(_paged(
+                lambda: supabase.table("equity_offerings")
+                .select("company_orgnr, status, subscription_start, subscription_end, listing_date, created_at")
+                .not_.is_("company_orgnr", "null")
+                .gte("created_at", since)
+            ))
+        except Exception as e:
+            print(f"Error loading offering signals: {e}")
+
+        try:
+            for row in _paged(lambda: supabase.table("user_watchlists").select("orgnr")):
+                self.add_watch(row.get("orgnr"))
+        except Exception as e:
+            print(f"Error loading watchlists: {e}")
+
+    # =========================================================================
+    # SCORING
+    # =========================================================================
+
+    def score(self, orgnr: str, last_synced: Optional[str], now: Optional[datetime] = None) -> RefreshCandidate:
+        now = now or datetime.now(timezone.utc)
+        key = normalize_orgnr(orgnr)
+        synced_at = parse_timestamp(last_synced)
+        watched = self.watchers.get(key, 0) > 0
+
+        if synced_at is None:
+            return RefreshCandidate(orgnr, math.inf, math.inf, reasons=["never_synced"])
+
+        age_hours = max(0.0, (now - synced_at).total_seconds() / 3600)
+        staleness = min(MAX_STALENESS, age_hours / self.cache_hours)
+        score = staleness * (1 + self.watchlist_weight if watched else 1)
+        reasons = [f"staleness:{staleness:.2f}"]
+        if watched:
+            reasons.append(f"watchlist:{self.watchers[key]}")
+
+        force = False
+        for signal in self.signals.get(key, []):
+            # Already captured by the last scrape
+            if signal.at <= synced_at:
+                continue
+            age_days = max(0.0, (now - signal.at).total_seconds() / 86400)
+            score += signal.weight * 0.5 ** (age_days / self.half_life_days)
+            reasons.append(f"{signal.source}:{signal.kind}")
+            force = True
+
+        return RefreshCandidate(orgnr, score, staleness, force=force, reasons=reasons)
+
+    def rank(self, orgnrs: List[str], last_synced_map: Dict[str, Optional[str]]) -> List[RefreshCandidate]:
+        """All companies, highest priority first (ties: most stale first)."""
+        now = datetime.now(timezone.utc)
+        scored = [self.score(orgnr, last_synced_map.get(orgnr), now) for orgnr in orgnrs]
+        return sorted(scored, key=lambda c: (c.score, c.staleness), reverse=True)
+
+
+def _paged(query_factory, page_size: int = PAGE_SIZE) -> Iterable[Dict[str, Any]]:
+    """Yield all rows of a select, one range() page at a time (fresh query per page)."""
+    offset = 0
+    while True:
+        rows = query_factory().range(offset, offset + page_size - 1).execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        offset += page_size
@@ -0,0 +1,37 @@
+-- ============================================================================
+-- Allabolag: sektions-hashar och rollhistorik
+-- Skrapern hoppar över oförändrade sektioner (details/roles/financials) och
+-- skriver bara diffar för de som ändrats. Rolldiffarna sparas som historik.
+-- ============================================================================
+
+ALTER TABLE company_details
+ADD COLUMN IF NOT EXISTS section_hashes JSONB DEFAULT '{}'::jsonb;
+
+COMMENT ON COLUMN company_details.section_hashes IS 'SHA-256 per sektion (details, roles, financials) från senaste skrapning';
+
+-- ============================================================================
+-- TABLE: company_role_changes
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS public.company_role_changes (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  orgnr TEXT NOT NULL,
+  change_type TEXT NOT NULL CHECK (change_type IN ('added', 'removed')),
+  name TEXT,
+  birth_year INTEGER,
+  role_type TEXT,
+  role_category TEXT,
+  source TEXT,
+  detected_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_company_role_changes_orgnr ON company_role_changes(orgnr);
+CREATE INDEX IF NOT EXISTS idx_company_role_changes_detected_at ON company_role_changes(detected_at DESC);
+
+ALTER TABLE company_role_changes ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Authenticated can view company role changes" ON company_role_changes;
+CREATE POLICY "Authenticated can view company role changes"
+  ON company_role_changes
+  FOR SELECT
+  USING (auth.role() = 'authenticated');
+
+GRANT ALL ON TABLE company_role_changes TO service_role;
@@ -0,0 +1,75 @@
+"""
+Tests for the shared Allabolag parsing core, driven by the saved pages in
+tests/fixtures/allabolag (<page>.html -> <page>.expected.json).
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.scrapers.allabolag_core import (
+    extract_page_data,
+    map_role_category,
+    parse_employees,
+    parse_financial_period,
+    structure_company,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "allabolag"
+
+CASES = [
+    ("nextjs_company", "nextjs_organisation", "5561234567"),
+    ("legacy_company", None, "5569999999"),
+]
+
+
+def load_page(name, as_bytes=False):
+    path = FIXTURES / f"{name}.html"
+    return path.read_bytes() if as_bytes else path.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("as_bytes", [False, True])
+@pytest.mark.parametrize("main, org, orgnr", CASES)
+def test_structure_matches_expected(main, org, orgnr, as_bytes):
+    main_data = extract_page_data(load_page(main, as_bytes))
+    org_data = extract_page_data(load_page(org, as_bytes)) if org else None
+    expected = json.loads((FIXTURES / f"{main}.expected.json").read_text(encoding="utf-8"))
+
+    assert structure_company(main_data, org_data, orgnr) == expected
+
+
+def test_legacy_format_only_when_allowed():
+    html = load_page("legacy_company")
+    assert extract_page_data(html)["companyOverview"]["namn"] == "Gamla Formatet AB"
+    assert extract_page_data(html, legacy=False) is None
+    assert extract_page_data(None) is None
+
+
+def test_financial_period_scaling():
+    fin = parse_financial_period({"year": "2024", "length": "x", "accounts": [
+        {"code": "SDI", "amount": "1.5"},
+        {"code": "ANT", "amount": "7"},
+        {"code": "DR", "amount": "bad"},
+    ]}, is_consolidated=True)
+    assert fin == {
+        "period_year": 2024,
+        "period_months": 12,
+        "is_consolidated": 1,
+        "source": "allabolag",
+        "revenue": 1500,
+        "num_employees": 7,
+    }
+
+
+def test_field_parsers():
+    assert parse_employees("1-4") == 1
+    assert parse_employees("25") == 25
+    assert parse_employees("many") is None
+    assert parse_employees(None) is None
+    assert map_role_category("Board", "Okänd") == "BOARD"
+    assert map_role_category("Board", "Revisor") == "AUDITOR"
+    assert map_role_category("Unknown", "Okänd") == "OTHER"
@@ -0,0 +1,106 @@
+"""
+Tests for the per-section hashes and diffs behind Allabolag saves.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("httpx")
+pytest.importorskip("supabase")
+
+from src.scrapers.allabolag_scraper import SavePlan, diff_financials, diff_roles, section_hash
+
+
+def role(name, role_type="Styrelseledamot", **extra):
+    return {"name": name, "birth_year": 1970, "role_type": role_type, "role_category": "BOARD", **extra}
+
+
+def financial(year, **values):
+    return {"period_year": year, "period_months": 12, "is_consolidated": False, **values}
+
+
+def company(roles=None, financials=None, **details):
+    return {
+        "orgnr": "5561234567",
+        "name": "Testbolaget AB",
+        "last_synced_at": "2026-01-01T00:00:00",
+        "roles": roles if roles is not None else [role("Anna"), role("Bo", "VD")],
+        "financials": financials if financials is not None else [financial(2023, revenue=1), financial(2024, revenue=2)],
+        **details,
+    }
+
+
+def test_role_diff_is_a_multiset_diff():
+    existing = [
+        {"id": 1, **role("Anna")},
+        {"id": 2, **role("Anna")},
+        {"id": 3, **role("Bo")},
+    ]
+
+    # Two Annas become one, one Bo becomes two
+    to_insert, to_delete = diff_roles(existing, [role("Anna"), role("Bo"), role("Bo")])
+    assert to_insert == [role("Bo")]
+    assert len(to_delete) == 1 and to_delete[0]["name"] == "Anna"
+
+    # Fields outside the key (e.g. a changed from-date) are not a change
+    assert diff_roles(existing, [role("Anna", since="2020"), role("Anna"), role("Bo")]) == ([], [])
+
+
+def test_financial_update_clears_dropped_columns_only():
+    existing = [
+        {"id": 10, "orgnr": "5561234567", "created_at": "2025-01-01", **financial(2023, revenue=10, profit=5, ebit=None)},
+        {"id": 11, "orgnr": "5561234567", "created_at": "2025-01-01", **financial(2022, revenue=8)},
+    ]
+
+    to_insert, to_update, to_delete = diff_financials(existing, [financial(2023, revenue=11), financial(2024, revenue=12)])
+
+    assert to_insert == [financial(2024, revenue=12)]
+    # profit is no longer reported -> cleared; already-NULL ebit and the
+    # row's identity columns are left alone
+    assert to_update == [(10, {"revenue": 11, "profit": None})]
+    assert to_delete == [11]
+
+
+def test_unchanged_financials_produce_no_update():
+    existing = [{"id": 10, "orgnr": "5561234567", "created_at": "2025-01-01", **financial(2023, revenue=10)}]
+    assert diff_financials(existing, [financial(2023, revenue=10)]) == ([], [], [])
+
+
+def test_empty_section_never_wipes_stored_data():
+    stored = SavePlan(company(), None).hashes
+
+    plan = SavePlan(company(roles=[], financials=[]), stored)
+
+    assert not plan.roles_changed and not plan.financials_changed
+    assert plan.hashes["roles"] == stored["roles"]
+    assert plan.hashes["financials"] == stored["financials"]
+    assert not plan.details_changed
+    assert plan.sync_row() == {"last_synced_at": "2026-01-01T00:00:00", "section_hashes": stored}
+
+
+def test_hashes_are_stable_under_reordering():
+    first = SavePlan(company(), None)
+    reordered = SavePlan(company(
+        roles=[role("Bo", "VD"), role("Anna")],
+        financials=[financial(2024, revenue=2), financial(2023, revenue=1)],
+        last_synced_at="2026-02-01T00:00:00",
+    ), first.hashes)
+
+    assert reordered.hashes == first.hashes
+    assert not (reordered.roles_changed or reordered.financials_changed or reordered.details_changed)
+    assert section_hash({"a": 1, "b": [1, 2]}) == section_hash({"b": [1, 2], "a": 1})
+    assert section_hash([1, 2]) != section_hash([2, 1])
+
+
+def test_changed_sections_are_detected_per_section():
+    stored = SavePlan(company(), None).hashes
+
+    plan = SavePlan(company(roles=[role("Anna"), role("Cia")], name="Nytt namn AB"), stored)
+
+    assert plan.roles_changed and plan.details_changed and not plan.financials_changed
+    assert plan.details_row()["section_hashes"] == plan.hashes
+    assert "roles" not in plan.details_row()
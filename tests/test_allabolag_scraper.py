@@ -0,0 +1,55 @@
+"""
+Tests for the Allabolag scraper's per-loop AsyncClient handling.
+"""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("supabase")
+
+from src.scrapers.allabolag_scraper import AllabolagScraper
+
+
+def test_client_from_a_finished_loop_is_closed_and_replaced():
+    scraper = AllabolagScraper()
+
+    async def get_client():
+        return await scraper._get_async_client()
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+
+    assert second is not first
+    assert first.is_closed and not second.is_closed
+    asyncio.run(scraper.aclose())
+    assert second.is_closed
+
+
+def test_client_on_a_loop_in_another_thread_is_closed_there():
+    scraper = AllabolagScraper()
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(scraper._get_async_client(), other).result(timeout=5)
+
+        async def get_client():
+            return await scraper._get_async_client()
+
+        second = asyncio.run(get_client())
+        # The handoff runs on the other loop; wait for it to get there
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other).result(timeout=5)
+
+        assert second is not first and first.is_closed
+        asyncio.run(scraper.aclose())
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join()
+        other.close()
@@ -0,0 +1,204 @@
+"""
+Tests for the Allabolag write-behind buffer, against an in-memory stand-in
+for the Supabase query builder.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("httpx")
+pytest.importorskip("supabase")
+
+from src.scrapers.allabolag_writer import AllabolagWriteBuffer, WriteBufferFlushError
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = None
+        self.rows = None
+        self.filter = None
+
+    def select(self, columns):
+        self.op = "select"
+        return self
+
+    def insert(self, rows):
+        self.op, self.rows = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.op, self.rows = "upsert", rows
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def in_(self, field, values):
+        self.filter = (field, list(values))
+        return self
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+class FakeSupabase:
+    def __init__(self, tables=None, fail_on=None, on_execute=None):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.fail_on = fail_on
+        self.on_execute = on_execute
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def execute(self, query):
+        if self.on_execute:
+            self.on_execute(query)
+        if (query.table, query.op) == self.fail_on:
+            raise RuntimeError("connection reset")
+        self.calls.append((query.table, query.op, query.rows if query.rows is not None else query.filter))
+        rows = self.tables.setdefault(query.table, [])
+        if query.op == "select":
+            field, values = query.filter
+            return FakeResult([dict(r) for r in rows if r.get(field) in values])
+        if query.op == "delete":
+            field, values = query.filter
+            rows[:] = [r for r in rows if r.get(field) not in values]
+        return FakeResult(query.rows)
+
+    def writes(self, table, op):
+        return [payload for t, o, payload in self.calls if (t, o) == (table, op)]
+
+
+def role(name, role_type="Styrelseledamot"):
+    return {"name": name, "birth_year": 1970, "role_type": role_type, "role_category": "board"}
+
+
+def financial(year, **values):
+    return {"period_year": year, "period_months": 12, "is_consolidated": False, **values}
+
+
+def company(orgnr, roles=(), financials=(), **details):
+    return {
+        "orgnr": orgnr,
+        "name": f"Bolag {orgnr}",
+        "last_synced_at": "2026-01-01T00:00:00",
+        "roles": list(roles),
+        "financials": list(financials),
+        **details,
+    }
+
+
+def test_flush_writes_role_and_financial_diffs():
+    db = FakeSupabase({
+        "company_details": [{"orgnr": "1", "section_hashes": {"details": "old"}}],
+        "company_roles": [
+            {"id": 1, "orgnr": "1", **role("Anna")},
+            {"id": 2, "orgnr": "1", **role("Anna")},
+            {"id": 3, "orgnr": "1", **role("Bo")},
+        ],
+        "company_financials": [
+            {"id": 10, "orgnr": "1", "created_at": "2025", **financial(2023, revenue=10, profit=5)},
+            {"id": 11, "orgnr": "1", "created_at": "2025", **financial(2022, revenue=8)},
+        ],
+    })
+    buffer = AllabolagWriteBuffer(db)
+    buffer.add(company(
+        "1",
+        roles=[role("Anna"), role("Cia")],
+        financials=[financial(2023, revenue=11), financial(2024, revenue=12)],
+    ))
+
+    assert buffer.flush() == ["1"]
+
+    # One of the two Annas and Bo go, Cia is new - logged as history
+    [(field, deleted)] = db.writes("company_roles", "delete")
+    assert field == "id" and sorted(deleted) in ([1, 3], [2, 3])
+    assert db.writes("company_roles", "insert") == [[{"orgnr": "1", **role("Cia")}]]
+    history = db.writes("company_role_changes", "insert")[0]
+    assert sorted((r["change_type"], r["name"]) for r in history) == [("added", "Cia"), ("removed", "Anna"), ("removed", "Bo")]
+
+    # 2023 updated in place (dropped profit cleared), 2022 deleted, 2024 inserted
+    assert db.writes("company_financials", "delete") == [("id", [11])]
+    assert db.writes("company_financials", "upsert") == [[
+        {"id": 10, "orgnr": "1", "created_at": "2025", **financial(2023, revenue=11, profit=None)}
+    ]]
+    assert db.writes("company_financials", "insert") == [[{"orgnr": "1", **financial(2024, revenue=12)}]]
+
+    details = db.writes("company_details", "upsert")
+    assert len(details) == 1 and details[0][0]["name"] == "Bolag 1"
+    assert len(buffer) == 0 and "1" not in buffer
+
+
+def test_flush_groups_upserts_by_column_set():
+    db = FakeSupabase({
+        "company_details": [
+            {"orgnr": "1", "section_hashes": {}},
+            {"orgnr": "2", "section_hashes": {}},
+        ],
+        "company_financials": [
+            {"id": 1, "orgnr": "1", **financial(2023, revenue=1)},
+            {"id": 2, "orgnr": "2", **financial(2023, revenue=1, profit=1)},
+        ],
+    })
+    buffer = AllabolagWriteBuffer(db)
+    buffer.add(company("1", financials=[financial(2023, revenue=2)]))
+    buffer.add(company("2", financials=[financial(2023, revenue=2)]))
+    buffer.add(company("3", industry="Bygg"), previous_hashes=None)
+
+    assert sorted(buffer.flush()) == ["1", "2", "3"]
+
+    # Rows with different columns never share a multi-row upsert (PostgREST
+    # would fill the missing ones with NULL)
+    for table in ("company_financials", "company_details"):
+        calls = db.writes(table, "upsert")
+        for rows in calls:
+            assert len({frozenset(r) for r in rows}) == 1
+    assert len(db.writes("company_financials", "upsert")) == 2
+    assert len(db.writes("company_details", "upsert")) == 2
+
+
+def test_flush_only_looks_up_unknown_hashes():
+    db = FakeSupabase()
+    buffer = AllabolagWriteBuffer(db)
+    buffer.add(company("1"), previous_hashes=None)
+    buffer.add(company("2"))
+
+    buffer.flush()
+
+    assert db.writes("company_details", "select") == [("orgnr", ["2"])]
+
+
+def test_failed_flush_reports_swapped_orgnrs_and_tracks_in_flight():
+    seen_during_flush = []
+
+    def on_execute(query):
+        seen_during_flush.append(("1" in buffer, "2" in buffer))
+
+    db = FakeSupabase(fail_on=("company_roles", "insert"), on_execute=on_execute)
+    buffer = AllabolagWriteBuffer(db, flush_size=2)
+    buffer.add(company("1", roles=[role("Anna")]), previous_hashes=None)
+    buffer.add(company("2"), previous_hashes=None)
+    assert buffer.is_due()
+
+    with pytest.raises(WriteBufferFlushError) as exc_info:
+        buffer.flush()
+
+    assert exc_info.value.orgnrs == ["1", "2"]
+    assert isinstance(exc_info.value.__cause__, RuntimeError)
+    # Still "in" the buffer while the flush runs, gone once it has returned
+    assert seen_during_flush and all(seen == (True, True) for seen in seen_during_flush)
+    assert "1" not in buffer and len(buffer) == 0
+    assert db.writes("company_details", "upsert") == []  # hashes never move past unwritten sections
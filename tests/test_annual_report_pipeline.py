@@ -0,0 +1,79 @@
+"""
+Tests for the staged bulk annual-report sync.
+"""
+
+import asyncio
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.scrapers.annual_report_pipeline import AnnualReportPipeline, select_documents
+
+
+class FakeClient:
+    def __init__(self, documents):
+        self.documents = documents
+        self.downloads = []
+
+    async def get_document_list_async(self, orgnr):
+        await asyncio.sleep(0)
+        if orgnr.startswith("fail"):
+            return None  # what the client returns when the request failed
+        return [dict(d) for d in self.documents.get(orgnr, [])]
+
+    async def download_document_file_async(self, dokument_id):
+        await asyncio.sleep(0)
+        self.downloads.append(dokument_id)
+        return None if dokument_id.startswith("missing") else io.BytesIO(f"PK{dokument_id}".encode())
+
+
+def docs(*ids):
+    return [{"dokumentId": d, "rapporteringsperiodTom": f"20{20 + i}-12-31"} for i, d in enumerate(ids)]
+
+
+def test_select_documents_keeps_most_recent():
+    selected = select_documents(docs("a", "b", "c") + [{"rapporteringsperiodTom": "2030-12-31"}], 2)
+    assert [d["dokumentId"] for d in selected] == ["c", "b"]
+
+
+def test_pipeline_stores_and_reports_companies():
+    client = FakeClient({
+        "1": docs("a1", "b1", "c1"),
+        "2": docs("a2", "missing2"),
+        "3": [],
+    })
+    stored, finished = [], {}
+
+    pipeline = AnnualReportPipeline(
+        client,
+        parse=lambda archive, orgnr, doc: archive.read().decode(),
+        store=lambda orgnr, doc, parsed: stored.append((orgnr, parsed)),
+        years=2,
+        skip_document=lambda orgnr, doc: doc["dokumentId"] == "c1",
+        on_company_done=lambda orgnr, ok: finished.__setitem__(orgnr, ok),
+        download_workers=2,
+        queue_size=1,
+    )
+    stats = asyncio.run(pipeline.run(["1", "2", "3", "1"]))
+
+    assert sorted(stored) == [("1", "PKb1"), ("2", "PKa2")]
+    assert finished == {"1": True, "2": False, "3": True}
+    assert "a1" not in client.downloads  # outside the 2 most recent years
+    assert stats.to_dict()["stored"] == 2
+    assert (stats.skipped, stats.failed, stats.companies_done, stats.companies_failed) == (1, 1, 2, 1)
+
+
+def test_failed_document_list_is_not_reported_done():
+    finished = {}
+    pipeline = AnnualReportPipeline(
+        FakeClient({"1": docs("a1")}),
+        parse=lambda archive, orgnr, doc: archive.read(),
+        store=lambda orgnr, doc, parsed: None,
+        on_company_done=lambda orgnr, ok: finished.__setitem__(orgnr, ok),
+    )
+    stats = asyncio.run(pipeline.run(["1", "fail1", "2"]))
+
+    assert finished == {"1": True, "fail1": False, "2": True}
+    assert (stats.companies_done, stats.companies_failed) == (2, 1)
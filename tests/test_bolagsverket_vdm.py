@@ -0,0 +1,323 @@
+"""
+Tests for BolagsverketVDMClient token handling and its request retry loop,
+with a fake token endpoint, a stubbed requests session and
+httpx.MockTransport.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+requests = pytest.importorskip("requests")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.scrapers.bolagsverket_vdm import BolagsverketVDMClient
+
+
+class FakeTokenResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._payload
+
+
+class FakeTokenEndpoint:
+    """Stands in for both the requests session and the httpx client: only post() is used."""
+
+    def __init__(self, status_code=200, delay=0.01):
+        self.status_code = status_code
+        self.delay = delay
+        self.async_mode = True
+        self.posts = 0
+
+    def _respond(self):
+        self.posts += 1
+        return FakeTokenResponse(self.status_code, {"access_token": f"token-{self.posts}", "expires_in": 3600})
+
+    async def _post_async(self, url, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._respond()
+
+    def post(self, url, **kwargs):
+        if self.async_mode:
+            return self._post_async(url, **kwargs)
+        time.sleep(self.delay)
+        return self._respond()
+
+
+def make_client(endpoint, async_mode=True):
+    client = BolagsverketVDMClient(client_id="id", client_secret="secret")
+    endpoint.async_mode = async_mode
+    client._get_async_client = lambda: endpoint
+    client._get_session = lambda: endpoint
+    return client
+
+
+def set_token(client, token, valid_for):
+    client._access_token = token
+    client._token_expires_at = datetime.now() + timedelta(seconds=valid_for)
+
+
+def test_cold_burst_refreshes_once():
+    endpoint = FakeTokenEndpoint()
+    client = make_client(endpoint)
+
+    async def burst():
+        return await asyncio.gather(*(client._get_token_async() for _ in range(20)))
+
+    assert asyncio.run(burst()) == ["token-1"] * 20
+    assert endpoint.posts == 1
+    assert client.token_refreshes == 1
+
+
+def test_cold_burst_refreshes_once_across_threads():
+    endpoint = FakeTokenEndpoint(delay=0.05)
+    client = make_client(endpoint, async_mode=False)
+    tokens = []
+
+    threads = [threading.Thread(target=lambda: tokens.append(client._get_token_sync())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 8
+    assert endpoint.posts == 1
+
+
+def test_renewal_margin_returns_old_token_and_renews_in_background():
+    endpoint = FakeTokenEndpoint()
+    client = make_client(endpoint)
+    set_token(client, "old", client.TOKEN_MARGIN_SECONDS - 60)
+
+    async def run():
+        tokens = await asyncio.gather(*(client._get_token_async() for _ in range(10)))
+        assert endpoint.posts == 0  # nobody waited for the renewal
+        await client._token_renewal
+        return tokens
+
+    assert asyncio.run(run()) == ["old"] * 10
+    assert endpoint.posts == 1
+    assert client._access_token == "token-1"
+
+
+def test_stale_401_does_not_discard_refreshed_token():
+    client = make_client(FakeTokenEndpoint())
+    set_token(client, "new", 3600)
+
+    client._invalidate_token("old")  # 401 for a request sent with the previous token
+    assert client._access_token == "new"
+
+    client._invalidate_token("new")
+    assert client._access_token is None and client._token_expires_at is None
+
+
+def test_failed_refresh_is_not_retried_by_waiters():
+    endpoint = FakeTokenEndpoint(status_code=500)
+    client = make_client(endpoint)
+
+    async def burst():
+        return await asyncio.gather(*(client._get_token_async() for _ in range(5)))
+
+    assert asyncio.run(burst()) == [None] * 5
+    assert endpoint.posts == 1
+
+    # Still inside TOKEN_RETRY_SECONDS: no new attempt
+    assert asyncio.run(client._get_token_async()) is None
+    assert client._get_token_sync() is None
+    assert endpoint.posts == 1
+
+    client._token_failed_at -= client.TOKEN_RETRY_SECONDS
+    endpoint.status_code = 200
+    assert asyncio.run(client._get_token_async()) == "token-2"
+    assert endpoint.posts == 2
+
+
+def test_failed_refresh_keeps_unexpired_token():
+    endpoint = FakeTokenEndpoint(status_code=503)
+    client = make_client(endpoint)
+    set_token(client, "old", client.TOKEN_MIN_VALIDITY_SECONDS - 10)
+
+    assert asyncio.run(client._get_token_async()) == "old"
+    assert endpoint.posts == 1
+
+
+# =============================================================================
+# REQUEST RETRY LOOP
+# =============================================================================
+
+class FakeGovernor:
+    def __init__(self):
+        self.acquired = 0
+        self.records = []
+
+    def acquire(self):
+        self.acquired += 1
+
+    async def acquire_async(self):
+        self.acquired += 1
+
+    def record(self, status_code, latency, retry_after=None):
+        self.records.append((status_code, retry_after))
+
+
+class FakeApiResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession(FakeTokenEndpoint):
+    """Token endpoint plus API calls answered from a script of statuses/exceptions."""
+
+    def __init__(self, script):
+        super().__init__(delay=0)
+        self.async_mode = False
+        self.script = list(script)
+        self.sent = []
+        self.responses = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.sent.append(headers["Authorization"])
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        response = FakeApiResponse(*step) if isinstance(step, tuple) else FakeApiResponse(step)
+        self.responses.append(response)
+        return response
+
+
+def make_api_client(script):
+    session = FakeSession(script)
+    client = BolagsverketVDMClient(client_id="id", client_secret="secret")
+    client._get_session = lambda: session
+    governor = FakeGovernor()
+    client._governor = lambda: governor
+    set_token(client, "token-0", 3600)
+    return client, session, governor
+
+
+def test_request_retries_429_with_and_without_retry_after():
+    client, session, governor = make_api_client([(429, {"Retry-After": "7"}), 429, 200])
+
+    response = client._request("GET", "/x", {}, "test")
+
+    assert response.status_code == 200
+    assert governor.acquired == 3
+    assert governor.records == [(429, 7.0), (429, None), (200, None)]
+    assert [r.closed for r in session.responses] == [True, True, False]
+
+
+def test_request_retries_5xx_and_connection_errors():
+    client, session, governor = make_api_client([503, requests.exceptions.ConnectionError("reset"), 200])
+
+    assert client._request("GET", "/x", {}, "test").status_code == 200
+    assert governor.records == [(503, None), (None, None), (200, None)]
+    assert session.responses[0].closed
+
+
+def test_request_gives_up_after_max_retries():
+    retries = BolagsverketVDMClient.MAX_429_RETRIES
+    client, session, governor = make_api_client([429] * (retries + 1))
+
+    response = client._request("GET", "/x", {}, "test")
+
+    assert response.status_code == 429 and not response.closed
+    assert governor.acquired == retries + 1
+
+    client, session, governor = make_api_client([requests.exceptions.ConnectionError("down")] * (retries + 1))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client._request("GET", "/x", {}, "test")
+    assert governor.records == [(None, None)] * (retries + 1)
+
+
+def test_request_401_then_429_refreshes_token_once():
+    client, session, governor = make_api_client([401, 429, 200])
+
+    response = client._request("GET", "/x", {}, "test")
+
+    assert response.status_code == 200
+    assert session.posts == 1
+    assert session.sent == ["Bearer token-0", "Bearer token-1", "Bearer token-1"]
+    assert governor.records == [(401, None), (429, None), (200, None)]
+    assert session.responses[0].closed
+
+
+def test_request_401_is_retried_only_once():
+    client, session, governor = make_api_client([401, 401])
+
+    assert client._request("GET", "/x", {}, "test").status_code == 401
+    assert governor.acquired == 2
+
+
+def make_async_api_client(script):
+    """Client whose API calls go to httpx.MockTransport, answered from `script`."""
+    sent, responses = [], []
+
+    async def body():
+        yield b"{}"  # streamed, so the response stays open until closed
+
+    def handler(request):
+        sent.append(request.headers["Authorization"])
+        step = script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        status, headers = step if isinstance(step, tuple) else (step, {})
+        response = httpx.Response(status, headers=headers, content=body())
+        responses.append(response)
+        return response
+
+    client = BolagsverketVDMClient(client_id="id", client_secret="secret")
+    api = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    tokens = FakeTokenEndpoint(delay=0)
+    api.post = tokens.post
+    client._get_async_client = lambda: api
+    governor = FakeGovernor()
+    client._governor = lambda: governor
+    set_token(client, "token-0", 3600)
+    return client, governor, tokens, sent, responses
+
+
+def test_async_request_retries_and_closes_responses():
+    client, governor, tokens, sent, responses = make_async_api_client(
+        [(429, {"Retry-After": "2"}), httpx.ConnectError("reset"), 502, 200]
+    )
+
+    async def run():
+        return await client._request_async("GET", "/x", {}, "test", stream=True)
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert governor.acquired == 4
+    assert governor.records == [(429, 2.0), (None, None), (502, None), (200, None)]
+    assert [r.is_closed for r in responses] == [True, True, False]
+
+
+def test_async_request_401_then_429_and_exhaustion():
+    client, governor, tokens, sent, responses = make_async_api_client([401, 429, 429, 429, 429])
+
+    response = asyncio.run(client._request_async("GET", "/x", {}, "test"))
+
+    assert response.status_code == 429
+    assert tokens.posts == 1
+    assert sent == ["Bearer token-0"] + ["Bearer token-1"] * 4
+    assert [status for status, _ in governor.records] == [401, 429, 429, 429, 429]
+    assert governor.acquired == 1 + client.MAX_429_RETRIES + 1
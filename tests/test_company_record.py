@@ -0,0 +1,152 @@
+"""
+Tests for the lazily decoded company record used by the company endpoints.
+"""
+
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.api.company_record import CompanyRecord, CompanyRecordCache
+
+
+COMPANY = {
+    "orgnr": "5561234567",
+    "name": "Testbolaget AB",
+    "is_group": True,
+    "roles": [
+        {"name": "Anna", "role_type": "Ordförande", "role_category": "BOARD"},
+        {"name": "Bo", "role_type": "VD", "role_category": "MANAGEMENT"},
+        {"name": "Cia", "role_type": "Ledamot", "role_category": "BOARD"},
+        {"name": "Revisor AB", "role_type": "Revisor", "role_category": "AUDITOR"},
+    ],
+    "financials": [
+        {"period_year": 2022, "is_consolidated": 0, "revenue": 100},
+        {"period_year": 2024, "is_consolidated": 0, "revenue": 300},
+        {"period_year": 2023, "is_consolidated": 0, "revenue": 200},
+        {"period_year": 2024, "is_consolidated": 1, "revenue": 900},
+        {"period_year": 2021, "is_consolidated": None, "revenue": 50},
+    ],
+}
+
+
+def test_sections_are_decoded_lazily():
+    record = CompanyRecord.from_dict(COMPANY)
+    assert record.decoded_sections == []
+    assert record.encoded_size > 0
+    assert record.name == "Testbolaget AB"
+    assert record.get("is_group") is True
+    assert record.get("announcements") == []
+
+    record.roles_in("BOARD")
+    assert record.decoded_sections == ["roles"]
+    assert record.roles == COMPANY["roles"] and record.roles is not COMPANY["roles"]
+
+    record.release()
+    assert record.decoded_sections == []
+    assert [r["name"] for r in record.roles_in("BOARD")] == ["Anna", "Cia"]
+
+
+def test_roles_grouped_in_original_order():
+    record = CompanyRecord.from_dict(COMPANY)
+    assert [r["name"] for r in record.roles_in("BOARD")] == ["Anna", "Cia"]
+    assert [r["name"] for r in record.roles_in("AUDITOR")] == ["Revisor AB"]
+    assert record.roles_in("OTHER") == []
+    assert len(record.roles) == 4
+
+
+def test_financials_match_filter_and_sort():
+    record = CompanyRecord.from_dict(COMPANY)
+    for consolidated in (False, True):
+        expected = sorted(
+            [f for f in COMPANY["financials"] if f.get("is_consolidated") == (1 if consolidated else 0)],
+            key=lambda x: x.get("period_year", 0), reverse=True
+        )[:2]
+        assert record.financial_periods(consolidated, 2) == expected
+    assert record.financial_period(2023)["revenue"] == 200
+    assert record.financial_period(2023, consolidated=True) is None
+
+
+def test_cache_is_keyed_by_content_version():
+    current = {"5561234567": dict(COMPANY, last_synced_at="2026-01-01T00:00:00")}
+    calls = []
+
+    def loader(orgnr):
+        calls.append(orgnr)
+        company = current.get(orgnr)
+        return json.loads(json.dumps(company)) if company else None  # a fresh dict per call
+
+    cache = CompanyRecordCache(max_size=2)
+    first = cache.get("5561234567", loader)
+    assert cache.get("5561234567", loader) is first
+    assert len(calls) == 2  # the orchestrator is always asked; its cache decides freshness
+
+    # Re-synced there -> rebuilt here, never serving the old data
+    current["5561234567"] = dict(COMPANY, name="Nytt namn AB", last_synced_at="2026-02-01T00:00:00")
+    second = cache.get("5561234567", loader)
+    assert second is not first and second.name == "Nytt namn AB"
+
+    assert cache.get("5560000000", loader) is None
+    assert len(cache) == 1
+    stats = cache.get_stats()
+    assert (stats["traffar"], stats["missar"]) == (1, 2)
+    cache.invalidate("5561234567")
+    assert len(cache) == 0
+
+
+def test_cache_without_timestamps_compares_content():
+    cache = CompanyRecordCache()
+    first = cache.get("5561234567", lambda orgnr: json.loads(json.dumps(COMPANY)))
+    assert cache.get("5561234567", lambda orgnr: json.loads(json.dumps(COMPANY))) is first
+    changed = cache.get("5561234567", lambda orgnr: dict(COMPANY, is_group=False))
+    assert changed is not first and changed.get("is_group") is False
+
+
+def test_only_recent_records_stay_decoded():
+    cache = CompanyRecordCache(decoded_size=1)
+    first = cache.get("1", lambda orgnr: dict(COMPANY, orgnr=orgnr))
+    first.roles_in("BOARD")
+    cache.get("2", lambda orgnr: dict(COMPANY, orgnr=orgnr))
+
+    assert first.decoded_sections == []
+    assert cache.get_stats()["avkodade_poster"] == 1
+
+
+def make_company(i):
+    return {
+        "orgnr": f"556{i:07d}",
+        "name": f"Bolag {i} AB",
+        "last_synced_at": "2026-01-01T00:00:00",
+        "roles": [
+            {"name": f"Person {j}", "birth_year": 1950 + j, "role_type": "Ledamot", "role_category": "BOARD"}
+            for j in range(8)
+        ],
+        "financials": [
+            {"period_year": 2015 + y, "is_consolidated": 0, "revenue": 1000 * y, "profit": 10 * y,
+             "employees": y, "equity_ratio": 0.5}
+            for y in range(10)
+        ],
+        "industries": [{"code": "62010", "name": "Dataprogrammering"}],
+    }
+
+
+def retained_bytes(build):
+    """Memory still allocated after build() returns, for what it returns."""
+    payloads = [json.dumps(make_company(i)) for i in range(200)]
+    tracemalloc.start()
+    try:
+        kept = build(payloads)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert kept
+    return size
+
+
+def test_records_are_smaller_than_company_dicts():
+    dicts = retained_bytes(lambda payloads: [json.loads(p) for p in payloads])
+    records = retained_bytes(lambda payloads: [CompanyRecord.from_dict(json.loads(p)) for p in payloads])
+
+    assert records < dicts / 2
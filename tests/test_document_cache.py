@@ -0,0 +1,72 @@
+"""
+Tests for the on-disk VDM document cache.
+"""
+
+import hashlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.scrapers.document_cache import DocumentCache
+
+
+def test_roundtrip_and_dedup(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=1 << 20)
+    content = b"PK" + b"arsredovisning " * 200
+
+    assert cache.get("doc-1") is None
+    digest = cache.put("doc-1", content)
+    cache.put("doc-2", content)
+
+    assert cache.get("doc-1") == content
+    assert cache.get("doc-2") == content
+    assert len(list((tmp_path / "blobs").glob("*/*"))) == 1
+    assert (tmp_path / "blobs" / digest[:2] / f"{digest}.z").exists()
+
+
+def test_corrupt_blob_is_dropped(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=1 << 20)
+    digest = cache.put("doc-1", os.urandom(512))
+    (tmp_path / "blobs" / digest[:2] / f"{digest}.raw").write_bytes(b"tampered")
+
+    assert cache.get("doc-1") is None
+    assert cache.corrupt == 1
+    assert not (tmp_path / "refs" / "doc-1").exists()
+
+
+def test_least_recently_used_blobs_are_evicted(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=3500)
+    past = time.time() - 100
+    for i in range(3):
+        digest = cache.put(f"doc-{i}", os.urandom(1000))
+        blob = tmp_path / "blobs" / digest[:2] / f"{digest}.raw"
+        os.utime(blob, (past + i, past + i))
+    assert cache.get("doc-0") is not None  # touched: doc-1 is now the oldest
+
+    cache.put("doc-3", os.urandom(1000))
+
+    assert cache.get("doc-1") is None
+    assert cache.get("doc-0") is not None
+    assert cache.get("doc-2") is not None
+    assert cache.get("doc-3") is not None
+    assert cache.evictions == 1
+
+
+def test_files_roundtrip_through_cache(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=1 << 20)
+    compressible = b"PK" + b"x" * 5000
+    incompressible = os.urandom(5000)
+
+    for dokument_id, content in (("a", compressible), ("b", incompressible)):
+        source = io.BytesIO(content)
+        assert cache.put_file(dokument_id, source) == hashlib.sha256(content).hexdigest()
+        assert source.tell() == 0
+        with cache.open(dokument_id) as f:
+            assert f.read() == content
+        assert cache.get(dokument_id) == content
+
+    assert cache.open("missing") is None
@@ -0,0 +1,121 @@
+"""
+Tests for iXBRL archive parsing from bytes and streamed files.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.parsers.ixbrl import analyze_ixbrl_archive
+from lib.parsers.ixbrl_batch import ParseJob, parse_archives_parallel
+
+
+def make_xhtml(repeat=40):
+    parts = []
+    for i in range(repeat):
+        parts.append(
+            f'<xbrli:context id="c{i % 4}"><xbrli:entity><xbrli:identifier>5561234567</xbrli:identifier>'
+            f'</xbrli:entity><xbrli:period><xbrli:startDate>2023-01-01</xbrli:startDate>'
+            f'<xbrli:endDate>2023-12-{10 + i % 20}</xbrli:endDate></xbrli:period></xbrli:context>'
+        )
+        parts.append(
+            f'<p>Nettoomsättning – “{i}”</p><ix:nonFraction name="se-gen-base:Nettoomsattning" '
+            f'contextRef="c{i % 4}" unitRef="SEK" scale="3">{i} 500</ix:nonFraction>'
+        )
+        parts.append(f'<ix:nonNumeric name="se-cd-base:Ort" contextRef="c1">Göteborg {i}</ix:nonNumeric>')
+        parts.append('<ix:nonFraction name="x:Nested" contextRef="c1"><span>1</span></ix:nonFraction>')
+    return "".join(parts)
+
+
+def test_archive_from_bytes_and_file_agree():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("arsredovisning.xhtml", make_xhtml(5))
+        zf.writestr("bild.png", b"\x89PNG")
+    content = buf.getvalue()
+    doc = {"dokumentId": "d1", "rapporteringsperiodTom": "2023-12-31"}
+
+    from_bytes = analyze_ixbrl_archive(content, "5561234567", doc)
+    from_file = analyze_ixbrl_archive(io.BytesIO(content), "5561234567", doc)
+
+    assert from_bytes == from_file
+    assert from_bytes["error"] is None
+    assert from_bytes["xhtml_files"] == ["arsredovisning.xhtml"]
+    assert len(from_bytes["all_facts"]) == 15
+    assert from_bytes["all_facts"][0]["value_parsed"] == 500000.0
+
+
+def test_archive_uses_single_pass_extractor():
+    sample = Path(__file__).parent / "fixtures" / "xbrl" / "sample_report.xhtml"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(sample, "report.xhtml")
+
+    analysis = analyze_ixbrl_archive(buf.getvalue(), "5567891234", {"dokumentId": "d1"})
+
+    assert analysis["error"] is None
+    assert {"name": "se-cd-base:Ort", "value": "Göteborg", "context": "period0", "type": "text"} in analysis["all_facts"]
+
+
+def test_parallel_batch_matches_serial_analysis(tmp_path):
+    jobs = []
+    for i in range(6):
+        path = tmp_path / f"report-{i}.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("arsredovisning.xhtml", make_xhtml(i + 1))
+        jobs.append(ParseJob("5561234567", {"dokumentId": f"d{i}"}, str(path)))
+    jobs.append(ParseJob("5561234567", {"dokumentId": "missing"}, str(tmp_path / "missing.zip")))
+
+    results = dict((job.doc["dokumentId"], report) for job, report in
+                   parse_archives_parallel(jobs, workers=2, chunk_size=2))
+
+    assert sorted(results) == sorted(job.doc["dokumentId"] for job in jobs)
+    assert results["missing"].error
+    for job in jobs[:-1]:
+        expected = analyze_ixbrl_archive(Path(job.path).read_bytes(), job.orgnr, job.doc)
+        analysis = results[job.doc["dokumentId"]].to_analysis()
+        assert sorted(analysis.pop("fact_names")) == sorted(expected.pop("fact_names"))
+        assert analysis == expected
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_parallel_batch_survives_killed_worker(tmp_path):
+    path = tmp_path / "report.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("arsredovisning.xhtml", make_xhtml(3))
+    # Opening a FIFO with no writer blocks, so this job is in flight when
+    # its worker is killed
+    fifo = tmp_path / "blocked.zip"
+    os.mkfifo(fifo)
+
+    def jobs():
+        yield ParseJob("5561234567", {"dokumentId": "blocked"}, str(fifo))
+        time.sleep(0.5)
+        children = multiprocessing.active_children()
+        for child in children:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(child.pid, signal.SIGKILL)
+        for child in children:
+            child.join()
+        time.sleep(0.2)
+        for i in range(4):
+            yield ParseJob("5561234567", {"dokumentId": f"d{i}"}, str(path))
+
+    results = {job.doc["dokumentId"]: report for job, report in parse_archives_parallel(jobs(), workers=2, chunk_size=1)}
+
+    assert sorted(results) == ["blocked", "d0", "d1", "d2", "d3"]
+    assert results["blocked"].error.startswith("worker failed")
+    # Chunks after the crash run in a new pool
+    for i in range(4):
+        assert results[f"d{i}"].error is None
+        assert results[f"d{i}"].fact_count > 0
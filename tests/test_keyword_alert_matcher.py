@@ -0,0 +1,133 @@
+"""
+Tests for the keyword alert matcher (Aho-Corasick over keyword_alerts).
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.monitors import keyword_alert_matcher
+from lib.monitors.keyword_alert_matcher import AhoCorasick, KeywordAlertMatcher, KeywordAlertService
+
+
+def alert(alert_id, keywords, exclude=None, sources=None, enabled=True):
+    return {
+        "id": alert_id,
+        "keywords": keywords,
+        "exclude_keywords": exclude,
+        "sources": sources,
+        "enabled": enabled,
+    }
+
+
+class TestAhoCorasick:
+    """Automaton finds every occurrence, including overlapping ones."""
+
+    def test_overlapping_patterns(self):
+        ac = AhoCorasick()
+        for i, pattern in enumerate(["he", "she", "his", "hers"]):
+            ac.add(pattern, i)
+        found = sorted(ac.find("ushers"))
+        assert found == [(1, 4, 1), (2, 4, 0), (2, 6, 3)]
+
+    def test_no_match(self):
+        ac = AhoCorasick()
+        ac.add("klarna", 0)
+        assert list(ac.find("spotify")) == []
+
+
+class TestKeywordAlertMatcher:
+
+    @pytest.fixture
+    def matcher(self):
+        return KeywordAlertMatcher.from_alerts([
+            alert("a1", ["Klarna", "riskkapital"]),
+            alert("a2", ["klarna"], exclude=["konkurs"]),
+            alert("a3", ["Northvolt"], sources=["poit"]),
+            alert("a4", ["Spotify"], enabled=False),
+        ], source="rss")
+
+    def test_case_insensitive(self, matcher):
+        assert matcher.match_text("KLARNA tar in pengar") == {"a1": ["klarna"], "a2": ["klarna"]}
+
+    def test_word_boundaries(self, matcher):
+        assert matcher.match_text("Klarnas nya app") == {}
+
+    def test_phrase_across_whitespace(self):
+        matcher = KeywordAlertMatcher.from_alerts([alert("a", ["Dagens  industri"])])
+        assert matcher.match_text("Enligt dagens\nindustri") == {"a": ["dagens industri"]}
+
+    def test_swedish_characters(self):
+        matcher = KeywordAlertMatcher.from_alerts([alert("a", ["Företagsförvärv"])])
+        assert matcher.match_text("Nytt FÖRETAGSFÖRVÄRV klart") == {"a": ["företagsförvärv"]}
+
+    def test_exclude_keyword_vetoes_alert(self, matcher):
+        assert matcher.match_text("Klarna och konkurs") == {"a1": ["klarna"]}
+
+    def test_source_and_enabled_filter(self, matcher):
+        assert matcher.match_text("Northvolt och Spotify") == {}
+
+    def test_multiple_keywords_collected(self, matcher):
+        result = matcher.match_text("Riskkapital till Klarna")
+        assert result["a1"] == ["klarna", "riskkapital"]
+
+    def test_match_articles_builds_rows(self, matcher):
+        rows = matcher.match_articles([
+            {"id": "r1", "title": "Nyheter", "description": "Om riskkapital", "link": "https://x"},
+            {"id": "r2", "title": "Väder", "description": None, "link": "https://y"},
+        ])
+        assert rows == [{
+            "alert_id": "a1",
+            "source": "rss",
+            "source_id": "r1",
+            "title": "Nyheter",
+            "url": "https://x",
+            "matched_keywords": ["riskkapital"],
+        }]
+
+
+class FakeArticleQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.keys = []
+        self.start = self.end = None
+
+    def select(self, columns):
+        return self
+
+    def gte(self, field, value):
+        self.rows = [r for r in self.rows if r[field] >= value]
+        return self
+
+    def order(self, field):
+        self.keys.append(field)
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        rows = sorted(self.rows, key=lambda r: tuple(r[k] for k in self.keys))
+        return SimpleNamespace(data=rows[self.start:self.end + 1])
+
+
+def test_fetch_articles_includes_cursor_timestamp_and_pages_stably(monkeypatch):
+    # Stored in an order that differs from id order, with tied timestamps
+    rows = [
+        {"id": "c", "fetched_at": "2026-01-01T10:00"},
+        {"id": "a", "fetched_at": "2026-01-01T10:00"},
+        {"id": "d", "fetched_at": "2026-01-01T11:00"},
+        {"id": "b", "fetched_at": "2026-01-01T10:00"},
+        {"id": "x", "fetched_at": "2026-01-01T09:00"},
+    ]
+    db = SimpleNamespace(client=SimpleNamespace(table=lambda name: FakeArticleQuery(list(rows))))
+    monkeypatch.setattr(keyword_alert_matcher, "ARTICLE_PAGE_SIZE", 2)
+
+    articles = KeywordAlertService(db=db).fetch_articles("2026-01-01T10:00")
+
+    assert [a["id"] for a in articles] == ["a", "b", "c", "d"]
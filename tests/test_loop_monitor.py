@@ -0,0 +1,78 @@
+"""
+Tests for the event loop block monitor and the sampling profiler, with a
+real blocking call inside a running loop.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.api.loop_monitor import LoopBlockMonitor, profile_thread
+
+
+def blocking_lookup(seconds):
+    time.sleep(seconds)  # a synchronous client call inside an async handler
+
+
+async def handle(monitor, key, path, block=0.0):
+    started = time.monotonic()
+    blocked_at_start = monitor.request_started(key, path)
+    if block:
+        blocking_lookup(block)
+    await asyncio.sleep(0)
+    return monitor.request_finished(key, path, blocked_at_start, time.monotonic() - started)
+
+
+def test_blocking_call_is_recorded_and_attributed_to_the_request():
+    monitor = LoopBlockMonitor(threshold_ms=50, interval=0.01)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        fast = await handle(monitor, 1, "/api/v1/fast")
+        slow = await handle(monitor, 2, "/api/v1/slow", block=0.3)
+        await asyncio.sleep(0.05)  # let the heartbeat see the stall end
+        await monitor.stop()
+        return fast, slow
+
+    fast, slow = asyncio.run(run())
+
+    assert slow >= 0.25 and fast < 0.05
+    stats = monitor.get_stats()
+    assert stats["antal_blockeringar"] >= 1
+    assert stats["langsta_blockering_ms"] >= 250
+    assert stats["endpoints"]["/api/v1/slow"]["langsamma_anrop"] == 1
+    assert stats["endpoints"]["/api/v1/fast"]["langsamma_anrop"] == 0
+    assert list(stats["endpoints"]) == ["/api/v1/slow", "/api/v1/fast"]
+
+    # The watchdog sampled the loop thread mid-stall
+    [sample] = monitor.samples
+    assert sample["requests"] == ["/api/v1/slow"]
+    assert any("in blocking_lookup" in frame for frame in sample["stack"])
+    assert not stats["aktiv"]
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_thread_samples_the_target_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,))
+    worker.start()
+    try:
+        profile = asyncio.run(profile_thread(worker.ident, seconds=0.2, interval_ms=5))
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile["antal_samples"] > 0
+    assert any(
+        any("in busy_worker" in frame for frame in entry["stack"])
+        for entry in profile["stackar"]
+    )
@@ -0,0 +1,187 @@
+"""
+Tests for the polled news feed store: parsing, the inverted index and
+conditional GETs, with feeds served by httpx.MockTransport.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.api.news_feed_store import NewsFeedStore, mentions, parse_feed, tokenize
+
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/">
+  <channel>
+    <title>Breakit</title>
+    <item>
+      <title>Spotifys vinst &#246;kar</title>
+      <link>https://example.se/spotify</link>
+      <description>&lt;p&gt;Musikbolaget &lt;b&gt;Spotify&lt;/b&gt; g&#229;r med vinst.&lt;/p&gt;</description>
+      <pubDate>Tue, 06 Jan 2026 10:00:00 +0100</pubDate>
+      <media:content url="https://example.se/spotify.jpg" />
+    </item>
+    <item>
+      <title>Klarna tar in pengar</title>
+      <guid>https://example.se/klarna</guid>
+      <pubDate>Wed, 07 Jan 2026 08:00:00 GMT</pubDate>
+      <enclosure url="https://example.se/klarna.png" type="image/png" />
+    </item>
+    <item>
+      <title></title>
+      <link>https://example.se/utan-titel</link>
+    </item>
+  </channel>
+</rss>
+"""
+
+ATOM = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <title>Northvolt AB i rekonstruktion</title>
+    <link rel="self" href="https://example.com/self" />
+    <link rel="alternate" href="https://example.com/northvolt" />
+    <summary>Batteritillverkaren s&#246;ker skydd.</summary>
+    <updated>2026-01-05T12:00:00Z</updated>
+  </entry>
+</feed>
+"""
+
+
+def make_store(responses, feeds=None):
+    """Store whose feeds are answered by `responses(source, request)`."""
+    feeds = feeds or {
+        "breakit": {"namn": "Breakit", "url": "https://feeds.test/breakit"},
+        "wired": {"namn": "Wired", "url": "https://feeds.test/wired"},
+    }
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        return await responses(request.url.path.strip("/"), request)
+
+    store = NewsFeedStore(feeds)
+    store._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return store, requests
+
+
+def test_tokenize_casefolds_unicode_words():
+    assert tokenize("Spotifys VINST ökar - 2026!") == ["spotifys", "vinst", "ökar", "2026"]
+    assert tokenize("") == [] and tokenize(None) == []
+
+
+def test_parse_rss_and_atom():
+    rss = parse_feed(RSS, "breakit")
+    assert [a.url for a in rss] == ["https://example.se/spotify", "https://example.se/klarna"]
+    spotify, klarna = rss
+    assert spotify.title == "Spotifys vinst ökar"
+    assert spotify.summary == "Musikbolaget Spotify går med vinst."
+    assert spotify.published_at == "2026-01-06T09:00:00+00:00"
+    assert spotify.image_url == "https://example.se/spotify.jpg"
+    assert klarna.image_url == "https://example.se/klarna.png" and klarna.summary is None
+
+    [northvolt] = parse_feed(ATOM, "wired")
+    assert northvolt.url == "https://example.com/northvolt"
+    assert northvolt.published_at == "2026-01-05T12:00:00+00:00"
+    assert northvolt.source == "wired"
+
+
+def test_mentions_matches_phrase_with_prefix_on_last_token():
+    assert mentions("Spotify", "Spotifys vinst ökar")
+    assert mentions("northvolt ab", "Northvolt AB i rekonstruktion")
+    assert not mentions("AB Northvolt", "Northvolt AB i rekonstruktion")
+    assert not mentions("potify", "Spotifys vinst ökar")  # prefix, not substring
+    assert mentions("Spotify", "Okänd", "Om Spotify")
+
+
+def test_refresh_rebuilds_index_and_search():
+    async def responses(source, request):
+        return httpx.Response(200, content=RSS if source == "breakit" else ATOM)
+
+    store, _ = make_store(responses)
+    assert asyncio.run(store.refresh_all()) == {"breakit": "updated", "wired": "updated"}
+
+    assert [a.url for a in store.search("Spotify")] == ["https://example.se/spotify"]
+    assert [a.url for a in store.search("spotifys vinst")] == ["https://example.se/spotify"]
+    assert [a.url for a in store.search("Northvolt AB")] == ["https://example.com/northvolt"]
+    assert store.search("vinst Spotify") == []
+    assert store.search("   ") == []
+
+    # Newest first across feeds
+    assert [a.url for a in store.get_latest(limit=2)] == ["https://example.se/klarna", "https://example.se/spotify"]
+    assert [a.source for a in store.get_latest(["wired"])] == ["wired"]
+
+    # A feed dropping an article removes it from the index on the next rebuild
+    store.feeds["breakit"].articles = store.feeds["breakit"].articles[1:]
+    store._rebuild_index()
+    assert store.search("Spotify") == []
+
+
+def test_conditional_get_sends_validators_and_keeps_articles_on_304():
+    async def responses(source, request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=RSS, headers={"ETag": '"v1"', "Last-Modified": "Tue, 06 Jan 2026 10:00:00 GMT"})
+
+    store, requests = make_store(responses, {"breakit": {"url": "https://feeds.test/breakit"}})
+    assert asyncio.run(store.refresh_feed("breakit")) == "updated"
+    assert "If-None-Match" not in requests[0].headers
+
+    assert asyncio.run(store.refresh_all()) == {"breakit": "not_modified"}
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+    assert requests[1].headers["If-Modified-Since"] == "Tue, 06 Jan 2026 10:00:00 GMT"
+
+    state = store.feeds["breakit"]
+    assert state.not_modified_count == 1 and len(state.articles) == 2
+    assert store.source_status(["breakit"])["breakit"]["status"] == "ok"
+
+
+def test_server_error_does_not_count_as_fetched():
+    async def responses(source, request):
+        return httpx.Response(503)
+
+    store, _ = make_store(responses, {"breakit": {"url": "https://feeds.test/breakit"}})
+    assert asyncio.run(store.refresh_all()) == {"breakit": "error"}
+
+    state = store.feeds["breakit"]
+    assert state.last_status == 503 and state.last_fetched_at is None
+    assert not store.is_warm
+    status = store.source_status(["breakit"])["breakit"]
+    assert status["status"] == "error" and status["hamtad"] is None and "503" in status["fel"]
+
+
+def test_hanging_feed_is_cut_off_at_its_deadline():
+    hang = asyncio.Event()
+
+    async def responses(source, request):
+        if source == "wired":
+            await hang.wait()  # never answers
+        return httpx.Response(200, content=RSS)
+
+    store, _ = make_store(responses, {
+        "breakit": {"url": "https://feeds.test/breakit"},
+        "wired": {"url": "https://feeds.test/wired", "deadline": 0.2},
+    })
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        outcome = await store.refresh_all()
+        return outcome, asyncio.get_running_loop().time() - started
+
+    outcome, elapsed = asyncio.run(run())
+
+    assert outcome == {"breakit": "updated", "wired": "timeout"}
+    assert elapsed < 0.2 + 0.3  # the hung feed's deadline, not the shared 15s timeout
+    assert [a.source for a in store.get_latest()] == ["breakit", "breakit"]
+
+    status = store.source_status(["breakit", "wired"])
+    assert status["breakit"]["status"] == "ok" and status["breakit"]["artiklar"] == 2
+    assert status["wired"]["status"] == "timeout"
+    assert status["wired"]["hamtad"] is None and "Timeout" in status["wired"]["fel"]
+    assert store.feeds["wired"].last_attempt_at is not None
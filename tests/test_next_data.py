@@ -0,0 +1,88 @@
+"""
+Tests for the offset-based page JSON extraction, checked against the
+whole-page regex + json.loads it replaced, with and without orjson.
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.scrapers import next_data
+from lib.scrapers.next_data import extract_initial_data, extract_next_data, find_script_payload
+
+FIXTURES = Path(__file__).parent / "fixtures" / "allabolag"
+
+_NEXT_DATA_RE = re.compile(r'<script[^>]*\bid=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL)
+_INITIAL_DATA_RE = re.compile(r'window\.__INITIAL_DATA__\s*=\s*({.*?});', re.DOTALL)
+
+
+def reference(pattern, html):
+    """The old path: regex over the whole page, then json.loads."""
+    match = pattern.search(html)
+    if not match or not match.group(1).strip():
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+PAYLOAD = '{"props": {"pageProps": {"company": {"name": "Åkeri & Co AB", "orgnr": "5561234567"}}}}'
+
+PAGES = {
+    "fixture_nextjs": (FIXTURES / "nextjs_company.html").read_text(encoding="utf-8"),
+    "fixture_organisation": (FIXTURES / "nextjs_organisation.html").read_text(encoding="utf-8"),
+    "fixture_legacy": (FIXTURES / "legacy_company.html").read_text(encoding="utf-8"),
+    "single_quoted_id": f"<html><script type='application/json' id='__NEXT_DATA__'>{PAYLOAD}</script></html>",
+    "id_on_other_tag_first": (
+        '<div id="__NEXT_DATA__">not it</div>'
+        f'<script id="__NEXT_DATA__" type="application/json">{PAYLOAD}</script>'
+    ),
+    "empty_payload": '<script id="__NEXT_DATA__" type="application/json">  </script>',
+    "invalid_json": '<script id="__NEXT_DATA__" type="application/json">{"props": </script>',
+    "unclosed_script": f'<script id="__NEXT_DATA__">{PAYLOAD}',
+    "no_scripts": "<html><body>Inget här</body></html>",
+    "legacy_inline": (
+        '<script>var a = 1;</script>'
+        '<script>window.__INITIAL_DATA__ = {"companyOverview": {"namn": "Ö AB"}};\nwindow.x = {};</script>'
+    ),
+    "legacy_invalid": "<script>window.__INITIAL_DATA__ = {broken};</script>",
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def loads(request, monkeypatch):
+    if request.param == "orjson":
+        orjson = pytest.importorskip("orjson")
+        monkeypatch.setattr(next_data, "_loads", orjson.loads)
+    else:
+        monkeypatch.setattr(next_data, "_loads", json.loads)
+    return request.param
+
+
+@pytest.mark.parametrize("as_bytes", [False, True])
+@pytest.mark.parametrize("page", sorted(PAGES))
+def test_matches_the_old_regex_path(page, as_bytes, loads):
+    html = PAGES[page]
+    source = html.encode("utf-8") if as_bytes else html
+
+    assert extract_next_data(source) == reference(_NEXT_DATA_RE, html)
+    assert extract_initial_data(source) == reference(_INITIAL_DATA_RE, html)
+
+
+def test_fixtures_carry_the_expected_format():
+    assert extract_next_data(PAGES["fixture_nextjs"])["props"]["pageProps"]["company"]
+    assert extract_next_data(PAGES["fixture_legacy"]) is None
+    assert extract_initial_data(PAGES["fixture_legacy"])["companyOverview"]["namn"] == "Gamla Formatet AB"
+
+
+def test_payload_slice_keeps_type():
+    html = f'<script id="__NEXT_DATA__" type="application/json">{PAYLOAD}</script>'
+    assert find_script_payload(html) == PAYLOAD
+    assert find_script_payload(html.encode("utf-8")) == PAYLOAD.encode("utf-8")
+    assert find_script_payload(html, "other") is None
@@ -0,0 +1,190 @@
+"""
+Tests for the POIT stats cache: version probing, incremental rebuilds,
+invalidation and hit/miss counters, against an in-memory stand-in for the
+Supabase query builder.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.api.poit_stats_cache import STATS_COLUMNS, PoitStatsCache
+
+
+def day(offset):
+    return (datetime.now() - timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.columns = None
+        self.filters = []
+        self.lower_bounds = {}
+        self.orders = []
+        self.bounds = None
+        self.negate = False
+
+    def select(self, columns):
+        self.columns = columns
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, field, value):
+        negate, self.negate = self.negate, False
+        self.filters.append(lambda r: (r.get(field) is None) != negate)
+        return self
+
+    def eq(self, field, value):
+        self.filters.append(lambda r: r.get(field) == value)
+        return self
+
+    def gte(self, field, value):
+        self.lower_bounds[field] = value
+        self.filters.append(lambda r: r.get(field) is not None and r.get(field) >= value)
+        return self
+
+    def order(self, field, desc=False):
+        self.orders.append((field, desc))
+        return self
+
+    def limit(self, n):
+        self.bounds = (0, n - 1)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        self.db.queries.append(self)
+        rows = [dict(r) for r in self.db.tables.get(self.table, []) if all(f(r) for f in self.filters)]
+        for field, desc in reversed(self.orders):
+            rows.sort(key=lambda r: r.get(field) or '', reverse=desc)
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        if self.columns != '*':
+            columns = [c.strip() for c in self.columns.split(',')]
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return SimpleNamespace(data=rows)
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def reads(self, table):
+        return [q for q in self.queries if q.table == table]
+
+
+def stats_row(id, offset, **extra):
+    return {
+        "id": id,
+        "sync_date": day(offset),
+        "sync_started_at": f"{day(offset)}T06:00:00",
+        "sync_completed_at": f"{day(offset)}T06:10:00",
+        "announcements_found": 10 * id,
+        "raw_log": "x" * 100,
+        **extra,
+    }
+
+
+def announcement(id, offset, category="konkurser"):
+    return {"id": id, "publication_date": day(offset), "category": category, "subcategory": "konkursbeslut"}
+
+
+def make_cache(**kwargs):
+    client = FakeSupabase({
+        "poit_sync_stats": [stats_row(1, 2), stats_row(2, 1)],
+        "sync_metadata": [{"source": "poit_announcements", "last_sync_at": "t1"}],
+        "poit_announcements": [
+            announcement(1, 40),
+            announcement(2, 5),
+            announcement(3, 1, "registreringar"),
+        ],
+    })
+    cache = PoitStatsCache(database=lambda: SimpleNamespace(client=client), **kwargs)
+    return cache, client
+
+
+def test_rebuild_reads_only_the_stats_columns_and_window():
+    cache, client = make_cache()
+    asyncio.run(cache.ensure_fresh())
+
+    [stats_query] = client.reads("poit_sync_stats")[1:]  # after the version probe
+    assert stats_query.columns == STATS_COLUMNS
+    assert "raw_log" not in cache.get_latest_stats()
+    assert cache.get_latest_stats()["sync_date"] == day(1)
+
+    assert [a["id"] for a in cache.get_announcements(30)] == [3, 2]
+    assert [a["id"] for a in cache.get_announcements(3)] == [3]
+    assert [a["id"] for a in cache.get_announcements(30, category="konkurser")] == [2]
+    assert cache.get_daily_counts(day(1)) == {"registreringar": 1}
+
+
+def test_version_probe_rebuilds_only_after_a_new_sync():
+    cache, client = make_cache(probe_interval=0)
+    asyncio.run(cache.ensure_fresh())
+    asyncio.run(cache.ensure_fresh())
+    assert cache.get_stats()["ombyggnader"] == 1
+
+    # The monitor ran: new announcements today, new sync_metadata timestamp
+    client.tables["poit_announcements"].append(announcement(4, 0))
+    client.tables["sync_metadata"][0]["last_sync_at"] = "t2"
+    asyncio.run(cache.ensure_fresh())
+
+    stats = cache.get_stats()
+    assert (stats["ombyggnader"], stats["inkrementella_ombyggnader"]) == (2, 1)
+    # Only the newest cached day onward was read again
+    assert client.reads("poit_announcements")[-1].lower_bounds == {"publication_date": day(1)}
+    assert [a["id"] for a in cache.get_announcements(30)] == [4, 3, 2]
+
+
+def test_probe_interval_limits_version_checks():
+    cache, client = make_cache(probe_interval=3600)
+    asyncio.run(cache.ensure_fresh())
+    probes = len(client.reads("sync_metadata"))
+
+    client.tables["sync_metadata"][0]["last_sync_at"] = "t2"
+    asyncio.run(cache.ensure_fresh())
+    assert len(client.reads("sync_metadata")) == probes
+
+    cache.invalidate()
+    client.tables["poit_announcements"][1]["category"] = "kallelser"  # corrected older day
+    asyncio.run(cache.ensure_fresh())
+
+    # invalidate() forces a probe and a full read of the window
+    assert len(client.reads("sync_metadata")) == probes + 1
+    assert cache.get_stats()["inkrementella_ombyggnader"] == 0
+    assert cache.get_announcements(30, category="kallelser")[0]["id"] == 2
+
+
+def test_hit_and_miss_counters():
+    cache, _ = make_cache()
+    asyncio.run(cache.ensure_fresh())
+
+    assert cache.get_stats_for_date(day(2))[1]["announcements_found"] == 10
+    assert cache.get_stats_for_date(day(400)) == (False, None)
+    assert cache.get_announcements(7) is not None
+    cache.get_latest_stats()
+
+    sections = cache.get_stats()["sektioner"]
+    assert sections["stats"] == {"traffar": 2, "missar": 1, "traffgrad": 0.667}
+    assert sections["announcements"]["traffar"] == 1
+
+    # A window larger than the cached one is a miss the caller serves from the database
+    assert cache.get_announcements(45) is None
+    assert cache.get_stats()["sektioner"]["announcements"]["missar"] == 1
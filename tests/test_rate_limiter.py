@@ -0,0 +1,119 @@
+"""
+Tests for the adaptive rate limiter, driven by a fake clock, and its
+per-host registry.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.scrapers import rate_limiter
+from lib.scrapers.rate_limiter import (
+    AdaptiveRateLimiter,
+    get_host_limiter,
+    get_host_limiter_for_url,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def send(limiter, clock):
+    """Reserve a slot and move the clock to when the request goes out."""
+    wait = limiter.reserve()
+    clock.advance(wait)
+    return wait
+
+
+def test_steady_rate_spaces_requests():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=2.0, max_rate=2.0, clock=clock)
+
+    waits = [send(limiter, clock) for _ in range(4)]
+
+    assert waits == [0.0, 0.5, 0.5, 0.5]
+    assert limiter.get_stats()["waited_seconds"] == 1.5
+
+    # An idle gap doesn't bank credit beyond the burst
+    clock.advance(10)
+    assert [send(limiter, clock) for _ in range(2)] == [0.0, 0.5]
+
+
+def test_burst_allows_back_to_back_requests():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=1.0, max_rate=1.0, burst=3, clock=clock)
+
+    assert [limiter.reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 1.0]
+
+
+def test_429_halves_rate_once_per_backoff_window():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=4.0, max_rate=4.0, backoff_seconds=5.0, clock=clock)
+
+    limiter.record(429, 0.1)
+    limiter.record(429, 0.1)  # in flight at the old rate: no second cut
+    assert limiter.rate == 2.0
+
+    clock.advance(5.0)
+    limiter.record(503, 0.1)
+    assert limiter.rate == 1.0
+    assert (limiter.throttled, limiter.errors) == (2, 1)
+
+    limiter.record(None, 0.1)  # connection error inside the window
+    assert limiter.rate == 1.0 and limiter.errors == 2
+
+
+def test_retry_after_is_honoured():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=2.0, backoff_seconds=5.0, clock=clock)
+
+    send(limiter, clock)
+    limiter.record(429, 0.1, retry_after=parse_retry_after("7"))
+    assert limiter.reserve() == 7.0
+
+    # Without Retry-After the default backoff applies
+    clock.advance(30)
+    limiter.record(429, 0.1)
+    assert limiter.reserve() == 5.0
+
+
+def test_healthy_responses_ramp_up_and_slow_ones_back_off():
+    limiter = AdaptiveRateLimiter(rate=1.0, max_rate=1.1, increase=0.05, latency_target=2.0, clock=FakeClock())
+
+    for _ in range(5):
+        limiter.record(200, 0.1)
+    assert limiter.rate == 1.1
+
+    limiter.record(200, 3.0)
+    assert round(limiter.rate, 3) == 0.99
+
+    limiter.record(404, 0.1)
+    assert round(limiter.rate, 3) == 0.99
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2026 07:28:00 GMT") is None
+    assert parse_retry_after(None) is None
+
+def test_same_host_shares_one_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_host_limiters", {})
+    monkeypatch.setattr(rate_limiter, "HOST_RATE_LIMITS", {"www.allabolag.se": {"rate": 1.0, "max_rate": 3.0}})
+
+    first = get_host_limiter_for_url("https://www.allabolag.se/5561234567")
+    second = get_host_limiter_for_url("https://WWW.allabolag.se/foretag/x?y=1")
+
+    assert first is second and first is get_host_limiter("www.allabolag.se")
+    assert first.max_rate == 3.0
+    assert get_host_limiter_for_url("https://example.com/a") is not first
@@ -0,0 +1,64 @@
+"""
+Tests for change-priority scheduling of Allabolag refreshes.
+"""
+
+import sys
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from scrapers.refresh_priority import RefreshPrioritizer
+
+
+NOW = datetime.now(timezone.utc)
+
+
+def days_ago(days):
+    return (NOW - timedelta(days=days)).isoformat()
+
+
+def test_never_synced_first_then_most_stale():
+    prioritizer = RefreshPrioritizer(cache_hours=168)
+    ranked = prioritizer.rank(["A1", "B2", "C3"], {"A1": days_ago(2), "B2": days_ago(20)})
+    assert [c.orgnr for c in ranked] == ["C3", "B2", "A1"]
+
+
+def test_recent_poit_announcement_outranks_staleness():
+    prioritizer = RefreshPrioritizer(cache_hours=168)
+    prioritizer.add_poit_announcements([{
+        "orgnr": "556123-4567",
+        "extracted_orgnrs": ["5561234567"],
+        "category": "bolagsverkets_registreringar",
+        "announcement_date": days_ago(1),
+    }])
+    ranked = prioritizer.rank(["5561234567", "5569999999"], {
+        "5561234567": days_ago(3),
+        "5569999999": days_ago(10),
+    })
+    assert ranked[0].orgnr == "5561234567"
+    assert ranked[0].force
+    assert ranked[0].reasons.count("poit:bolagsverkets_registreringar") == 1
+    assert not ranked[1].force
+
+
+def test_signal_older_than_last_sync_is_ignored():
+    prioritizer = RefreshPrioritizer(cache_hours=168)
+    prioritizer.add_equity_offerings([{
+        "company_orgnr": "5561234567",
+        "status": "completed",
+        "subscription_end": days_ago(5),
+    }])
+    candidate = prioritizer.score("5561234567", days_ago(1))
+    assert not candidate.force
+    assert candidate.score < 1
+
+
+def test_watchlist_makes_company_stale_faster():
+    prioritizer = RefreshPrioritizer(cache_hours=168)
+    prioritizer.add_watch("556111-1111")
+    ranked = prioritizer.rank(["5562222222", "5561111111"], {
+        "5562222222": days_ago(8),
+        "5561111111": days_ago(7),
+    })
+    assert ranked[0].orgnr == "5561111111"
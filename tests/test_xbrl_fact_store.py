@@ -0,0 +1,81 @@
+"""
+Tests for the columnar XBRL fact store.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("pyarrow")
+
+from lib.api.xbrl_fact_store import XbrlFactStore
+
+REVENUE = "se-gen-base:Nettoomsattning"
+
+
+def make_record(orgnr, document_id, year, revenue, prior_revenue):
+    return {
+        "orgnr": orgnr,
+        "document_id": document_id,
+        "period_end": f"{year}-12-31",
+        "contexts": {
+            "period0": {"type": "duration", "start": f"{year}-01-01", "end": f"{year}-12-31"},
+            "period1": {"type": "duration", "start": f"{year - 1}-01-01", "end": f"{year - 1}-12-31"},
+            "balans0": {"type": "instant", "date": f"{year}-12-31"},
+        },
+        "facts": [
+            {"name": REVENUE, "value_raw": "1", "value_parsed": revenue, "context": "period0",
+             "unit": "SEK", "decimals": "INF", "scale": 0},
+            {"name": REVENUE, "value_raw": "1", "value_parsed": prior_revenue, "context": "period1",
+             "unit": "SEK", "decimals": "INF", "scale": 0},
+            {"name": "se-cd-base:Ort", "value": "Göteborg", "context": "balans0", "type": "text"},
+        ],
+    }
+
+
+def test_concept_series_across_companies_and_years(tmp_path):
+    store = XbrlFactStore(str(tmp_path), row_group_size=2)
+    store.write([
+        make_record("5561234567", "a-2022", 2022, 100.0, 90.0),
+        make_record("5561234567", "a-2023", 2023, 120.0, 100.0),
+        make_record("5569876543", "b-2023", 2023, 50.0, 40.0),
+    ])
+    # Re-parsed document replaces the earlier version
+    store.write([make_record("5561234567", "a-2022", 2022, 101.0, 90.0)])
+
+    assert store.years() == [2022, 2023]
+    assert store.get_concept_series([REVENUE], from_year=2020, to_year=2024) == {
+        "5561234567": {REVENUE: {2022: 101.0, 2023: 120.0}},
+        "5569876543": {REVENUE: {2023: 50.0}},
+    }
+    assert store.get_concept_series([REVENUE], orgnrs=["5569876543"], to_year=2022) == {}
+
+
+def test_company_facts_filtered_by_year_and_namespace(tmp_path):
+    store = XbrlFactStore(str(tmp_path))
+    store.write([make_record("5561234567", "a-2023", 2023, 120.0, 100.0)])
+
+    facts = store.get_xbrl_facts("5561234567", fiscal_year=2023, namespace="se-cd-base")
+
+    assert len(facts) == 1
+    assert facts[0]["value_raw"] == "Göteborg"
+    assert facts[0]["context_end"] == "2023-12-31"
+    assert facts[0]["is_text"] is True
+    assert store.get_xbrl_facts("5561234567", fiscal_year=2022) == []
+
+
+def test_years_scan_is_cached_until_own_write(tmp_path):
+    reader = XbrlFactStore(str(tmp_path))
+    assert not reader.has_data()
+
+    XbrlFactStore(str(tmp_path)).write([make_record("5561234567", "a-2023", 2023, 120.0, 100.0)])
+    assert not reader.has_data()  # another process' write shows up after the cache expires
+    reader.years_cache_seconds = 0
+    assert reader.years() == [2023]
+
+    reader.years_cache_seconds = 60
+    reader.write([make_record("5561234567", "a-2022", 2022, 100.0, 90.0)])
+    assert reader.years() == [2022, 2023]
@@ -0,0 +1,76 @@
+"""
+Tests for the single-pass XBRL fact scanner, against the regex
+extractor and the sample report in tests/fixtures/xbrl.
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.parsers import ixbrl
+from lib.parsers.ixbrl import XbrlFactScanner, extract_xbrl_facts, extract_xbrl_facts_single_pass
+
+SAMPLE = Path(__file__).parent / "fixtures" / "xbrl" / "sample_report.xhtml"
+
+
+@pytest.fixture
+def sample():
+    return SAMPLE.read_text(encoding="utf-8")
+
+
+def by_name(facts, name):
+    return [f for f in facts if f["name"] == name]
+
+
+def test_flat_facts_match_regex_extractor(sample):
+    flat = sample[:sample.index("<!-- Nested markup")] + "</body></html>"
+    regex = extract_xbrl_facts(flat)
+    sax = extract_xbrl_facts_single_pass(flat)
+
+    assert sax["numeric"] == regex["numeric"]
+    assert sax["text"] == regex["text"]
+    assert sax["contexts"] == regex["contexts"]
+    assert sax["namespaces"] == regex["namespaces"]
+
+
+def test_nested_markup_sign_and_exclude(sample):
+    facts = extract_xbrl_facts_single_pass(sample)
+
+    result = by_name(facts["numeric"], "se-gen-base:AretsResultat")[-1]
+    assert result["value_raw"] == "1\xa0250"
+    assert result["value_parsed"] == -1250000.0
+
+    assert by_name(facts["text"], "se-cd-base:Ort")[0]["value"] == "Göteborg"
+    text = by_name(facts["text"], "se-gen-base:ForvaltningsberattelseText")[0]["value"]
+    assert text == "Omsättningen ökade till 10 500 tkr."
+    # The fact nested in the text block is a fact of its own
+    assert len(by_name(facts["numeric"], "se-gen-base:Nettoomsattning")) == 3
+
+    # The regex extractor misses all three nested-markup facts
+    regex = extract_xbrl_facts(sample)
+    assert len(facts["numeric"]) + len(facts["text"]) == len(regex["numeric"]) + len(regex["text"]) + 3
+
+
+def test_units_and_contexts(sample):
+    facts = extract_xbrl_facts_single_pass(sample)
+    assert facts["units"] == {"SEK": "iso4217:SEK", "SEKPerAktie": "iso4217:SEK/xbrli:shares"}
+    assert facts["contexts"]["period0"] == {"type": "duration", "start": "2023-01-01", "end": "2023-12-31"}
+    assert facts["contexts"]["balans1"] == {"type": "instant", "date": "2022-12-31"}
+
+
+def test_sources_and_chunking_agree(sample, monkeypatch):
+    expected = extract_xbrl_facts_single_pass(sample)
+    assert extract_xbrl_facts_single_pass(sample.encode("utf-8")) == expected
+
+    monkeypatch.setattr(ixbrl, "STREAM_READ_BYTES", 7)
+    assert extract_xbrl_facts_single_pass(io.BytesIO(sample.encode("utf-8"))) == expected
+
+    for size in (1, 13, 100):
+        scanner = XbrlFactScanner()
+        for i in range(0, len(sample), size):
+            scanner.feed(sample[i:i + size])
+        assert scanner.close() == expected
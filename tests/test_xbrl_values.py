@@ -0,0 +1,75 @@
+"""
+Tests for exact XBRL value normalisation (batch and single value).
+
+Cases mirror TestParseNumericValue in test_xbrl_parser.py.
+"""
+
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+np = pytest.importorskip("numpy")
+
+from lib.parsers import ixbrl
+from lib.parsers.ixbrl import extract_xbrl_facts_single_pass, parse_xbrl_value
+from lib.parsers.xbrl_values import normalize_xbrl_values, parse_decimal, to_decimals, to_float64, to_int64
+
+CASES = [
+    ("1234", 0, Decimal("1234")),
+    ("1 234 567", 0, Decimal("1234567")),
+    ("1234,56", 0, Decimal("1234.56")),
+    ("-1234", 0, Decimal("-1234")),
+    ("−1234", 0, Decimal("-1234")),
+    ("(1234)", 0, Decimal("-1234")),
+    ("1234", 3, Decimal("1234000")),
+    ("50", 6, Decimal("50000000")),
+    ("", 0, None),
+    ("1\xa0234\xa0567", 0, Decimal("1234567")),
+    ("-2 829", 3, Decimal("-2829000")),
+    ("-", 0, None),
+]
+
+
+def test_batch_matches_single_values():
+    values, scales, expected = zip(*CASES)
+
+    decimals = to_decimals(*normalize_xbrl_values(values, scales))
+
+    assert decimals == list(expected)
+    for (value, scale, exact), parsed in zip(CASES, decimals):
+        assert parse_xbrl_value(value, scale) == (None if exact is None else float(exact))
+
+
+def test_sign_attribute_exactness_and_int64():
+    values = ["1 250", "0,1", "123456789012345678", "(7)", "12,5", "abc", "-3"]
+    signs = ["-", None, None, "-", None, None, "-"]
+    mantissa, exponent, valid = normalize_xbrl_values(values, [3, 0, 0, 0, 0, 0, 0], signs)
+
+    # sign="-" on a value already displayed as negative keeps it negative
+    assert to_decimals(mantissa, exponent, valid) == [
+        Decimal("-1250000"), Decimal("0.1"), Decimal("123456789012345678"), Decimal("-7"), Decimal("12.5"), None,
+        Decimal("-3"),
+    ]
+    assert parse_decimal("(7)", 0, "-") == (-7, 0)
+    assert parse_decimal("\u22123", 0, "-") == (-3, 0)
+    ints, ok = to_int64(mantissa, exponent, valid)
+    assert ok.tolist() == [True, False, True, True, False, False, True]
+    assert ints[2] == 123456789012345678
+    assert to_float64(mantissa, exponent, valid)[1] == 0.1
+
+
+def test_scanner_without_numpy_parses_the_same(monkeypatch):
+    report = (
+        '<ix:nonFraction name="a:A" contextRef="c" sign="-" scale="3">1 234,5</ix:nonFraction>'
+        '<ix:nonFraction name="a:B" contextRef="c">(2 000)</ix:nonFraction>'
+        '<ix:nonFraction name="a:C" contextRef="c">-</ix:nonFraction>'
+    )
+    batch = [f["value_parsed"] for f in extract_xbrl_facts_single_pass(report)["numeric"]]
+    monkeypatch.setattr(ixbrl, "NUMPY_AVAILABLE", False)
+    single = [f["value_parsed"] for f in extract_xbrl_facts_single_pass(report)["numeric"]]
+
+    assert batch == single == [-1234500.0, -2000.0, None]